@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+"""
+Measures the cost of running a copy loop with Z80.run(), decoding one
+instruction at a time, against running it a block at a time, with and
+without compiling hot blocks. Prints the median speed over NUM_RUNS runs,
+with the slowest and fastest.
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pygme.cpu import z80
+from pygme.memory import array
+
+NUM_CYCLES = 1000000
+NUM_RUNS = 5
+HOT_COUNT = 16
+
+# ld hl, 0xc000; ld de, 0xd000; ld b, 0; ld a, (hl+); ld (de), a; inc de;
+# dec b; jr nz, -6; jp 0x0100
+COPY_LOOP = [0x21, 0x00, 0xc0, 0x11, 0x00, 0xd0, 0x06, 0x00, 0x2a, 0x12,
+             0x13, 0x05, 0x20, 0xfa, 0xc3, 0x00, 0x01]
+
+
+def cpuFor(name):
+    mem = array.Array(1 << 16)
+    for i, b in enumerate(COPY_LOOP):
+        mem.set8(0x0100 + i, b)
+    return z80.Z80(mem, useBlocks=name != 'decode',
+                   hotCount=HOT_COUNT if name == 'jit' else 0)
+
+
+def main():
+    for name in ['decode', 'blocks', 'jit']:
+        cpu = cpuFor(name)
+        secs = timeit.repeat(lambda: cpu.run(NUM_CYCLES), number=1,
+                             repeat=NUM_RUNS)
+        mhz = sorted(NUM_CYCLES / s / 1e6 for s in secs)
+        print("%-10s %6.2f MHz (min %.2f, max %.2f)" %
+              (name, mhz[len(mhz) // 2], mhz[0], mhz[-1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+# Copyright 2013 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+"""
+Measures the cost of looking up an instruction's function, time and argument
+count, with and without the flattened dispatch table used by Z80.run().
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pygme.cpu import z80
+from pygme.memory import array
+
+NUM_OPCODES = 100000
+NUM_RUNS = 5
+
+NOT_INSTRS = [0xd3, 0xdb, 0xdd, 0xe3, 0xe4, 0xeb, 0xec, 0xed, 0xf2, 0xf4,
+              0xfc, 0xfd]
+
+
+def opcodes(n):
+    """Returns a random stream of n opcodes, about 1 in 8 of them extended."""
+    rand = random.Random(0)
+    valid = [opc for opc in range(0x100) if opc not in NOT_INSTRS]
+    opcs = []
+    for _ in range(n):
+        opc = rand.choice(valid)
+        if opc == 0xcb:
+            opcs.append((0xcb, rand.randrange(0x100)))
+        else:
+            opcs.append((opc, None))
+    return opcs
+
+
+def accessors(cpu, opcs):
+    """Dispatch through the instr_* and extinstr_* accessor methods."""
+    cycles = 0
+    for opc, ext in opcs:
+        if opc == 0xcb:
+            cpu.extinstr_func(ext)
+            cycles += cpu.extinstr_time(ext)
+        else:
+            cpu.instr_func(opc)
+            cpu.instr_argc(opc)
+            cycles += cpu.instr_time(opc)
+    return cycles
+
+
+def tuples(cpu, opcs):
+    """Dispatch through instr, and through extInstr for 0xCB opcodes."""
+    instr = cpu.instr
+    extInstr = cpu.extInstr
+    cycles = 0
+    for opc, ext in opcs:
+        if opc == 0xcb:
+            func, time = extInstr[ext]
+        else:
+            func, time, argc = instr[opc]
+        cycles += time
+    return cycles
+
+
+def flat(cpu, opcs):
+    """Dispatch through the flattened 512-entry table used by Z80.run()."""
+    ops = cpu._ops
+    cycles = 0
+    for opc, ext in opcs:
+        if opc == 0xcb:
+            opc = 0x100 | ext
+        func, time, argc = ops[opc]
+        cycles += time
+    return cycles
+
+
+def main():
+    cpu = z80.Z80(array.Array(1 << 16))
+    opcs = opcodes(NUM_OPCODES)
+    for dispatch in [accessors, tuples, flat]:
+        secs = min(timeit.repeat(lambda: dispatch(cpu, opcs), number=1,
+                                 repeat=NUM_RUNS))
+        print("%-10s %6.1f ns/instr" %
+              (dispatch.__name__, secs * 1e9 / NUM_OPCODES))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# Copyright 2013 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+"""
+Measures the cost of memory accesses through the MMU, with and without bank
+switches between them, against a flat Array.
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pygme.memory import array
+from pygme.memory import mmu
+
+NUM_ACCESSES = 100000
+NUM_RUNS = 5
+NUM_BANKS = 0x80
+
+
+class FlatROM:
+    """A ROM of NUM_BANKS banks held in memory, with an MBC5 header."""
+
+    def __init__(self):
+        self._data = bytearray(NUM_BANKS * 0x4000)
+        self._data[mmu.CART_TYPE] = 0x1b
+        self._data[mmu.RAM_SIZE] = 0x03
+        self._view = memoryview(self._data)
+
+    def bank(self, n):
+        return self._view[n * 0x4000:(n + 1) * 0x4000]
+
+    def numBanks(self):
+        return NUM_BANKS
+
+
+def addresses(n):
+    """Returns n random addresses in ROM, external RAM and WRAM."""
+    rand = random.Random(0)
+    ranges = [(0x0000, 0x7fff), (0xa000, 0xbfff), (0xc000, 0xdfff)]
+    return [rand.randint(*rand.choice(ranges)) for _ in range(n)]
+
+
+def reads(mem, addrs):
+    """Reads each address."""
+    get8 = mem.get8
+    for addr in addrs:
+        get8(addr)
+
+
+def switchingReads(mem, addrs):
+    """Switches ROM and RAM bank every 8 reads, as a bank-hopping game does."""
+    get8 = mem.get8
+    set8 = mem.set8
+    for i, addr in enumerate(addrs):
+        if i & 7 == 0:
+            set8(0x2000, i & (NUM_BANKS - 1))
+            set8(0x4000, i & 3)
+        get8(addr)
+
+
+def main():
+    flat = array.Array(1 << 16, checked=False)
+    banked = mmu.MMU(FlatROM())
+    banked.set8(0x0000, 0x0a)
+    addrs = addresses(NUM_ACCESSES)
+    for name, mem, access in [
+        ('array', flat, reads),
+        ('mmu', banked, reads),
+        ('mmu+switch', banked, switchingReads),
+    ]:
+        secs = min(timeit.repeat(lambda: access(mem, addrs), number=1,
+                                 repeat=NUM_RUNS))
+        print("%-12s %6.1f ns/access" % (name, secs * 1e9 / NUM_ACCESSES))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+from pygme.cpu import jit
+from pygme.memory.iomem import DIV, TAC
+
+# The most instructions that are translated into one block.
+MAX_BLOCK_INSTRS = 16
+
+# The opcodes that end a block: those that jump, call or return, those after
+# which run() may need to look at interrupts, HALT or idle loops, and those
+# that are not instructions.
+BLOCK_ENDS = frozenset([
+    0x10, 0x18, 0x20, 0x28, 0x30, 0x38, 0x76,
+    0xc0, 0xc2, 0xc3, 0xc4, 0xc7, 0xc8, 0xc9, 0xca, 0xcc, 0xcd, 0xcf,
+    0xd0, 0xd2, 0xd4, 0xd7, 0xd8, 0xd9, 0xda, 0xdc, 0xdf,
+    0xe7, 0xe9, 0xef, 0xf3, 0xf7, 0xfb, 0xff,
+    0xd3, 0xdb, 0xdd, 0xe3, 0xe4, 0xeb, 0xec, 0xed, 0xf2, 0xf4, 0xfc, 0xfd,
+])
+
+# Writes to these ranges switch the ROM bank mapped into 0x4000-0x7FFF, and,
+# above 0x4000, may also switch the bank mapped into 0x0000-0x3FFF.
+BANK_SWITCH_START = 0x2000
+BANK_SWITCH_END = 0x7fff
+
+# Writes below RAM_ENABLE_END enable or disable cartridge RAM, and writes to
+# RAM_SWITCH_START-RAM_SWITCH_END may switch the bank of it that is mapped
+# into CART_RAM_START-CART_RAM_END.
+RAM_ENABLE_END = 0x1fff
+RAM_SWITCH_START = 0x4000
+RAM_SWITCH_END = 0x7fff
+CART_RAM_START = 0xa000
+CART_RAM_END = 0xbfff
+
+
+def _accessesTimer(opc, args):
+    """
+    Returns whether the instruction opc with the operands args reads or
+    writes a timer register at a fixed address.
+    """
+    if opc in (0xe0, 0xf0):
+        addr = 0xff00 + args[0]
+    elif opc in (0xea, 0xfa):
+        addr = args[1] << 8 | args[0]
+    else:
+        return False
+    return DIV <= addr <= TAC
+
+
+class BlockCache(dict):
+    """
+    The BlockCache class maps addresses to functions that execute the block
+    of instructions starting there, and returns the cycles taken.
+
+    A block is a straight-line run of instructions that ends after the first
+    jump, call, return or instruction in BLOCK_ENDS. It is translated, the
+    first time its address is looked up, into the source of a function that
+    calls the function of each instruction in turn with its operands already
+    decoded, and that is compiled with compile(). Only the last instruction
+    can read PC, so PC is only moved before it.
+
+    If hotCount is set, a block that is run hotCount times is compiled
+    again by jit.blockSource(), which keeps the registers in local variables
+    and inlines the instructions that it supports. If the memory has view(),
+    as Array does, the compiled block reads it by indexing a view of it
+    rather than calling get8(); writes always go through set8(), so that
+    watches see them.
+
+    A block also ends before an instruction that reads or writes a timer
+    register at a fixed address, so that Z80.elapsed() is exact when the
+    register is accessed. Accesses through HL or C see the time at the
+    start of their block.
+
+    Blocks are invalidated by watching writes to the pages of memory that
+    hold them. A write to a byte of a block drops that block, and a write to
+    the bank controller drops the blocks in banked ROM. A block that writes
+    to itself will run to its end before the change is seen. Writes to the
+    bank controller that enable, disable or switch cartridge RAM drop the
+    blocks in it.
+    """
+
+    def __init__(self, ops, regs, mem, hotCount=0):
+        """
+        ops is the dispatch table of a Z80, and regs is the RegFile that its
+        instructions use.
+        """
+        dict.__init__(self)
+        self._ops = ops
+        self._regs = regs
+        self._mem = mem
+        self._hotCount = hotCount
+        self._env = {'r': regs, 'mem': mem, 'get8': mem.get8,
+                     'hot': self._compileHot}
+        if hasattr(mem, 'view'):
+            self._env['data'] = mem.view(0, mem.size())
+            self._read = 'data[%s]'
+        else:
+            self._read = 'get8(%s)'
+        # The addresses of the blocks that contain each address, and the
+        # extent of each block.
+        self._code = {}
+        self._extents = {}
+        # The addresses of the blocks in cartridge RAM.
+        self._ramBlocks = set()
+        self._watched = set()
+
+    def __missing__(self, addr):
+        block = self._translate(addr)
+        self[addr] = block
+        return block
+
+    def _decode(self, start):
+        """
+        Returns the instructions of the block at start as a list of
+        (opcode, operands, function) triples, with the address that follows
+        the block and the cycles it takes.
+        """
+        get8 = self._mem.get8
+        ops = self._ops
+        instrs = []
+        time = 0
+        addr = start
+        for i in range(0, MAX_BLOCK_INSTRS):
+            opc = get8(addr & 0xffff)
+            size = 1
+            if opc == 0xcb:
+                opc = 0x100 | get8((addr + 1) & 0xffff)
+                size = 2
+            func, t, argc = ops[opc]
+            args = [get8((addr + size + j) & 0xffff) for j in range(0, argc)]
+            if instrs and _accessesTimer(opc, args):
+                break
+            instrs.append((opc, args, func))
+            addr += size + argc
+            time += t
+            if opc in BLOCK_ENDS:
+                break
+        return instrs, addr, time
+
+    def _translate(self, start):
+        """
+        Returns a function that executes the block starting at start, and
+        records the addresses it covers.
+        """
+        instrs, end, time = self._decode(start)
+        env = dict(self._env)
+        calls = []
+        for i, (opc, args, func) in enumerate(instrs):
+            name = 'f%d' % i
+            env[name] = func
+            calls.append('%s(%s)' %
+                         (name, ', '.join('0x%02x' % n for n in args)))
+        lines = calls[:-1] + ['r.pc = 0x%04x' % (end & 0xffff), calls[-1],
+                              'return %d' % time]
+        if self._hotCount:
+            env['count'] = [self._hotCount]
+            lines = ['count[0] -= 1',
+                     'if not count[0]:',
+                     '    hot(0x%04x)' % start] + lines
+        source = 'def block():\n' + ''.join('    %s\n' % l for l in lines)
+        self._record(start, end)
+        return self._compile(source, start, env)
+
+    def _compileHot(self, start):
+        """Replaces the block at start with one compiled by the JIT."""
+        if start not in self._extents:
+            return
+        instrs, end, time = self._decode(start)
+        env = dict(self._env)
+        named = []
+        for i, (opc, args, func) in enumerate(instrs):
+            name = 'f%d' % i
+            env[name] = func
+            named.append((opc, args, name))
+        source = jit.blockSource(named, end & 0xffff, time,
+                                 lambda addr: self._read % addr)
+        self[start] = self._compile(source, start, env)
+
+    def _compile(self, source, start, env):
+        exec(compile(source, '<block 0x%04x>' % start, 'exec'), env)
+        return env['block']
+
+    def _record(self, start, end):
+        self._extents[start] = (start, end)
+        if CART_RAM_START <= start <= CART_RAM_END:
+            self._ramBlocks.add(start)
+        for addr in range(start, end):
+            self._code.setdefault(addr & 0xffff, set()).add(start)
+        pages = set()
+        for page in range((start & 0xffff) >> 12, ((end - 1) >> 12) + 1):
+            page &= 0xf
+            if page < 0x8 or CART_RAM_START <= page << 12 <= CART_RAM_END:
+                # The whole of ROM is watched, to see bank switches, which
+                # also switch cartridge RAM.
+                pages.add(0)
+            if page >= 0x8:
+                pages.add(page)
+        for page in pages:
+            if page not in self._watched:
+                self._watched.add(page)
+                last = 0x7fff if page == 0 else (page << 12) | 0xfff
+                self._mem.watch(page << 12, last, self._written)
+
+    def _drop(self, start):
+        if start not in self._extents:
+            return
+        begin, end = self._extents.pop(start)
+        self._ramBlocks.discard(start)
+        del self[start]
+        for addr in range(begin, end):
+            self._code[addr & 0xffff].discard(start)
+
+    def _written(self, addr, val):
+        if BANK_SWITCH_START <= addr <= BANK_SWITCH_END:
+            low = 0x0000 if addr >= 0x4000 else 0x4000
+            for start, (begin, end) in list(self._extents.items()):
+                if begin < 0x8000 and end > low:
+                    self._drop(start)
+        if self._ramBlocks and (addr <= RAM_ENABLE_END or
+                                RAM_SWITCH_START <= addr <= RAM_SWITCH_END):
+            for start in list(self._ramBlocks):
+                self._drop(start)
+        starts = self._code.get(addr)
+        if starts:
+            for start in list(starts):
+                self._drop(start)
@@ -0,0 +1,222 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import re
+
+from pygme.cpu.regfile import FLAG_N
+
+# The RegFile attributes that are held in local variables of the same names
+# by a compiled block.
+VARS = ['a', 'b', 'c', 'd', 'e', 'h', 'l', 'sp', 'fres', 'fhalf', 'fneg']
+
+_VAR_RE = re.compile(r'(?<![.\w])(%s)\b' % '|'.join(VARS))
+
+# The registers encoded by the 3-bit register fields of opcodes, where None
+# is the byte addressed by HL.
+_R = ['b', 'c', 'd', 'e', 'h', 'l', None, 'a']
+
+_HL = 'h << 8 | l'
+
+# The register pairs encoded by the 2-bit fields of 16-bit opcodes.
+_RR = [('b', 'c'), ('d', 'e'), ('h', 'l'), None]
+
+
+def _reads(source):
+    """Returns the set of VARS read by source."""
+    return set(_VAR_RE.findall(source))
+
+
+def _inc8(v, delta, neg):
+    return [('fhalf', '%s ^ 1' % v),
+            (v, '(%s %s 1) & 0xff' % (v, delta)),
+            ('fres', '%s | (fres & 0x100)' % v),
+            ('fneg', neg)]
+
+
+def _incDec8(opc, rd):
+    delta, neg = ('+', '0') if opc & 1 == 0 else ('-', '0x%02x' % FLAG_N)
+    reg = _R[opc >> 3 & 7]
+    if reg is not None:
+        return _inc8(reg, delta, neg)
+    return ([('t', _HL), ('v', rd('t'))] + _inc8('v', delta, neg) +
+            [(None, 'mem.set8(t, v)')])
+
+
+def _incDec16(opc):
+    pair = _RR[opc >> 4]
+    if opc & 0x08:
+        delta, wrap = '-', '0xff'
+    else:
+        delta, wrap = '+', '0'
+    if pair is None:
+        return [('sp', '(sp %s 1) & 0xffff' % delta)]
+    hi, lo = pair
+    return [(lo, '(%s %s 1) & 0xff' % (lo, delta)),
+            (hi, '(%s %s 1) & 0xff if %s == %s else %s' %
+             (hi, delta, lo, wrap, hi))]
+
+
+def _alu(op, v):
+    """Returns the lines of the ALU operation op on A and v."""
+    if op in (0, 1, 2, 3):
+        sign = '+' if op < 2 else '-'
+        carry = ' %s ((fres >> 8) & 1)' % sign if op & 1 else ''
+        return [('t', 'a %s %s%s' % (sign, v, carry)),
+                ('fhalf', 'a ^ %s' % v),
+                ('a', 't & 0xff'),
+                ('fres', 't'),
+                ('fneg', '0' if op < 2 else '0x%02x' % FLAG_N)]
+    if op == 7:
+        return [('fres', 'a - %s' % v),
+                ('fhalf', 'a ^ %s' % v),
+                ('fneg', '0x%02x' % FLAG_N)]
+    sym = {4: '&', 5: '^', 6: '|'}[op]
+    return [('a', 'a %s %s' % (sym, v)),
+            ('fres', 'a'),
+            ('fhalf', 'a ^ 0x10' if op == 4 else 'a'),
+            ('fneg', '0')]
+
+
+def _addHL(opc):
+    pair = _RR[opc >> 4]
+    rr = 'sp' if pair is None else '%s << 8 | %s' % pair
+    return [('t', _HL),
+            ('v', rr),
+            ('u', 't + v'),
+            ('h', '(u >> 8) & 0xff'),
+            ('l', 'u & 0xff'),
+            ('fres', '(1 if fres & 0xff else 0) | '
+                     '(0x100 if u > 0xffff else 0)'),
+            ('fhalf', 'fres ^ (0x10 if (t & 0xfff) + (v & 0xfff) > 0xfff '
+                      'else 0)'),
+            ('fneg', '0')]
+
+
+def _ldiHL(opc, rd):
+    delta = '+' if opc < 0x30 else '-'
+    if opc & 0x08:
+        lines = [('a', rd(_HL))]
+    else:
+        lines = [(None, 'mem.set8(%s, a)' % _HL)]
+    return lines + [('t', '((%s) %s 1) & 0xffff' % (_HL, delta)),
+                    ('h', 't >> 8'),
+                    ('l', 't & 0xff')]
+
+
+def instrLines(opc, args, rd):
+    """
+    Returns the lines of Python that execute the instruction opc with the
+    operands args as (target, expression) pairs, where target is the local
+    assigned, or None if expression is a statement. rd(addr) gives the
+    expression that reads the byte at addr. Returns None if the instruction
+    is not supported.
+    """
+    if opc > 0xff:
+        # No 0xCB-prefixed instruction is supported.
+        return None
+    if opc == 0x00:
+        return []
+    if 0x40 <= opc <= 0x7f and opc != 0x76:
+        dst = _R[opc >> 3 & 7]
+        src = _R[opc & 7]
+        if src is None:
+            return [(dst, rd(_HL))]
+        if dst is None:
+            return [(None, 'mem.set8(%s, %s)' % (_HL, src))]
+        return [] if dst == src else [(dst, src)]
+    if opc < 0x40 and opc & 0xc7 == 0x06:
+        dst = _R[opc >> 3]
+        if dst is None:
+            return [(None, 'mem.set8(%s, 0x%02x)' % (_HL, args[0]))]
+        return [(dst, '0x%02x' % args[0])]
+    if opc < 0x40 and opc & 0xc6 == 0x04:
+        return _incDec8(opc, rd)
+    if opc < 0x40 and opc & 0x07 == 0x03:
+        return _incDec16(opc)
+    if opc < 0x40 and opc & 0xcf == 0x01:
+        pair = _RR[opc >> 4]
+        if pair is None:
+            return [('sp', '0x%04x' % (args[1] << 8 | args[0]))]
+        return [(pair[0], '0x%02x' % args[1]), (pair[1], '0x%02x' % args[0])]
+    if opc < 0x40 and opc & 0xcf == 0x09:
+        return _addHL(opc)
+    if opc in (0x02, 0x12):
+        return [(None, 'mem.set8(%s << 8 | %s, a)' % _RR[opc >> 4])]
+    if opc in (0x0a, 0x1a):
+        return [('a', rd('%s << 8 | %s' % _RR[opc >> 4]))]
+    if opc in (0x22, 0x2a, 0x32, 0x3a):
+        return _ldiHL(opc, rd)
+    if 0x80 <= opc <= 0xbf:
+        src = _R[opc & 7]
+        if src is None:
+            return [('v', rd(_HL))] + _alu(opc >> 3 & 7, 'v')
+        return _alu(opc >> 3 & 7, src)
+    if opc >= 0xc0 and opc & 0xc7 == 0xc6:
+        return _alu(opc >> 3 & 7, '0x%02x' % args[0])
+    if opc == 0xe0:
+        return [(None, 'mem.set8(0x%04x, a)' % (0xff00 + args[0]))]
+    if opc == 0xf0:
+        return [('a', rd('0x%04x' % (0xff00 + args[0])))]
+    if opc == 0xea:
+        return [(None, 'mem.set8(0x%04x, a)' % (args[1] << 8 | args[0]))]
+    if opc == 0xfa:
+        return [('a', rd('0x%04x' % (args[1] << 8 | args[0])))]
+    return None
+
+
+def _eliminateDeadStores(lines):
+    """
+    Removes the lines that assign a local in VARS that is assigned again
+    before it is read, so that, e.g., flags are only computed where an
+    instruction or the end of the block consumes them.
+    """
+    live = set()
+    kept = []
+    for target, source in reversed(lines):
+        if target in VARS:
+            if target not in live:
+                continue
+            live.discard(target)
+        live |= _reads(source)
+        kept.append((target, source))
+    kept.reverse()
+    return kept
+
+
+def blockSource(instrs, end, time, rd):
+    """
+    Returns the source of a function named block that executes instrs, a
+    list of (opcode, operands, function name) triples ending at end, and
+    returns time.
+
+    The registers and flags are held in local variables. Instructions that
+    instrLines() does not support are executed by calling the function of
+    the given name with the registers stored back to r around the call, and
+    PC is set before the last instruction, which can read it.
+    """
+    lines = [(var, 'r.%s' % var) for var in VARS]
+    dirty = set()
+
+    def spill():
+        lines.extend((None, 'r.%s = %s' % (var, var))
+                     for var in VARS if var in dirty)
+        dirty.clear()
+
+    for i, (opc, args, name) in enumerate(instrs):
+        if i == len(instrs) - 1:
+            lines.append((None, 'r.pc = 0x%04x' % end))
+        instr = instrLines(opc, args, rd)
+        if instr is None:
+            spill()
+            lines.append((None, '%s(%s)' %
+                          (name, ', '.join('0x%02x' % n for n in args))))
+            lines.extend((var, 'r.%s' % var) for var in VARS)
+        else:
+            lines.extend(instr)
+            dirty.update(t for t, _ in instr if t in VARS)
+    spill()
+    lines = _eliminateDeadStores(lines)
+    body = ['%s = %s' % line if line[0] else line[1] for line in lines]
+    body.append('return %d' % time)
+    return 'def block():\n' + ''.join('    %s\n' % l for l in body)
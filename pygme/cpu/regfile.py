@@ -0,0 +1,126 @@
+# Copyright 2013 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+# The bits of F that hold each flag.
+FLAG_Z = 0x80
+FLAG_N = 0x40
+FLAG_H = 0x20
+FLAG_C = 0x10
+
+
+class RegFile(object):
+    """
+    The RegFile class stores the registers of a Z80 as plain integers.
+
+    The attributes of a RegFile are read and written directly by the CPU, so
+    writes to them are not range-checked; Reg8View, Reg16View and FlagView
+    provide the checked, object-per-register interface on top of it.
+
+    The flags are evaluated lazily. Instead of computing Z, N, H and C after
+    every instruction, the CPU records the unmasked result of the last
+    operation in fres, a value whose bit 4 differs from that of fres exactly
+    when H is set in fhalf, and N in fneg:
+
+        Z is set if the low byte of fres is 0,
+        N is fneg,
+        H is bit 4 of fhalf ^ fres, and
+        C is bit 8 of fres.
+
+    Conditional jumps read Z and C straight from fres, and the F byte itself
+    is only assembled when f is read, e.g. by PUSH AF or a FlagView.
+    """
+
+    __slots__ = ['a', 'b', 'c', 'd', 'e', 'h', 'l', 'sp', 'pc',
+                 'fres', 'fhalf', 'fneg']
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+        self.f = 0
+
+    def _getF(self):
+        res = self.fres
+        return ((0 if res & 0xff else FLAG_Z) | self.fneg |
+                ((self.fhalf ^ res) & 0x10) << 1 | (res & 0x100) >> 4)
+
+    def _setF(self, f):
+        res = (0 if f & FLAG_Z else 1) | (0x100 if f & FLAG_C else 0)
+        self.fres = res
+        self.fhalf = res ^ (0x10 if f & FLAG_H else 0)
+        self.fneg = f & FLAG_N
+
+    f = property(_getF, _setF)
+
+
+class Reg8View(object):
+    """An 8-bit register, stored as the attribute attr of a RegFile."""
+
+    def __init__(self, regs, name, attr, val):
+        self._regs = regs
+        self._name = name
+        self._attr = attr
+        self.ld(val)
+
+    def name(self):
+        return self._name
+
+    def val(self):
+        return getattr(self._regs, self._attr)
+
+    def ld(self, n):
+        if n < 0 or n > 0xff:
+            raise ValueError("Cannot assign 0x%x(%d) to 8-bit register '%s'" %
+                             (n, n, self.name()))
+        setattr(self._regs, self._attr, n)
+
+
+class Reg16View(object):
+    """A 16-bit register, stored as the attribute attr of a RegFile."""
+
+    def __init__(self, regs, name, attr, val):
+        self._regs = regs
+        self._name = name
+        self._attr = attr
+        self.ld(val)
+
+    def name(self):
+        return self._name
+
+    def val(self):
+        return getattr(self._regs, self._attr)
+
+    def ld(self, n):
+        if n < 0 or n > 0xffff:
+            raise ValueError("Cannot assign 0x%x(%d) to 16-bit register '%s'" %
+                             (n, n, self.name()))
+        setattr(self._regs, self._attr, n)
+
+
+class FlagView(object):
+    """A flag, stored as the bits in mask of the F attribute of a RegFile."""
+
+    def __init__(self, regs, name, mask):
+        self._regs = regs
+        self._name = name
+        self._mask = mask
+
+    def name(self):
+        return self._name
+
+    def val(self):
+        return self._regs.f & self._mask != 0
+
+    def set(self):
+        self._regs.f |= self._mask
+
+    def reset(self):
+        self._regs.f &= ~self._mask
+
+    def setTo(self, val):
+        if not isinstance(val, bool):
+            raise ValueError("'val' must be 'bool', got '%s'" % type(val))
+        if val:
+            self.set()
+        else:
+            self.reset()
@@ -0,0 +1,134 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import unittest
+
+from pygme.cpu import z80
+from pygme.memory import array
+from pygme.memory import iomem
+from pygme.memory import mmu
+from pygme.memory.test.test_mmu import MockROM
+
+# ld hl, 0xc000; ld b, 4; ld a, (hl+); add a, b; dec b; jr nz, -5; ld c, a;
+# halt
+COPY_LOOP = [0x21, 0x00, 0xc0, 0x06, 0x04, 0x2a, 0x80, 0x05, 0x20, 0xfb,
+             0x4f, 0x76]
+
+
+class TestBlockCache(unittest.TestCase):
+
+    def setUp(self):
+        self.mem = array.Array(1 << 16)
+        self.z80 = z80.Z80(self.mem, useBlocks=True)
+
+    def test_run_matchesInterpreter(self):
+        interp = z80.Z80(array.Array(1 << 16))
+        for cpu in [self.z80, interp]:
+            cpu.pc.ld(0x0100)
+            for i, b in enumerate(COPY_LOOP):
+                cpu._mem.set8(0x0100 + i, b)
+            for i in range(0, 4):
+                cpu._mem.set8(0xc000 + i, 0x10 * i)
+        self.assertEquals(self.z80.run(1000), interp.run(1000))
+        for reg in ['a', 'b', 'c', 'h', 'l', 'pc', 'sp']:
+            self.assertEquals(getattr(self.z80, reg).val(),
+                              getattr(interp, reg).val())
+        self.assertEquals(self.z80.c.val(), 0x30 + 1)
+
+    def test_block_endsAtJump(self):
+        self._load(0x0100, COPY_LOOP)
+        block = self.z80._blocks[0x0100]
+        # ld hl, nn; ld b, n; ld a, (hl+); add a, b; dec b; jr nz, n
+        self.assertEquals(block(), 12 + 8 + 8 + 4 + 4 + 8)
+        self.assertEquals(self.z80._blocks._extents[0x0100], (0x0100, 0x010a))
+        self.assertEquals(self.z80.pc.val(), 0x0105)
+
+    def test_block_endsBeforeTimerAccess(self):
+        # nop; nop; ldh a, (TIMA); halt
+        self._load(0x0100, [0x00, 0x00, 0xf0, 0x05, 0x76])
+        self.z80._blocks[0x0100]
+        self.assertEquals(self.z80._blocks._extents[0x0100], (0x0100, 0x0102))
+
+    def test_run_elapsedIsExactAtTimerAccess(self):
+        mem = iomem.IOMemory(self.mem)
+        cpu = z80.Z80(mem, useBlocks=True)
+        times = []
+        mem.mapRegister(iomem.TIMA, lambda: times.append(cpu.elapsed()) or 0,
+                        None)
+        # nop; nop; ldh a, (TIMA); halt
+        self._load(0x0100, [0x00, 0x00, 0xf0, 0x05, 0x76])
+        cpu.pc.ld(0x0100)
+        mem.set8(iomem.IE, 0x00)
+        cpu.run(16)
+        self.assertEquals(times, [8])
+        self.assertEquals(cpu.elapsed(), 0)
+
+    def test_run_eiHaltWithPendingIntr(self):
+        # ei; halt; inc b, with reti as the VBLANK handler.
+        self._load(0x0100, [0xfb, 0x76, 0x04, 0x76])
+        self.mem.set8(0x0040, 0xd9)
+        self.mem.set8(0xffff, 0x01)
+        self.mem.set8(0xff0f, 0x01)
+        self.z80.sp.ld(0xfffe)
+        self.z80.b.ld(0)
+        self.z80.run(200)
+        self.assertEquals(self.z80.b.val(), 1)
+        self.assertEquals(self.z80.pc.val(), 0x0104)
+
+    def test_write_invalidatesBlock(self):
+        # inc a; inc a; halt
+        self._load(0xc000, [0x3c, 0x3c, 0x76])
+        self.z80.a.ld(0)
+        self.z80._blocks[0xc000]()
+        self.assertEquals(self.z80.a.val(), 2)
+        # dec a
+        self.mem.set8(0xc001, 0x3d)
+        self.assertFalse(0xc000 in self.z80._blocks)
+        self.z80._blocks[0xc000]()
+        self.assertEquals(self.z80.a.val(), 2)
+
+    def test_bankSwitch_invalidatesROMBlocks(self):
+        self._load(0x4000, [0x00, 0x76])
+        self._load(0x0100, [0x00, 0x76])
+        self._load(0xc000, [0x00, 0x76])
+        for addr in [0x4000, 0x0100, 0xc000]:
+            self.z80._blocks[addr]
+        self.mem.set8(0x2000, 0x02)
+        self.assertEquals(sorted(self.z80._blocks), [0x0100, 0xc000])
+        self.z80._blocks[0x4000]
+        self.mem.set8(0x4000, 0x00)
+        self.assertEquals(sorted(self.z80._blocks), [0xc000])
+
+    def test_ramBankSwitch_invalidatesRAMBlocks(self):
+        # An MBC5 cartridge with 4 RAM banks.
+        m = mmu.MMU(MockROM(4, cartType=0x19, ramSize=0x03))
+        cpu = z80.Z80(m, useBlocks=True)
+        m.set8(0x0000, 0x0a)
+        # ld a, n; halt
+        for bank, n in [(1, 0x07), (0, 0x05)]:
+            m.set8(0x4000, bank)
+            for i, b in enumerate([0x3e, n, 0x76]):
+                m.set8(0xa000 + i, b)
+        cpu._blocks[0xa000]()
+        self.assertEquals(cpu.a.val(), 0x05)
+        cpu._blocks[0xc000]
+        m.set8(0x4000, 1)
+        self.assertEquals(sorted(cpu._blocks), [0xc000])
+        cpu._blocks[0xa000]()
+        self.assertEquals(cpu.a.val(), 0x07)
+        m.set8(0x0000, 0x00)
+        self.assertEquals(sorted(cpu._blocks), [0xc000])
+
+    def _load(self, addr, bytes_):
+        self.z80.pc.ld(addr)
+        for i, b in enumerate(bytes_):
+            self.mem.set8(addr + i, b)
+
+    def tearDown(self):
+        self.mem = None
+        self.z80 = None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import random
+import unittest
+
+from pygme.cpu import blocks
+from pygme.cpu import jit
+from pygme.cpu import z80
+from pygme.memory import array
+
+NUM_PROGRAMS = 200
+
+# The fraction of the instructions of a random block that are prefixed by
+# 0xCB.
+CB_RATIO = 0.3
+
+# The opcodes that may appear in the middle of a random block.
+BODY_OPS = [opc for opc in range(0, 0x100)
+            if opc not in blocks.BLOCK_ENDS and opc != 0x08]
+
+# jr nz, n; ret; halt; jp nn
+END_OPS = [0x20, 0xc9, 0x76, 0xc3]
+
+REGS = ['a', 'b', 'c', 'd', 'e', 'h', 'l', 'sp']
+
+
+class TestJIT(unittest.TestCase):
+
+    def setUp(self):
+        self.z80 = z80.Z80(array.Array(1 << 16))
+        self.rand = random.Random(0)
+        self.data = bytearray(self.rand.getrandbits(8)
+                              for _ in range(0, 1 << 16))
+
+    def test_blockSource_matchesBlock(self):
+        for _ in range(0, NUM_PROGRAMS):
+            self._assertCompiledMatches(self._program())
+
+    def test_blockSource_matchesBlockWithSetMemHL(self):
+        # set 0, (hl); set 1, (hl); ...; set 7, (hl); halt
+        code = []
+        for opc in range(0xc6, 0x100, 0x08):
+            code += [0xcb, opc]
+        self._assertCompiledMatches(code + [0x76])
+
+    def test_run_compilesHotBlocksWithCBOps(self):
+        # ld hl, 0xc000; set 0, (hl); dec b; jr nz, -5; halt
+        code = [0x21, 0x00, 0xc0, 0xcb, 0xc6, 0x05, 0x20, 0xfb, 0x76]
+        cpu = self._cpu(code, hotCount=4)
+        cpu.b.ld(10)
+        cpu.run(1000)
+        self.assertEquals(cpu.b.val(), 0)
+        self.assertEquals(cpu.pc.val(), 0x0109)
+
+    def test_blockSource_eliminatesDeadFlags(self):
+        # inc a; cp 3; halt
+        source = jit.blockSource([(0x3c, [], 'f0'), (0xfe, [3], 'f1'),
+                                  (0x76, [], 'f2')], 0x0104, 16,
+                                 lambda addr: 'data[%s]' % addr)
+        self.assertFalse('fres = r.fres' in source)
+        self.assertEquals(source.count('    fres = '), 1)
+        self.assertFalse('b = r.b' in source)
+
+    def test_run_compilesHotBlocks(self):
+        # ld b, 0; ld a, (hl+); add a, b; dec b; jr nz, -5; halt
+        code = [0x06, 0x00, 0x2a, 0x80, 0x05, 0x20, 0xfb, 0x76]
+        cpu = self._cpu(code, hotCount=4)
+        interp = self._cpu(code)
+        interp._blocks = None
+        for c in [cpu, interp]:
+            c.h.ld(0xc0)
+            c.l.ld(0x00)
+            c.run(20000)
+        self.assertTrue('b' in cpu._blocks[0x0102].__code__.co_varnames)
+        for reg in REGS + ['pc']:
+            self.assertEquals(getattr(cpu, reg).val(),
+                              getattr(interp, reg).val(), reg)
+        self.assertEquals(cpu._r.f, interp._r.f)
+
+    def _assertCompiledMatches(self, code):
+        """
+        Asserts that the block at 0x0100 of code runs the same when it is
+        compiled by the JIT.
+        """
+        cpus = [self._cpu(code) for _ in range(0, 2)]
+        first = cpus[1]._blocks[0x0100]
+        cpus[1]._blocks._compileHot(0x0100)
+        self.assertFalse(cpus[1]._blocks[0x0100] is first)
+        self.assertEquals(
+            cpus[1]._blocks[0x0100].__code__.co_filename, '<block 0x0100>')
+        times = [cpu._blocks[0x0100]() for cpu in cpus]
+        self.assertEquals(times[0], times[1])
+        for reg in REGS + ['pc']:
+            self.assertEquals(getattr(cpus[0], reg).val(),
+                              getattr(cpus[1], reg).val(), reg)
+        self.assertEquals(cpus[0]._r.f, cpus[1]._r.f)
+        self.assertEquals(cpus[0]._mem.view(0, 1 << 16).tobytes(),
+                          cpus[1]._mem.view(0, 1 << 16).tobytes())
+
+    def _program(self):
+        """
+        Returns the bytes of a random block at 0x0100, about a third of
+        whose instructions are prefixed by 0xCB.
+        """
+        rand = self.rand
+        code = []
+        for _ in range(0, blocks.MAX_BLOCK_INSTRS - 1):
+            opc = 0xcb if rand.random() < CB_RATIO else rand.choice(BODY_OPS)
+            code.append(opc)
+            if opc == 0xcb:
+                code.append(rand.getrandbits(8))
+            else:
+                argc = self.z80.instr_argc(opc)
+                code += [rand.getrandbits(8) for _ in range(0, argc)]
+        return code + [rand.choice(END_OPS), 0x34, 0x12]
+
+    def _cpu(self, code, hotCount=0):
+        mem = array.Array(1 << 16)
+        mem.load(0, self.data)
+        mem.load(0x0100, bytearray(code))
+        # No interrupts are enabled, so that HALT lasts.
+        mem.set8(0xffff, 0x00)
+        cpu = z80.Z80(mem, useBlocks=True, hotCount=hotCount)
+        rand = random.Random(len(code))
+        for reg in REGS:
+            getattr(cpu, reg).ld(rand.getrandbits(16 if reg == 'sp' else 8))
+        cpu._r.f = rand.getrandbits(8) & 0xf0
+        cpu.pc.ld(0x0100)
+        return cpu
+
+    def tearDown(self):
+        self.z80 = None
+        self.rand = None
+        self.data = None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# Copyright 2013 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import unittest
+
+from pygme.cpu import regfile
+
+
+class TestRegFile(unittest.TestCase):
+
+    def setUp(self):
+        self.regs = regfile.RegFile()
+
+    def test_reg8View_sharesStorage(self):
+        reg = regfile.Reg8View(self.regs, "B", 'b', 0x12)
+        self.assertEquals(self.regs.b, 0x12)
+        self.regs.b = 0x34
+        self.assertEquals(reg.val(), 0x34)
+        self.assertEquals(reg.name(), "B")
+
+    def test_reg8View_rejectsOutOfRange(self):
+        reg = regfile.Reg8View(self.regs, "B", 'b', 0)
+        reg.ld(0xff)
+        with self.assertRaises(ValueError):
+            reg.ld(0x100)
+        with self.assertRaises(ValueError):
+            reg.ld(-1)
+        self.assertEquals(self.regs.b, 0xff)
+
+    def test_reg16View_rejectsOutOfRange(self):
+        reg = regfile.Reg16View(self.regs, "SP", 'sp', 0)
+        reg.ld(0xffff)
+        with self.assertRaises(ValueError):
+            reg.ld(0x10000)
+        with self.assertRaises(ValueError):
+            reg.ld(-1)
+        self.assertEquals(self.regs.sp, 0xffff)
+
+    def test_flagViews_arePackedIntoF(self):
+        z = regfile.FlagView(self.regs, "Z", regfile.FLAG_Z)
+        c = regfile.FlagView(self.regs, "C", regfile.FLAG_C)
+        z.set()
+        c.setTo(True)
+        self.assertEquals(self.regs.f, 0x90)
+        z.reset()
+        self.assertEquals(self.regs.f, 0x10)
+        self.assertFalse(z.val())
+        self.assertTrue(c.val())
+        with self.assertRaises(ValueError):
+            c.setTo(1)
+
+    def test_f_roundTrips(self):
+        for f in range(0, 0x100, 0x10):
+            self.regs.f = f
+            self.assertEquals(self.regs.f, f)
+
+    def test_f_ignoresLowNibble(self):
+        self.regs.f = 0xff
+        self.assertEquals(self.regs.f, 0xf0)
+
+    def test_f_isEvaluatedFromLastResult(self):
+        # 0x0f + 0xf1 = 0x100
+        self.regs.fres = 0x0f + 0xf1
+        self.regs.fhalf = 0x0f ^ 0xf1
+        self.regs.fneg = 0
+        self.assertEquals(self.regs.f,
+                          regfile.FLAG_Z | regfile.FLAG_H | regfile.FLAG_C)
+        # 0x10 - 0x20 = -0x10
+        self.regs.fres = 0x10 - 0x20
+        self.regs.fhalf = 0x10 ^ 0x20
+        self.regs.fneg = regfile.FLAG_N
+        self.assertEquals(self.regs.f, regfile.FLAG_N | regfile.FLAG_C)
+
+    def tearDown(self):
+        self.regs = None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@ import unittest
 
 from pygme.cpu import z80
 from pygme.memory import array
+from pygme.memory import iomem
 
 
 class TestZ80(unittest.TestCase):
@@ -519,6 +520,36 @@ class TestZ80(unittest.TestCase):
         opc = 0x27
         self._validOpc(opc, self.z80.daa, 0)
 
+    def test_daa_afterAdd(self):
+        for a, n, result, c in [(0x15, 0x27, 0x42, False),
+                                (0x19, 0x01, 0x20, False),
+                                (0x99, 0x01, 0x00, True),
+                                (0x58, 0x46, 0x04, True),
+                                ]:
+            self.z80.a.ld(a)
+            self.z80.addAn(n)
+            self._runOp(0x27)
+            self._regEq(self.z80.a, result)
+            self._flagEq(self.z80.f.z, result == 0)
+            self._flagEq(self.z80.f.n, False)
+            self._flagEq(self.z80.f.h, False)
+            self._flagEq(self.z80.f.c, c)
+
+    def test_daa_afterSub(self):
+        for a, n, result, c in [(0x42, 0x15, 0x27, False),
+                                (0x20, 0x01, 0x19, False),
+                                (0x00, 0x01, 0x99, True),
+                                (0x15, 0x15, 0x00, False),
+                                ]:
+            self.z80.a.ld(a)
+            self.z80.subAn(n)
+            self._runOp(0x27)
+            self._regEq(self.z80.a, result)
+            self._flagEq(self.z80.f.z, result == 0)
+            self._flagEq(self.z80.f.n, True)
+            self._flagEq(self.z80.f.h, False)
+            self._flagEq(self.z80.f.c, c)
+
     def test_jrZn(self):
         opc = 0x28
         self._validOpc(opc, self.z80.jrZn, 1)
@@ -2780,9 +2811,39 @@ class TestZ80(unittest.TestCase):
         opc = 0xfb
         self._validOpc(opc, self.z80.ei, 0)
         for i in range(0, self.NUM_TESTS):
-            self.z80.intsEnabled = i % 2 == 0
+            self.z80.intsEnabled = False
             self._flagsFixed(opc)
-            self.assertTrue(self.z80.intsEnabled)
+            self.assertFalse(self.z80.intsEnabled)
+
+    def test_ei_takesEffectAfterNextInstr(self):
+        self._load(0x0100, [0xfb, 0x00, 0x00])
+        self.mem.set8(0xffff, 0x00)
+        self.z80.intsEnabled = False
+        self.z80.step()
+        self.assertFalse(self.z80.intsEnabled)
+        self.z80.step()
+        self.assertTrue(self.z80.intsEnabled)
+
+    def test_ei_cancelledByDi(self):
+        self._load(0x0100, [0xfb, 0xf3, 0x00])
+        self.mem.set8(0xffff, 0x01)
+        self.mem.set8(0xff0f, 0x01)
+        self.z80.intsEnabled = False
+        self.assertEquals(self.z80.run(12), 12)
+        self.assertFalse(self.z80.intsEnabled)
+        self._regEq(self.z80.pc, 0x0103)
+
+    def test_ei_haltWithPendingIntr(self):
+        # ei; halt; inc b, with reti as the VBLANK handler.
+        self._load(0x0100, [0xfb, 0x76, 0x04, 0x76])
+        self.mem.set8(0x0040, 0xd9)
+        self.mem.set8(0xffff, 0x01)
+        self.mem.set8(0xff0f, 0x01)
+        self.z80.sp.ld(0xfffe)
+        self.z80.b.ld(0)
+        self.z80.run(200)
+        self._regEq(self.z80.b, 1)
+        self._regEq(self.z80.pc, 0x0104)
 
     def test_cpn(self):
         opc = 0xfe
@@ -2798,6 +2859,209 @@ class TestZ80(unittest.TestCase):
     def test_rst38(self):
         self._test_rstn(0xff, self.z80.rst38, 0x38)
 
+    def test_dispatchTableMatchesInstrTables(self):
+        for opc in range(0, 0x100):
+            self.assertEquals(self.z80._ops[opc], self.z80.instr[opc])
+            func, time = self.z80.extInstr[opc]
+            self.assertEquals(self.z80._ops[0x100 + opc], (func, time, 0))
+
+    def test_step_movesPCPastOperands(self):
+        self._load(0x0100, [0x06, 0xa5, 0x21, 0x34, 0x12, 0x00])
+        self.assertEquals(self.z80.step(), 8)
+        self._regEq(self.z80.pc, 0x0102)
+        self._regEq(self.z80.b, 0xa5)
+        self.assertEquals(self.z80.step(), 12)
+        self._regEq(self.z80.pc, 0x0105)
+        self._regEq(self.z80.h, 0x12)
+        self._regEq(self.z80.l, 0x34)
+
+    def test_step_extInstr(self):
+        self._load(0x0100, [0xcb, 0x37])
+        self.z80.a.ld(0xa5)
+        self.assertEquals(self.z80.step(), 8)
+        self._regEq(self.z80.pc, 0x0102)
+        self._regEq(self.z80.a, 0x5a)
+
+    def test_step_jrIsRelativeToNextInstr(self):
+        self._load(0x0100, [0x18, 0xfe])
+        self.z80.step()
+        self._regEq(self.z80.pc, 0x0100)
+
+    def test_run_stopsWhenBudgetIsExhausted(self):
+        self._load(0x0100, [0x00] * 8)
+        self.assertEquals(self.z80.run(10), 12)
+        self._regEq(self.z80.pc, 0x0103)
+        self.assertEquals(self.z80.run(0), 0)
+        self._regEq(self.z80.pc, 0x0103)
+
+    def test_run_loop(self):
+        # ld b, 3; dec b; jr nz, -3; nop
+        self._load(0x0100, [0x06, 0x03, 0x05, 0x20, 0xfd, 0x00])
+        cycles = self.z80.run(8 + 3 * (4 + 8) + 4)
+        self.assertEquals(cycles, 48)
+        self._regEq(self.z80.b, 0)
+        self._regEq(self.z80.pc, 0x0106)
+
+    def test_intr_onlyCheckedWhenSignalled(self):
+        self._load(0x0100, [0x00] * 4)
+        self.z80.sp.ld(0xfffe)
+        self.z80.intsEnabled = True
+        self.mem.set8(0xffff, 0x04)
+        self.mem.set8(0xff0f, 0x04)
+        self.assertEquals(self.z80.step(), 4)
+        self._regEq(self.z80.pc, 0x0101)
+        self.z80.checkIntrs()
+        self.assertEquals(self.z80.step(), z80.INTR_TIME)
+        self._regEq(self.z80.pc, 0x0050)
+        self._regEq(self.z80.sp, 0xfffc)
+        self.assertEquals(self.mem.get16(0xfffc), 0x0101)
+        self.assertEquals(self.mem.get8(0xff0f), 0)
+        self.assertFalse(self.z80.intsEnabled)
+
+    def test_intr_priority(self):
+        self._load(0x0100, [0x00])
+        self.mem.set8(0xffff, 0x1e)
+        self.mem.set8(0xff0f, 0x19)
+        for vector, flags in [(0x58, 0x11), (0x60, 0x01)]:
+            self.z80.intsEnabled = True
+            self.z80.checkIntrs()
+            self.z80.step()
+            self._regEq(self.z80.pc, vector)
+            self.assertEquals(self.mem.get8(0xff0f), flags)
+        self.z80.intsEnabled = True
+        self.z80.checkIntrs()
+        self.assertEquals(self.z80.step(), 4)
+
+    def test_intr_disabled(self):
+        self._load(0x0100, [0x00, 0xfb, 0x00, 0x00])
+        self.mem.set8(0xffff, 0x01)
+        self.mem.set8(0xff0f, 0x01)
+        self.z80.checkIntrs()
+        self.assertEquals(self.z80.step(), 4)
+        self._regEq(self.z80.pc, 0x0101)
+        self.z80.step()
+        self.assertEquals(self.z80.step(), 4)
+        self._regEq(self.z80.pc, 0x0103)
+        self.assertEquals(self.z80.step(), z80.INTR_TIME)
+        self._regEq(self.z80.pc, 0x0040)
+
+    def test_halt_consumesBudget(self):
+        self._load(0x0100, [0x76, 0x00])
+        self.assertEquals(self.z80.run(1000), 1000)
+        self._regEq(self.z80.pc, 0x0101)
+        self.assertEquals(self.z80.run(1001), 1004)
+        self.assertEquals(self.z80.skippedCycles, 2004 - 4)
+        self.assertEquals(self.z80.step(), 4)
+        self._regEq(self.z80.pc, 0x0101)
+
+    def test_halt_endsOnPendingIntr(self):
+        self._load(0x0100, [0x76, 0x00])
+        self.mem.set8(0xffff, 0x01)
+        self.mem.set8(0xff0f, 0x01)
+        self.assertEquals(self.z80.step(), 4)
+        self.assertEquals(self.z80.step(), 4)
+        self._regEq(self.z80.pc, 0x0102)
+        self.assertEquals(self.z80.skippedCycles, 0)
+
+    def test_halt_endsOnIntr(self):
+        self._load(0x0100, [0x76, 0x00])
+        self.z80.sp.ld(0xfffe)
+        self.mem.set8(0xffff, 0x01)
+        self.z80.run(100)
+        self.mem.set8(0xff0f, 0x01)
+        self.z80.checkIntrs()
+        self.assertEquals(self.z80.step(), 4)
+        self._regEq(self.z80.pc, 0x0102)
+        self.mem.set8(0xff0f, 0x00)
+        self._load(0x0100, [0x76, 0x00])
+        self.z80.intsEnabled = True
+        self.z80.run(100)
+        self.mem.set8(0xff0f, 0x01)
+        self.z80.checkIntrs()
+        self.assertEquals(self.z80.step(), z80.INTR_TIME)
+        self._regEq(self.z80.pc, 0x0040)
+        self.assertEquals(self.mem.get16(0xfffc), 0x0101)
+
+    def test_run_idleLoopIsSkipped(self):
+        # ldh a, (0x44); cp 0x90; jr nz, -6
+        self._load(0x0100, [0xf0, 0x44, 0xfe, 0x90, 0x20, 0xfa])
+        loop = (self.z80.instr_time(0xf0) + self.z80.instr_time(0xfe) +
+                self.z80.instr_time(0x20))
+        cycles = self.z80.run(1000)
+        self.assertEquals(cycles, -(-1000 // loop) * loop)
+        self.assertEquals(self.z80.skippedCycles, cycles - loop)
+        self._regEq(self.z80.pc, 0x0100)
+
+    def test_run_idleLoopIsNotSkippedInNextRun(self):
+        # ldh a, (0x44); cp 0x90; jr nz, -6
+        self._load(0x0100, [0xf0, 0x44, 0xfe, 0x90, 0x20, 0xfa])
+        self.mem.set8(0xff44, 0x00)
+        loop = (self.z80.instr_time(0xf0) + self.z80.instr_time(0xfe) +
+                self.z80.instr_time(0x20))
+        # The run ends on the JR that finds the loop.
+        self.assertEquals(self.z80.run(loop), loop)
+        self.mem.set8(0xff44, 0x90)
+        self.z80.run(loop)
+        self.assertEquals(self.z80.skippedCycles, 0)
+        self._regEq(self.z80.pc, 0x0106)
+
+    def test_run_idleLoopWithBit(self):
+        # ld a, (0xff41); bit 1, a; jr nz, -7
+        self._load(0x0100, [0xfa, 0x41, 0xff, 0xcb, 0x4f, 0x20, 0xf9])
+        self.mem.set8(0xff41, 0x02)
+        self.z80.run(1000)
+        self.assertTrue(self.z80.skippedCycles > 0)
+        self._regEq(self.z80.pc, 0x0100)
+
+    def test_run_timerPollIsNotSkipped(self):
+        # ldh a, (DIV); and 0x80; jr z, -6
+        self._load(0x0100, [0xf0, 0x04, 0xe6, 0x80, 0x28, 0xfa])
+        self.z80.run(1000)
+        # ld a, (TIMA); cp 0x10; jr c, -7
+        self._load(0x0200, [0xfa, 0x05, 0xff, 0xfe, 0x10, 0x38, 0xf9])
+        self.z80.run(1000)
+        self.assertEquals(self.z80.skippedCycles, 0)
+
+    def test_run_busyLoopIsNotSkipped(self):
+        # ldh a, (0x44); ldh (0x80), a; cp 0x90; jr nz, -8
+        self._load(0x0100, [0xf0, 0x44, 0xe0, 0x80, 0xfe, 0x90, 0x20, 0xf8])
+        self.z80.run(1000)
+        # ld b, 3; dec b; jr nz, -3
+        self._load(0x0200, [0x06, 0x03, 0x05, 0x20, 0xfd, 0x00])
+        self.z80.run(1000)
+        self.assertEquals(self.z80.skippedCycles, 0)
+
+    def test_run_elapsed(self):
+        mem = iomem.IOMemory(self.mem)
+        cpu = z80.Z80(mem)
+        times = []
+        mem.mapRegister(iomem.TIMA, lambda: times.append(cpu.elapsed()) or 0,
+                        None)
+        # nop; ldh a, (TIMA); ldh a, (TIMA)
+        for i, b in enumerate([0x00, 0xf0, 0x05, 0xf0, 0x05]):
+            mem.set8(0x0100 + i, b)
+        cpu.pc.ld(0x0100)
+        self.assertEquals(cpu.run(28), 28)
+        self.assertEquals(times, [4, 16])
+        self.assertEquals(cpu.elapsed(), 0)
+
+    def test_intr_signalledByIOMemory(self):
+        mem = iomem.IOMemory(self.mem)
+        cpu = z80.Z80(mem)
+        mem.setIntrListener(cpu.checkIntrs)
+        cpu.pc.ld(0x0100)
+        cpu.intsEnabled = True
+        mem.set8(iomem.IE, iomem.INTR_VBLANK)
+        self.assertEquals(cpu.step(), 4)
+        mem.setVBLANKIntr()
+        self.assertEquals(cpu.step(), z80.INTR_TIME)
+        self._regEq(cpu.pc, 0x0040)
+
+    def _load(self, addr, bytes_):
+        self.z80.pc.ld(addr)
+        for i, b in enumerate(bytes_):
+            self.mem.set8(addr + i, b)
+
     def _sign(self, n):
         if n > 127:
             n = (n & 127) - 128
@@ -2,16 +2,34 @@
 # Use of this source code is governed by a GPL
 # license that can be found in the LICENSE file.
 
-from pygme.cpu import reg8, reg16, reg_flag
+from pygme.cpu import blocks
+from pygme.cpu import regfile
+from pygme.cpu.regfile import FLAG_Z, FLAG_N, FLAG_H, FLAG_C
+from pygme.memory.iomem import IF, IE, DIV, TAC
+
+# The number of cycles taken to jump to an interrupt handler.
+INTR_TIME = 20
+
+# The largest number of bytes before a backward JR that are looked at for an
+# idle loop.
+IDLE_LOOP_SIZE = 16
+
+# The opcodes of relative jumps.
+JR_OPS = (0x18, 0x20, 0x28, 0x30, 0x38)
+
+# The number of operands taken by the instructions that may follow the load
+# of A in an idle loop, which only change A and the flags: AND n, OR n,
+# XOR n, CP n, AND A and OR A. BIT b, A is also allowed.
+IDLE_LOOP_OPS = {0xe6: 1, 0xf6: 1, 0xee: 1, 0xfe: 1, 0xa7: 0, 0xb7: 0}
 
 
 class Flags:
 
-    def __init__(self):
-        self.z = reg_flag.RegFlag("Z")
-        self.n = reg_flag.RegFlag("N")
-        self.c = reg_flag.RegFlag("C")
-        self.h = reg_flag.RegFlag("H")
+    def __init__(self, regs):
+        self.z = regfile.FlagView(regs, "Z", FLAG_Z)
+        self.n = regfile.FlagView(regs, "N", FLAG_N)
+        self.c = regfile.FlagView(regs, "C", FLAG_C)
+        self.h = regfile.FlagView(regs, "H", FLAG_H)
 
 
 class Z80:
@@ -23,6 +41,38 @@ class Z80:
     instructions on its registers.
 
     This implementation does not include clock registers.
+
+    The registers are held as plain integers in a RegFile, which the
+    instructions read and write directly. The a, b, c, d, e, h, l, pc and
+    sp attributes, and the flags in f, are range-checked views onto it.
+
+    Interrupts are only looked for when checkIntrs() has been called since
+    the last look, or after EI; memory that holds IF and IE should call it
+    when they change, as IOMemory.setIntrListener() arranges. EI enables
+    interrupts after the instruction that follows it, so that the handler of
+    an interrupt that is already pending returns after, e.g., a HALT that
+    follows EI. If blocks are used, interrupts are looked for at the end of
+    the block that follows EI.
+
+    While halted, the CPU has nothing to do until an interrupt is requested,
+    which can only happen at the next event of a device, so run() consumes
+    the rest of its budget at once instead of idling through it; the
+    Scheduler sets the budget to end at the earliest event.
+
+    The same is done for idle loops, which wait for an interrupt handler or
+    device to change a register rather than halting. A loop is idle if it is
+    a short backward JR over instructions that load A from 0xFF00-0xFFFF and
+    then only test it. The timer registers, DIV to TAC, count between
+    events, so loops that read them are not idle. Nothing else such a loop
+    reads can change before the next event, so once it has been taken it
+    will be taken until then, and run() consumes whole iterations of it up
+    to the end of the budget. The cycles passed over in HALT and idle loops
+    are added to skippedCycles.
+
+    If useBlocks is set, run() executes a block of instructions at a time
+    through a BlockCache instead of decoding each instruction as it goes. If
+    hotCount is also set, blocks that are run hotCount times are compiled
+    again with the registers held in local variables.
     """
 
     LEFT = True
@@ -42,23 +92,37 @@ class Z80:
     INDEX_INSTR_TIME = 1
     INDEX_INSTR_ARGC = 2
 
-    def __init__(self, mem):
+    def __init__(self, mem, useBlocks=False, hotCount=0):
         self._halted = False
         self._intsEnabled = False
-        self.a = reg8.Reg8("A", 0x01)
-        self.b = reg8.Reg8("B", 0x00)
-        self.c = reg8.Reg8("C", 0x13)
-        self.d = reg8.Reg8("D", 0x00)
-        self.e = reg8.Reg8("E", 0xd8)
-        self.h = reg8.Reg8("H", 0x01)
-        self.l = reg8.Reg8("L", 0x4d)
-        self.pc = reg16.Reg16("PC", 0x0100)
-        self.sp = reg16.Reg16("SP", 0xfffe)
-        self.f = Flags()
+        self._intrCheck = False
+        # Whether EI was the last instruction, so that interrupts are enabled
+        # before the next one.
+        self._eiPending = False
+        # Whether run() needs to look at _intrCheck, _eiPending, _halted or
+        # _idleLoop before the next instruction.
+        self._attention = False
+        # The cycles taken by an iteration of the idle loop just entered.
+        self._idleLoop = 0
+        # The cycles run by the current call to run() before the instruction
+        # or block being executed.
+        self._elapsed = 0
+        self.skippedCycles = 0
+        self._r = regfile.RegFile()
+        self.a = regfile.Reg8View(self._r, "A", 'a', 0x01)
+        self.b = regfile.Reg8View(self._r, "B", 'b', 0x00)
+        self.c = regfile.Reg8View(self._r, "C", 'c', 0x13)
+        self.d = regfile.Reg8View(self._r, "D", 'd', 0x00)
+        self.e = regfile.Reg8View(self._r, "E", 'e', 0xd8)
+        self.h = regfile.Reg8View(self._r, "H", 'h', 0x01)
+        self.l = regfile.Reg8View(self._r, "L", 'l', 0x4d)
+        self.pc = regfile.Reg16View(self._r, "PC", 'pc', 0x0100)
+        self.sp = regfile.Reg16View(self._r, "SP", 'sp', 0xfffe)
+        self.f = Flags(self._r)
         self._mem = mem
         self.intsEnabled = False
         self.instr = [
-            (self.nop, 0, 0),
+            (self.nop, 4, 0),
             (self.ldBCnn, 12, 2),
             (self.ldMemBCA, 8, 0),
             (self.incBC, 8, 0),
@@ -185,7 +249,7 @@ class Z80:
             (self.ldAH, 4, 0),
             (self.ldAL, 4, 0),
             (self.ldAMemHL, 8, 0),
-            (self.ldAA, 0, 0),
+            (self.ldAA, 4, 0),
             (self.addAB, 4, 0),
             (self.addAC, 4, 0),
             (self.addAD, 4, 0),
@@ -573,6 +637,11 @@ class Z80:
             (self.set7MemHL, 16),
             (self.set7A, 8),
         ]
+        self._compileDispatch()
+        self._blocks = None
+        if useBlocks:
+            self._blocks = blocks.BlockCache(self._ops, self._r, mem,
+                                             hotCount)
 
     def extinstr_func(self, opc):
         return self.extInstr[opc][self.INDEX_INSTR_FUNC]
@@ -589,99 +658,333 @@ class Z80:
     def instr_argc(self, opc):
         return self.instr[opc][self.INDEX_INSTR_ARGC]
 
+    def step(self):
+        """Executes the instruction at PC and returns the cycles it took."""
+        self._idleLoop = 0
+        return self._interpret(1)
+
+    def run(self, max_cycles):
+        """
+        Executes instructions until at least max_cycles cycles have been
+        consumed, and returns the number of cycles that were consumed.
+
+        The opcode at PC and its operands are read from memory, and PC is
+        moved past them before the instruction is executed, so that jumps,
+        calls and relative jumps see the address of the next instruction.
+        An instruction is never split, so the returned count may exceed
+        max_cycles by the length of the last instruction, or of the last
+        block if blocks are used.
+        """
+        # An idle loop is only skipped in the call that found it, as the
+        # registers it polls may have changed since.
+        self._idleLoop = 0
+        if self._blocks is not None:
+            return self._runBlocks(max_cycles)
+        return self._interpret(max_cycles)
+
+    def _interpret(self, max_cycles):
+        """Runs as run() does, decoding an instruction at a time."""
+        get8 = self._mem.get8
+        ops = self._ops
+        r = self._r
+        cycles = 0
+        while cycles < max_cycles:
+            if self._attention:
+                time = self._attend(max_cycles - cycles)
+                if time:
+                    cycles += time
+                    continue
+            self._elapsed = cycles
+            addr = r.pc
+            opc = get8(addr)
+            if opc == 0xcb:
+                addr = (addr + 1) & 0xffff
+                opc = 0x100 | get8(addr)
+            func, time, argc = ops[opc]
+            if argc == 0:
+                r.pc = (addr + 1) & 0xffff
+                func()
+            elif argc == 1:
+                n = get8((addr + 1) & 0xffff)
+                r.pc = (addr + 2) & 0xffff
+                func(n)
+            else:
+                lsb = get8((addr + 1) & 0xffff)
+                msb = get8((addr + 2) & 0xffff)
+                r.pc = (addr + 3) & 0xffff
+                func(lsb, msb)
+            cycles += time
+        self._elapsed = 0
+        return cycles
+
+    def _runBlocks(self, max_cycles):
+        """Runs as run() does, executing a block at a time."""
+        cached = self._blocks
+        r = self._r
+        cycles = 0
+        while cycles < max_cycles:
+            if self._attention:
+                time = self._attend(max_cycles - cycles)
+                if time:
+                    cycles += time
+                    continue
+            self._elapsed = cycles
+            cycles += cached[r.pc]()
+        self._elapsed = 0
+        return cycles
+
+    def elapsed(self):
+        """
+        Returns the cycles run by the current call to run() before the
+        instruction being executed, or before its block if blocks are used,
+        so that devices read in the middle of run() can tell the time.
+        """
+        return self._elapsed
+
+    def checkIntrs(self):
+        """
+        Makes the CPU look for pending interrupts before its next instruction.
+        """
+        self._intrCheck = True
+        self._attention = True
+
+    def _attend(self, budget):
+        """
+        Looks for interrupts, a HALT or an idle loop before the next
+        instruction, as flagged by _attention, and returns the number of the
+        budget cycles that this took, or 0 if the instruction should run.
+        """
+        if self._intrCheck:
+            self._intrCheck = False
+            time = self._dispatchIntr()
+            if time:
+                return time
+        if self._eiPending:
+            # Interrupts are looked for again once the instruction after EI
+            # has run.
+            self._eiPending = False
+            self.intsEnabled = True
+            self._intrCheck = True
+            return 0
+        if self._halted:
+            # Round up to a whole number of machine cycles.
+            time = (budget + 3) & ~3
+            self.skippedCycles += time
+            return time
+        self._attention = False
+        loop = self._idleLoop
+        if loop:
+            self._idleLoop = 0
+            time = -(-budget // loop) * loop
+            self.skippedCycles += time
+            return time
+        return 0
+
+    def _checkIdleLoop(self, start, end):
+        """
+        Flags the loop from start to the JR at end as idle, if it is, for
+        run() to skip.
+        """
+        get8 = self._mem.get8
+        ops = self._ops
+        jr = get8(end)
+        if start > end or jr not in JR_OPS:
+            return
+        time = ops[jr][1]
+        addr = start
+        if addr < end:
+            opc = get8(addr)
+            if opc == 0xf0:
+                reg = 0xff00 | get8(addr + 1)
+                addr += 2
+            elif opc == 0xfa and get8(addr + 2) == 0xff:
+                reg = 0xff00 | get8(addr + 1)
+                addr += 3
+            else:
+                return
+            if DIV <= reg <= TAC:
+                return
+            time += ops[opc][1]
+        while addr < end:
+            opc = get8(addr)
+            if opc in IDLE_LOOP_OPS:
+                addr += 1 + IDLE_LOOP_OPS[opc]
+            elif opc == 0xcb and get8(addr + 1) & 0xc7 == 0x47:
+                opc = 0x100 | get8(addr + 1)
+                addr += 2
+            else:
+                return
+            time += ops[opc][1]
+        if addr == end:
+            self._idleLoop = time
+            self._attention = True
+
+    def _dispatchIntr(self):
+        """
+        Jumps to the handler of the highest priority interrupt that is both
+        enabled in IE and requested in IF, if interrupts are enabled, and
+        returns the cycles this took. Any such interrupt ends a HALT, even if
+        interrupts are disabled.
+        """
+        mem = self._mem
+        flags = mem.get8(IF)
+        pending = mem.get8(IE) & flags & 0x1f
+        if not pending:
+            return 0
+        self._halted = False
+        if not self.intsEnabled:
+            return 0
+        bit = pending & -pending
+        self.intsEnabled = False
+        mem.set8(IF, flags & ~bit)
+        self._rstn(0x40 + (bit.bit_length() - 1) * 8)
+        return INTR_TIME
+
+    def _compileDispatch(self):
+        """
+        Flattens instr and extInstr into the dispatch table used by run().
+
+        The table has 512 (function, time, argc) entries; entry opc describes
+        the opcode opc, and entry 0x100 + opc describes the extended opcode
+        0xCB opc. This lets run() fetch any instruction with a single list
+        index, instead of going through a second table for extended
+        instructions. It must be called again if instr or extInstr are
+        modified.
+        """
+        self._ops = self.instr + [(func, time, 0)
+                                  for func, time in self.extInstr]
+
     def nop(self):
         """The CPU performs no operation during this machine cycle."""
 
     def ldBCnn(self, lsb, msb):
         """Loads a byte into B and a byte into C."""
-        self._ldRRnn(self.b, msb, self.c, lsb)
+        self._assertByte(lsb)
+        self._assertByte(msb)
+        r = self._r
+        r.b = msb
+        r.c = lsb
 
     def ldMemBCA(self):
         """Loads the contents of A into the memory address specified by BC."""
-        self._ldMemRRA(self.b, self.c)
+        r = self._r
+        self._mem.set8((r.b << 8) | r.c, r.a)
 
     def incBC(self):
         """Increments the contents of BC."""
-        self._incRR(self.b, self.c)
+        r = self._r
+        r.c = (r.c + 1) & 0xff
+        if r.c == 0:
+            r.b = (r.b + 1) & 0xff
 
     def incB(self):
         """Increments the contents of B."""
-        self._incR(self.b)
+        r = self._r
+        r.b = self._inc8(r.b)
 
     def decB(self):
         """Decrements the contents of B."""
-        self._decR(self.b)
+        r = self._r
+        r.b = self._dec8(r.b)
 
     def ldBn(self, b):
         """Loads a byte into B."""
-        self._ldRn(self.b, b)
+        self._assertByte(b)
+        self._r.b = b
 
     def rlca(self):
         """A is rotated left 1-bit position - bit 7 goes into C and bit 0."""
-        self._rotA(self.LEFT, self.WITH_CARRY)
+        r = self._r
+        r.a = self._rlc8(r.a)
 
     def ldMemnnSP(self, n, m):
         raise NotImplementedError("'LD (nn), SP' has not been implemented")
 
     def addHLBC(self):
         """Adds BC to HL and stores the result in HL."""
-        self._addHLRR(self.b, self.c)
+        r = self._r
+        self._addHL((r.b << 8) | r.c)
 
     def ldAMemBC(self):
         """Loads the contents of the memory address specified by BC into A."""
-        self._ldAMemRR(self.b, self.c)
+        r = self._r
+        r.a = self._mem.get8((r.b << 8) | r.c)
 
     def decBC(self):
         """Decrements the contents of BC."""
-        self._decRR(self.b, self.c)
+        r = self._r
+        r.c = (r.c - 1) & 0xff
+        if r.c == 0xff:
+            r.b = (r.b - 1) & 0xff
 
     def incC(self):
         """Increments the contents of C."""
-        self._incR(self.c)
+        r = self._r
+        r.c = self._inc8(r.c)
 
     def decC(self):
         """Decrements the contents of C."""
-        self._decR(self.c)
+        r = self._r
+        r.c = self._dec8(r.c)
 
     def ldCn(self, c):
         """Loads a byte into C."""
-        self._ldRn(self.c, c)
+        self._assertByte(c)
+        self._r.c = c
 
     def rrca(self):
         """A is rotated right 1-bit position - bit 0 goes into C and bit 7."""
-        self._rotA(self.RIGHT, self.WITH_CARRY)
+        r = self._r
+        r.a = self._rrc8(r.a)
 
     def stop(self):
-        raise NotImplementedError("'STOP' has not been implemented")
+        """
+        Enters a low-power mode until a button is pressed.
+
+        There is no joypad yet, so this waits for an interrupt, as HALT does.
+        """
+        self.halt()
 
     def ldDEnn(self, lsb, msb):
         """Loads a byte into D and a byte into E."""
-        self._ldRRnn(self.d, msb, self.e, lsb)
+        self._assertByte(lsb)
+        self._assertByte(msb)
+        r = self._r
+        r.d = msb
+        r.e = lsb
 
     def ldMemDEA(self):
         """Loads the contents of A into the memory address specified by DE."""
-        self._ldMemRRA(self.d, self.e)
+        r = self._r
+        self._mem.set8((r.d << 8) | r.e, r.a)
 
     def incDE(self):
         """Increments the contents of DE."""
-        self._incRR(self.d, self.e)
+        r = self._r
+        r.e = (r.e + 1) & 0xff
+        if r.e == 0:
+            r.d = (r.d + 1) & 0xff
 
     def incD(self):
         """Increments the contents of D."""
-        self._incR(self.d)
+        r = self._r
+        r.d = self._inc8(r.d)
 
     def decD(self):
         """Decrements the contents of D."""
-        self._decR(self.d)
+        r = self._r
+        r.d = self._dec8(r.d)
 
     def ldDn(self, d):
         """Loads a byte into D."""
-        self._ldRn(self.d, d)
+        self._assertByte(d)
+        self._r.d = d
 
     def rla(self):
         """A is rotated left 1-bit position - bit 7 goes into C and C goes into
         bit 0."""
-        self._rotA(self.LEFT, self.WITHOUT_CARRY)
+        r = self._r
+        r.a = self._rl8(r.a)
 
     def jrn(self, n):
         """Decrements/increments the PC by the signed byte n."""
@@ -689,709 +992,831 @@ class Z80:
 
     def addHLDE(self):
         """Adds DE to HL and stores the result in HL."""
-        self._addHLRR(self.d, self.e)
+        r = self._r
+        self._addHL((r.d << 8) | r.e)
 
     def ldAMemDE(self):
         """Loads the contents of the memory address specified by DE into A."""
-        self._ldAMemRR(self.d, self.e)
+        r = self._r
+        r.a = self._mem.get8((r.d << 8) | r.e)
 
     def decDE(self):
         """Decrements the contents of DE."""
-        self._decRR(self.d, self.e)
+        r = self._r
+        r.e = (r.e - 1) & 0xff
+        if r.e == 0xff:
+            r.d = (r.d - 1) & 0xff
 
     def incE(self):
         """Increments the contents of E."""
-        self._incR(self.e)
+        r = self._r
+        r.e = self._inc8(r.e)
 
     def decE(self):
         """Decrements the contents of E."""
-        self._decR(self.e)
+        r = self._r
+        r.e = self._dec8(r.e)
 
     def ldEn(self, e):
         """Loads a byte into E."""
-        self._ldRn(self.e, e)
+        self._assertByte(e)
+        self._r.e = e
 
     def rra(self):
         """A is rotated right 1-bit position - bit 0 goes into C and C goes
         into bit 7."""
-        self._rotA(self.RIGHT, self.WITHOUT_CARRY)
+        r = self._r
+        r.a = self._rr8(r.a)
 
     def jrNZn(self, n):
         """Decrements/increments PC by the signed byte n if Z is reset."""
-        self._jrcn(not self.f.z.val(), n)
+        self._jrcn(self._r.fres & 0xff, n)
 
     def ldHLnn(self, lsb, msb):
         """Loads a byte into H and a byte into L."""
-        self._ldRRnn(self.h, msb, self.l, lsb)
+        self._assertByte(lsb)
+        self._assertByte(msb)
+        r = self._r
+        r.h = msb
+        r.l = lsb
 
     def ldiMemHLA(self):
         """Loads A into the memory address in HL and increments HL."""
-        self._ldMemRRA(self.h, self.l)
-        self.incHL()
+        r = self._r
+        hl = (r.h << 8) | r.l
+        self._mem.set8(hl, r.a)
+        hl = (hl + 1) & 0xffff
+        r.h = hl >> 8
+        r.l = hl & 0xff
 
     def incHL(self):
         """Increments the contents of HL."""
-        self._incRR(self.h, self.l)
+        r = self._r
+        r.l = (r.l + 1) & 0xff
+        if r.l == 0:
+            r.h = (r.h + 1) & 0xff
 
     def incH(self):
         """Increments the contents of H."""
-        self._incR(self.h)
+        r = self._r
+        r.h = self._inc8(r.h)
 
     def decH(self):
         """Decrements the contents of H."""
-        self._decR(self.h)
+        r = self._r
+        r.h = self._dec8(r.h)
 
     def ldHn(self, h):
         """Loads a byte into H."""
-        self._ldRn(self.h, h)
+        self._assertByte(h)
+        self._r.h = h
 
     def daa(self):
-        raise NotImplementedError("'DAA' has not been implemented")
+        """Adjusts A to hold the BCD result of the last add or subtract."""
+        r = self._r
+        a = r.a
+        c = r.fres & 0x100
+        h = (r.fhalf ^ r.fres) & 0x10
+        if r.fneg:
+            if c:
+                a -= 0x60
+            if h:
+                a -= 0x06
+        else:
+            if c or a > 0x99:
+                a += 0x60
+                c = 0x100
+            if h or (a & 0xf) > 0x9:
+                a += 0x06
+        a &= 0xff
+        r.a = a
+        r.fres = a | c
+        r.fhalf = a
 
     def jrZn(self, n):
         """Decrements/increments PC by the signed byte n if Z is set."""
-        self._jrcn(self.f.z.val(), n)
+        self._jrcn(not self._r.fres & 0xff, n)
 
     def addHLHL(self):
         """Adds HL to HL and stores the result in HL."""
-        self._addHLRR(self.h, self.l)
+        r = self._r
+        self._addHL((r.h << 8) | r.l)
 
     def ldiAMemHL(self):
         """Loads byte at memory address in HL into A and increments HL."""
-        self._ldRMemHL(self.a)
-        self.incHL()
+        r = self._r
+        hl = (r.h << 8) | r.l
+        r.a = self._mem.get8(hl)
+        hl = (hl + 1) & 0xffff
+        r.h = hl >> 8
+        r.l = hl & 0xff
 
     def decHL(self):
         """Decrements the contents of HL."""
-        self._decRR(self.h, self.l)
+        r = self._r
+        r.l = (r.l - 1) & 0xff
+        if r.l == 0xff:
+            r.h = (r.h - 1) & 0xff
 
     def incL(self):
         """Increments the contents of L."""
-        self._incR(self.l)
+        r = self._r
+        r.l = self._inc8(r.l)
 
     def decL(self):
         """Decrements the contents of L."""
-        self._decR(self.l)
+        r = self._r
+        r.l = self._dec8(r.l)
 
     def ldLn(self, l):
         """Loads a byte into L."""
-        self._ldRn(self.l, l)
+        self._assertByte(l)
+        self._r.l = l
 
     def cpl(self):
         """Complements the A register."""
-        self.a.ld(0xff - self.a.val())
-        self.f.n.set()
-        self.f.h.set()
+        r = self._r
+        r.a ^= 0xff
+        r.f |= FLAG_N | FLAG_H
 
     def jrNCn(self, n):
         """Decrements/increments PC by the signed byte n if C is reset."""
-        self._jrcn(not self.f.c.val(), n)
+        self._jrcn(not self._r.fres & 0x100, n)
 
     def ldSPnn(self, lsb, msb):
         """Loads a byte into S and a byte into P."""
-        self.sp.ld((msb << 8) + lsb)
+        self._assertByte(lsb)
+        self._assertByte(msb)
+        self._r.sp = (msb << 8) | lsb
 
     def lddMemHLA(self):
         """Loads A into the memory address in HL and decrements HL."""
-        self._ldMemRRA(self.h, self.l)
-        self.decHL()
+        r = self._r
+        hl = (r.h << 8) | r.l
+        self._mem.set8(hl, r.a)
+        hl = (hl - 1) & 0xffff
+        r.h = hl >> 8
+        r.l = hl & 0xff
 
     def incSP(self):
         """Increments the contents of SP."""
-        self.sp.ld((self.sp.val() + 1) & 0xffff)
+        r = self._r
+        r.sp = (r.sp + 1) & 0xffff
 
     def incMemHL(self):
         """Increments the contents of the memory address specified by HL."""
-        self.f.n.reset()
         addr = self._hl()
-        val = self._mem.get8(addr)
-        self._mem.set8(addr, (val + 1) & 0xff)
-        self.f.h.setTo(val & 0xf == 0xf)
-        self.f.z.setTo(self._mem.get8(addr) == 0)
+        self._mem.set8(addr, self._inc8(self._mem.get8(addr)))
 
     def decMemHL(self):
         """Decrements the contents of the memory address specified by HL."""
-        self.f.n.set()
         addr = self._hl()
-        val = self._mem.get8(addr)
-        self._mem.set8(addr, (val - 1) & 0xff)
-        self.f.h.setTo(val & 0xf == 0)
-        self.f.z.setTo(self._mem.get8(addr) == 0)
+        self._mem.set8(addr, self._dec8(self._mem.get8(addr)))
 
     def ldMemHLn(self, hl):
         """Loads a byte into the memory address specified by HL."""
+        self._assertByte(hl)
         self._mem.set8(self._hl(), hl)
 
     def scf(self):
         """Sets the carry flag."""
-        self.f.n.reset()
-        self.f.h.reset()
-        self.f.c.set()
+        r = self._r
+        r.f = (r.f & FLAG_Z) | FLAG_C
 
     def jrCn(self, n):
         """Decrements/increments PC by the signed byte n if C is set."""
-        self._jrcn(self.f.c.val(), n)
+        self._jrcn(self._r.fres & 0x100, n)
 
     def addHLSP(self):
         """Adds SP to HL and stores the result in HL."""
-        hl = (self.h.val() << 8) + self.l.val()
-        result = hl + self.sp.val()
-        self.h.ld((result >> 8) & 0xff)
-        self.l.ld(result & 0xff)
-        self.f.n.reset()
-        self.f.h.setTo((hl & 0xfff) + (self.sp.val() & 0xfff) > 0xfff)
-        self.f.c.setTo(result > 0xffff)
+        self._addHL(self._r.sp)
 
     def lddAMemHL(self):
         """Loads the value at memory address in HL into A and decrements HL."""
-        self._ldRMemHL(self.a)
-        self.decHL()
+        r = self._r
+        hl = (r.h << 8) | r.l
+        r.a = self._mem.get8(hl)
+        hl = (hl - 1) & 0xffff
+        r.h = hl >> 8
+        r.l = hl & 0xff
 
     def decSP(self):
         """Decrements the contents of SP."""
-        self.sp.ld((self.sp.val() - 1) & 0xffff)
+        r = self._r
+        r.sp = (r.sp - 1) & 0xffff
 
     def incA(self):
         """Increments the contents of A."""
-        self._incR(self.a)
+        r = self._r
+        r.a = self._inc8(r.a)
 
     def decA(self):
         """Decrements the contents of A."""
-        self._decR(self.a)
+        r = self._r
+        r.a = self._dec8(r.a)
 
     def ldAn(self, a):
         """Loads a byte into A."""
-        self._ldRn(self.a, a)
+        self._assertByte(a)
+        self._r.a = a
 
     def ccf(self):
         """Complements the C flag."""
-        self.f.h.reset()
-        self.f.n.reset()
-        self.f.c.setTo(not self.f.c.val())
+        r = self._r
+        r.f = (r.f & FLAG_Z) | ((r.f & FLAG_C) ^ FLAG_C)
 
     def ldBB(self):
         """Loads the contents of B into B."""
-        self._ldRR(self.b, self.b)
+        r = self._r
+        r.b = r.b
 
     def ldBC(self):
         """Loads the contents of C into B."""
-        self._ldRR(self.b, self.c)
+        r = self._r
+        r.b = r.c
 
     def ldBD(self):
         """Loads the contents of D into B."""
-        self._ldRR(self.b, self.d)
+        r = self._r
+        r.b = r.d
 
     def ldBE(self):
         """Loads the contents of E into B."""
-        self._ldRR(self.b, self.e)
+        r = self._r
+        r.b = r.e
 
     def ldBH(self):
         """Loads the contents of H into B."""
-        self._ldRR(self.b, self.h)
+        r = self._r
+        r.b = r.h
 
     def ldBL(self):
         """Loads the contents of L into B."""
-        self._ldRR(self.b, self.l)
+        r = self._r
+        r.b = r.l
 
     def ldBMemHL(self):
         """Loads the value at memory address in HL into B."""
-        self._ldRMemHL(self.b)
+        r = self._r
+        r.b = self._mem.get8((r.h << 8) | r.l)
 
     def ldBA(self):
         """Loads the contents of A into B."""
-        self._ldRR(self.b, self.a)
+        r = self._r
+        r.b = r.a
 
     def ldCB(self):
         """Loads the contents of B into C."""
-        self._ldRR(self.c, self.b)
+        r = self._r
+        r.c = r.b
 
     def ldCC(self):
         """Loads the contents of C into C."""
-        self._ldRR(self.c, self.c)
+        r = self._r
+        r.c = r.c
 
     def ldCD(self):
         """Loads the contents of D into C."""
-        self._ldRR(self.c, self.d)
+        r = self._r
+        r.c = r.d
 
     def ldCE(self):
         """Loads the contents of E into C."""
-        self._ldRR(self.c, self.e)
+        r = self._r
+        r.c = r.e
 
     def ldCH(self):
         """Loads the contents of H into C."""
-        self._ldRR(self.c, self.h)
+        r = self._r
+        r.c = r.h
 
     def ldCL(self):
         """Loads the contents of L into C."""
-        self._ldRR(self.c, self.l)
+        r = self._r
+        r.c = r.l
 
     def ldCMemHL(self):
         """Loads the value at memory address in HL into C."""
-        self._ldRMemHL(self.c)
+        r = self._r
+        r.c = self._mem.get8((r.h << 8) | r.l)
 
     def ldCA(self):
         """Loads the contents of A into C."""
-        self._ldRR(self.c, self.a)
+        r = self._r
+        r.c = r.a
 
     def ldDB(self):
         """Loads the contents of B into D."""
-        self._ldRR(self.d, self.b)
+        r = self._r
+        r.d = r.b
 
     def ldDC(self):
         """Loads the contents of C into D."""
-        self._ldRR(self.d, self.c)
+        r = self._r
+        r.d = r.c
 
     def ldDD(self):
         """Loads the contents of D into D."""
-        self._ldRR(self.d, self.d)
+        r = self._r
+        r.d = r.d
 
     def ldDE(self):
         """Loads the contents of E into D."""
-        self._ldRR(self.d, self.e)
+        r = self._r
+        r.d = r.e
 
     def ldDH(self):
         """Loads the contents of H into D."""
-        self._ldRR(self.d, self.h)
+        r = self._r
+        r.d = r.h
 
     def ldDL(self):
         """Loads the contents of L into D."""
-        self._ldRR(self.d, self.l)
+        r = self._r
+        r.d = r.l
 
     def ldDMemHL(self):
         """Loads the value at memory address in HL into D."""
-        self._ldRMemHL(self.d)
+        r = self._r
+        r.d = self._mem.get8((r.h << 8) | r.l)
 
     def ldDA(self):
         """Loads the contents of A into D."""
-        self._ldRR(self.d, self.a)
+        r = self._r
+        r.d = r.a
 
     def ldEB(self):
         """Loads the contents of B into E."""
-        self._ldRR(self.e, self.b)
+        r = self._r
+        r.e = r.b
 
     def ldEC(self):
         """Loads the contents of C into E."""
-        self._ldRR(self.e, self.c)
+        r = self._r
+        r.e = r.c
 
     def ldED(self):
         """Loads the contents of D into E."""
-        self._ldRR(self.e, self.d)
+        r = self._r
+        r.e = r.d
 
     def ldEE(self):
         """Loads the contents of E into E."""
-        self._ldRR(self.e, self.e)
+        r = self._r
+        r.e = r.e
 
     def ldEH(self):
         """Loads the contents of H into E."""
-        self._ldRR(self.e, self.h)
+        r = self._r
+        r.e = r.h
 
     def ldEL(self):
         """Loads the contents of L into E."""
-        self._ldRR(self.e, self.l)
+        r = self._r
+        r.e = r.l
 
     def ldEMemHL(self):
         """Loads the value at memory address in HL into E."""
-        self._ldRMemHL(self.e)
+        r = self._r
+        r.e = self._mem.get8((r.h << 8) | r.l)
 
     def ldEA(self):
         """Loads the contents of A into E."""
-        self._ldRR(self.e, self.a)
+        r = self._r
+        r.e = r.a
 
     def ldHB(self):
         """Loads the contents of B into H."""
-        self._ldRR(self.h, self.b)
+        r = self._r
+        r.h = r.b
 
     def ldHC(self):
         """Loads the contents of C into H."""
-        self._ldRR(self.h, self.c)
+        r = self._r
+        r.h = r.c
 
     def ldHD(self):
         """Loads the contents of D into H."""
-        self._ldRR(self.h, self.d)
+        r = self._r
+        r.h = r.d
 
     def ldHE(self):
         """Loads the contents of E into H."""
-        self._ldRR(self.h, self.e)
+        r = self._r
+        r.h = r.e
 
     def ldHH(self):
         """Loads the contents of H into H."""
-        self._ldRR(self.h, self.h)
+        r = self._r
+        r.h = r.h
 
     def ldHL(self):
         """Loads the contents of L into H."""
-        self._ldRR(self.h, self.l)
+        r = self._r
+        r.h = r.l
 
     def ldHMemHL(self):
         """Loads the value at memory address in HL into H."""
-        self._ldRMemHL(self.h)
+        r = self._r
+        r.h = self._mem.get8((r.h << 8) | r.l)
 
     def ldHA(self):
         """Loads the contents of A into H."""
-        self._ldRR(self.h, self.a)
+        r = self._r
+        r.h = r.a
 
     def ldLB(self):
         """Loads the contents of B into L."""
-        self._ldRR(self.l, self.b)
+        r = self._r
+        r.l = r.b
 
     def ldLC(self):
         """Loads the contents of C into L."""
-        self._ldRR(self.l, self.c)
+        r = self._r
+        r.l = r.c
 
     def ldLD(self):
         """Loads the contents of D into L."""
-        self._ldRR(self.l, self.d)
+        r = self._r
+        r.l = r.d
 
     def ldLE(self):
         """Loads the contents of E into L."""
-        self._ldRR(self.l, self.e)
+        r = self._r
+        r.l = r.e
 
     def ldLH(self):
         """Loads the contents of H into L."""
-        self._ldRR(self.l, self.h)
+        r = self._r
+        r.l = r.h
 
     def ldLL(self):
         """Loads the contents of L into L."""
-        self._ldRR(self.l, self.l)
+        r = self._r
+        r.l = r.l
 
     def ldLMemHL(self):
         """Loads the value at memory address in HL into L."""
-        self._ldRMemHL(self.l)
+        r = self._r
+        r.l = self._mem.get8((r.h << 8) | r.l)
 
     def ldLA(self):
         """Loads the contents of A into L."""
-        self._ldRR(self.l, self.a)
+        r = self._r
+        r.l = r.a
 
     def ldMemHLB(self):
         """Loads B into the memory address in HL."""
-        self._ldMemHLR(self.b)
+        r = self._r
+        self._mem.set8((r.h << 8) | r.l, r.b)
 
     def ldMemHLC(self):
         """Loads C into the memory address in HL."""
-        self._ldMemHLR(self.c)
+        r = self._r
+        self._mem.set8((r.h << 8) | r.l, r.c)
 
     def ldMemHLD(self):
         """Loads D into the memory address in HL."""
-        self._ldMemHLR(self.d)
+        r = self._r
+        self._mem.set8((r.h << 8) | r.l, r.d)
 
     def ldMemHLE(self):
         """Loads E into the memory address in HL."""
-        self._ldMemHLR(self.e)
+        r = self._r
+        self._mem.set8((r.h << 8) | r.l, r.e)
 
     def ldMemHLH(self):
         """Loads H into the memory address in HL."""
-        self._ldMemHLR(self.h)
+        r = self._r
+        self._mem.set8((r.h << 8) | r.l, r.h)
 
     def ldMemHLL(self):
         """Loads L into the memory address in HL."""
-        self._ldMemHLR(self.l)
+        r = self._r
+        self._mem.set8((r.h << 8) | r.l, r.l)
 
     def halt(self):
-        raise NotImplementedError("'HALT' has not been implemented")
+        """Suspends the CPU until an interrupt is requested."""
+        self._halted = True
+        # An interrupt may already be pending, which ends the HALT at once.
+        self.checkIntrs()
 
     def ldMemHLA(self):
         """Loads A into the memory address in HL."""
-        self._ldMemHLR(self.a)
+        r = self._r
+        self._mem.set8((r.h << 8) | r.l, r.a)
 
     def ldAB(self):
         """Loads the contents of B into A."""
-        self._ldRR(self.a, self.b)
+        r = self._r
+        r.a = r.b
 
     def ldAC(self):
         """Loads the contents of C into A."""
-        self._ldRR(self.a, self.c)
+        r = self._r
+        r.a = r.c
 
     def ldAD(self):
         """Loads the contents of D into A."""
-        self._ldRR(self.a, self.d)
+        r = self._r
+        r.a = r.d
 
     def ldAE(self):
         """Loads the contents of E into A."""
-        self._ldRR(self.a, self.e)
+        r = self._r
+        r.a = r.e
 
     def ldAH(self):
         """Loads the contents of H into A."""
-        self._ldRR(self.a, self.h)
+        r = self._r
+        r.a = r.h
 
     def ldAL(self):
         """Loads the contents of L into A."""
-        self._ldRR(self.a, self.l)
+        r = self._r
+        r.a = r.l
 
     def ldAMemHL(self):
         """Loads the value at memory address in HL into A."""
-        self._ldRMemHL(self.a)
+        r = self._r
+        r.a = self._mem.get8((r.h << 8) | r.l)
 
     def ldAA(self):
         """Loads the contents of A into A."""
-        self._ldRR(self.a, self.a)
+        r = self._r
+        r.a = r.a
 
     def addAB(self):
         """Adds A and B and stores the result in A."""
-        self._addAR(self.b)
+        self._add8(self._r.b)
 
     def addAC(self):
         """Adds A and C and stores the result in A."""
-        self._addAR(self.c)
+        self._add8(self._r.c)
 
     def addAD(self):
         """Adds A and D and stores the result in A."""
-        self._addAR(self.d)
+        self._add8(self._r.d)
 
     def addAE(self):
         """Adds A and E and stores the result in A."""
-        self._addAR(self.e)
+        self._add8(self._r.e)
 
     def addAH(self):
         """Adds A and H and stores the result in A."""
-        self._addAR(self.h)
+        self._add8(self._r.h)
 
     def addAL(self):
         """Adds A and L and stores the result in A."""
-        self._addAR(self.l)
+        self._add8(self._r.l)
 
     def addAMemHL(self):
         """Adds A and value stored at address in HL and stores result in A."""
-        self.addAn(self._mem.get8(self._hl()))
+        self._add8(self._getMemHL())
 
     def addAA(self):
         """Adds A and A and stores the result in A."""
-        self._addAR(self.a)
+        self._add8(self._r.a)
 
     def adcAB(self):
         """Adds A, Carry and B and stores the result in A."""
-        self._adcAR(self.b)
+        self._adc8(self._r.b)
 
     def adcAC(self):
         """Adds A, Carry and C and stores the result in A."""
-        self._adcAR(self.c)
+        self._adc8(self._r.c)
 
     def adcAD(self):
         """Adds A, Carry and D and stores the result in A."""
-        self._adcAR(self.d)
+        self._adc8(self._r.d)
 
     def adcAE(self):
         """Adds A, Carry and E and stores the result in A."""
-        self._adcAR(self.e)
+        self._adc8(self._r.e)
 
     def adcAH(self):
         """Adds A, Carry and H and stores the result in A."""
-        self._adcAR(self.h)
+        self._adc8(self._r.h)
 
     def adcAL(self):
         """Adds A, Carry and L and stores the result in A."""
-        self._adcAR(self.l)
+        self._adc8(self._r.l)
 
     def adcAMemHL(self):
         """Adds A, Carry and value at address in HL, stores result in A."""
-        self._adcAn(self._mem.get8(self._hl()))
+        self._adc8(self._getMemHL())
 
     def adcAA(self):
         """Adds A, Carry and A and stores the result in A."""
-        self._adcAR(self.a)
+        self._adc8(self._r.a)
 
     def subAB(self):
         """Subtracts B from A and stores the result in A."""
-        self._subAR(self.b)
+        self._sub8(self._r.b)
 
     def subAC(self):
         """Subtracts C from A and stores the result in A."""
-        self._subAR(self.c)
+        self._sub8(self._r.c)
 
     def subAD(self):
         """Subtracts D from A and stores the result in A."""
-        self._subAR(self.d)
+        self._sub8(self._r.d)
 
     def subAE(self):
         """Subtracts E from A and stores the result in A."""
-        self._subAR(self.e)
+        self._sub8(self._r.e)
 
     def subAH(self):
         """Subtracts H from A and stores the result in A."""
-        self._subAR(self.h)
+        self._sub8(self._r.h)
 
     def subAL(self):
         """Subtracts L from A and stores the result in A."""
-        self._subAR(self.l)
+        self._sub8(self._r.l)
 
     def subAMemHL(self):
         """Subtracts value at address in HL from A and stores result in A."""
-        self._subAn(self._mem.get8(self._hl()))
+        self._sub8(self._getMemHL())
 
     def subAA(self):
         """Subtracts A from A and stores the result in A."""
-        self._subAR(self.a)
+        self._sub8(self._r.a)
 
     def sbcAB(self):
         """Subtracts B + Carry from A and stores the result in A."""
-        self._sbcAR(self.b)
+        self._sbc8(self._r.b)
 
     def sbcAC(self):
         """Subtracts C + Carry from A and stores the result in A."""
-        self._sbcAR(self.c)
+        self._sbc8(self._r.c)
 
     def sbcAD(self):
         """Subtracts D + Carry from A and stores the result in A."""
-        self._sbcAR(self.d)
+        self._sbc8(self._r.d)
 
     def sbcAE(self):
         """Subtracts E + Carry from A and stores the result in A."""
-        self._sbcAR(self.e)
+        self._sbc8(self._r.e)
 
     def sbcAH(self):
         """Subtracts H + Carry from A and stores the result in A."""
-        self._sbcAR(self.h)
+        self._sbc8(self._r.h)
 
     def sbcAL(self):
         """Subtracts L + Carry from A and stores the result in A."""
-        self._sbcAR(self.l)
+        self._sbc8(self._r.l)
 
     def sbcAMemHL(self):
         """Subtracts value at address in HL + C from A, stores result in A."""
-        self._sbcAn(self._mem.get8(self._hl()))
+        self._sbc8(self._getMemHL())
 
     def sbcAA(self):
         """Subtracts A + Carry from A and stores the result in A."""
-        self._sbcAR(self.a)
+        self._sbc8(self._r.a)
 
     def andB(self):
         """Bitwise ANDs A and B and stores the result in A."""
-        self._bitwiseR(self.AND, self.b)
+        self._and8(self._r.b)
 
     def andC(self):
         """Bitwise ANDs A and C and stores the result in A."""
-        self._bitwiseR(self.AND, self.c)
+        self._and8(self._r.c)
 
     def andD(self):
         """Bitwise ANDs A and D and stores the result in A."""
-        self._bitwiseR(self.AND, self.d)
+        self._and8(self._r.d)
 
     def andE(self):
         """Bitwise ANDs A and E and stores the result in A."""
-        self._bitwiseR(self.AND, self.e)
+        self._and8(self._r.e)
 
     def andH(self):
         """Bitwise ANDs A and H and stores the result in A."""
-        self._bitwiseR(self.AND, self.h)
+        self._and8(self._r.h)
 
     def andL(self):
         """Bitwise ANDs A and L and stores the result in A."""
-        self._bitwiseR(self.AND, self.l)
+        self._and8(self._r.l)
 
     def andMemHL(self):
         """Bitwise ANDs A and value at address in HL and stores result in A."""
-        self._bitwisen(self.AND, self._mem.get8(self._hl()))
+        self._and8(self._getMemHL())
 
     def andA(self):
         """Bitwise ANDs A and A and stores the result in A."""
-        self._bitwiseR(self.AND, self.a)
+        self._and8(self._r.a)
 
     def xorB(self):
         """Bitwise XORs A and B and stores the result in A."""
-        self._bitwiseR(self.XOR, self.b)
+        self._xor8(self._r.b)
 
     def xorC(self):
         """Bitwise XORs A and C and stores the result in A."""
-        self._bitwiseR(self.XOR, self.c)
+        self._xor8(self._r.c)
 
     def xorD(self):
         """Bitwise XORs A and D and stores the result in A."""
-        self._bitwiseR(self.XOR, self.d)
+        self._xor8(self._r.d)
 
     def xorE(self):
         """Bitwise XORs A and E and stores the result in A."""
-        self._bitwiseR(self.XOR, self.e)
+        self._xor8(self._r.e)
 
     def xorH(self):
         """Bitwise XORs A and H and stores the result in A."""
-        self._bitwiseR(self.XOR, self.h)
+        self._xor8(self._r.h)
 
     def xorL(self):
         """Bitwise XORs A and L and stores the result in A."""
-        self._bitwiseR(self.XOR, self.l)
+        self._xor8(self._r.l)
 
     def xorMemHL(self):
         """Bitwise XORs A and value at address in HL and stores result in A."""
-        self._bitwisen(self.XOR, self._mem.get8(self._hl()))
+        self._xor8(self._getMemHL())
 
     def xorA(self):
         """Bitwise XORs A and A and stores the result in A."""
-        self._bitwiseR(self.XOR, self.a)
+        self._xor8(self._r.a)
 
     def orB(self):
         """Bitwise ORs A and B and stores the result in A."""
-        self._bitwiseR(self.OR, self.b)
+        self._or8(self._r.b)
 
     def orC(self):
         """Bitwise ORs A and C and stores the result in A."""
-        self._bitwiseR(self.OR, self.c)
+        self._or8(self._r.c)
 
     def orD(self):
         """Bitwise ORs A and D and stores the result in A."""
-        self._bitwiseR(self.OR, self.d)
+        self._or8(self._r.d)
 
     def orE(self):
         """Bitwise ORs A and E and stores the result in A."""
-        self._bitwiseR(self.OR, self.e)
+        self._or8(self._r.e)
 
     def orH(self):
         """Bitwise ORs A and H and stores the result in A."""
-        self._bitwiseR(self.OR, self.h)
+        self._or8(self._r.h)
 
     def orL(self):
         """Bitwise ORs A and L and stores the result in A."""
-        self._bitwiseR(self.OR, self.l)
+        self._or8(self._r.l)
 
     def orMemHL(self):
         """Bitwise ORs A and value at address in HL and stores result in A."""
-        self._bitwisen(self.OR, self._mem.get8(self._hl()))
+        self._or8(self._getMemHL())
 
     def orA(self):
         """Bitwise ORs A and A and stores the result in A."""
-        self._bitwiseR(self.OR, self.a)
+        self._or8(self._r.a)
 
     def cpB(self):
         """Updates the flags with the result of subtracting B from A."""
-        self._cpR(self.b)
+        self._cp8(self._r.b)
 
     def cpC(self):
         """Updates the flags with the result of subtracting C from A."""
-        self._cpR(self.c)
+        self._cp8(self._r.c)
 
     def cpD(self):
         """Updates the flags with the result of subtracting D from A."""
-        self._cpR(self.d)
+        self._cp8(self._r.d)
 
     def cpE(self):
         """Updates the flags with the result of subtracting E from A."""
-        self._cpR(self.e)
+        self._cp8(self._r.e)
 
     def cpH(self):
         """Updates the flags with the result of subtracting H from A."""
-        self._cpR(self.h)
+        self._cp8(self._r.h)
 
     def cpL(self):
         """Updates the flags with the result of subtracting L from A."""
-        self._cpR(self.l)
+        self._cp8(self._r.l)
 
     def cpMemHL(self):
         """Updates flags after subtracting value at address in HL from A."""
-        self._cpn(self._mem.get8(self._hl()))
+        self._cp8(self._getMemHL())
 
     def cpA(self):
         """Updates the flags with the result of subtracting A from A."""
-        self._cpR(self.a)
+        self._cp8(self._r.a)
 
     def retNZ(self):
         """Pops the top two bytes of the stack into the PC if Z is not set."""
-        if not self.f.z.val():
-            self.pc.ld(self._pop16())
+        if self._r.fres & 0xff:
+            self._r.pc = self._pop16()
 
     def popBC(self):
         """Pops the top two bytes of the stack into BC."""
-        self._popRR(self.b, self.c)
+        v = self._pop16()
+        r = self._r
+        r.b = v >> 8
+        r.c = v & 0xff
 
     def jpNZnn(self, loOrdByte, hiOrdByte):
         """Loads little-endian word into PC if Z is not set."""
-        self._jpcnn(not self.f.z.val(), loOrdByte, hiOrdByte)
+        self._jpcnn(self._r.fres & 0xff, loOrdByte, hiOrdByte)
 
     def jpnn(self, loOrdByte, hiOrdByte):
         """Loads little-endian word into PC."""
@@ -1399,15 +1824,17 @@ class Z80:
 
     def callNZnn(self, lsb, msb):
         """Pushes PC and loads little-endian word into PC if Z is reset."""
-        self._callcnn(not self.f.z.val(), lsb, msb)
+        self._callcnn(self._r.fres & 0xff, lsb, msb)
 
     def pushBC(self):
         """Pushes the contents of BC onto the top of the stack."""
-        self._pushRR(self.b, self.c)
+        r = self._r
+        self._push16((r.b << 8) | r.c)
 
     def addAn(self, n):
         """Adds A and n and stores the result in A."""
-        self._arithAn(n, self.POSITIVE, self.WITHOUT_CARRY)
+        self._assertByte(n)
+        self._add8(n)
 
     def rst0(self):
         """Pushes the PC onto the top of the stack and jumps to 0x0000."""
@@ -1415,40 +1842,46 @@ class Z80:
 
     def retZ(self):
         """Pops the top two bytes of the stack into the PC if Z is set."""
-        if self.f.z.val():
-            self.pc.ld(self._pop16())
+        if not self._r.fres & 0xff:
+            self._r.pc = self._pop16()
 
     def ret(self):
         """Pops the top two bytes of the stack into the PC."""
-        self.pc.ld(self._pop16())
+        self._r.pc = self._pop16()
 
     def jpZnn(self, loOrdByte, hiOrdByte):
         """Loads little-endian word into PC if Z is set."""
-        self._jpcnn(self.f.z.val(), loOrdByte, hiOrdByte)
+        self._jpcnn(not self._r.fres & 0xff, loOrdByte, hiOrdByte)
 
     def rlcB(self):
         """B is rotated left 1-bit position - bit 7 goes into C and bit 0."""
-        self._rlcR(self.b)
+        r = self._r
+        r.b = self._rlc8(r.b)
 
     def rlcC(self):
         """C is rotated left 1-bit position - bit 7 goes into C and bit 0."""
-        self._rlcR(self.c)
+        r = self._r
+        r.c = self._rlc8(r.c)
 
     def rlcD(self):
         """D is rotated left 1-bit position - bit 7 goes into C and bit 0."""
-        self._rlcR(self.d)
+        r = self._r
+        r.d = self._rlc8(r.d)
 
     def rlcE(self):
         """E is rotated left 1-bit position - bit 7 goes into C and bit 0."""
-        self._rlcR(self.e)
+        r = self._r
+        r.e = self._rlc8(r.e)
 
     def rlcH(self):
         """H is rotated left 1-bit position - bit 7 goes into C and bit 0."""
-        self._rlcR(self.h)
+        r = self._r
+        r.h = self._rlc8(r.h)
 
     def rlcL(self):
         """L is rotated left 1-bit position - bit 7 goes into C and bit 0."""
-        self._rlcR(self.l)
+        r = self._r
+        r.l = self._rlc8(r.l)
 
     def rlcMemHL(self):
         """
@@ -1456,41 +1889,42 @@ class Z80:
         Carry and bit 0.
 
         """
-        r = self._getMemHL()
-        c = (r >> 7) & 1
-        self._setMemHL(((r << 1) & 0xff) | c)
-        self.f.z.setTo(self._getMemHL() == 0)  # NOTE Z is unaffected on Z80
-        self.f.n.reset()
-        self.f.h.reset()
-        self.f.c.setTo(c == 1)
+        self._setMemHL(self._rlc8(self._getMemHL()))
 
     def rlcA(self):
         """A is rotated left 1-bit position - bit 7 goes into C and bit 0."""
-        self._rlcR(self.a)
+        r = self._r
+        r.a = self._rlc8(r.a)
 
     def rrcB(self):
         """B is rotated right 1-bit position - bit 0 goes into C and bit 7."""
-        self._rrcR(self.b)
+        r = self._r
+        r.b = self._rrc8(r.b)
 
     def rrcC(self):
         """C is rotated right 1-bit position - bit 0 goes into C and bit 7."""
-        self._rrcR(self.c)
+        r = self._r
+        r.c = self._rrc8(r.c)
 
     def rrcD(self):
         """D is rotated right 1-bit position - bit 0 goes into C and bit 7."""
-        self._rrcR(self.d)
+        r = self._r
+        r.d = self._rrc8(r.d)
 
     def rrcE(self):
         """E is rotated right 1-bit position - bit 0 goes into C and bit 7."""
-        self._rrcR(self.e)
+        r = self._r
+        r.e = self._rrc8(r.e)
 
     def rrcH(self):
         """H is rotated right 1-bit position - bit 0 goes into C and bit 7."""
-        self._rrcR(self.h)
+        r = self._r
+        r.h = self._rrc8(r.h)
 
     def rrcL(self):
         """L is rotated right 1-bit position - bit 0 goes into C and bit 7."""
-        self._rrcR(self.l)
+        r = self._r
+        r.l = self._rrc8(r.l)
 
     def rrcMemHL(self):
         """
@@ -1498,47 +1932,48 @@ class Z80:
         into Carry and bit 7.
 
         """
-        r = self._getMemHL()
-        c = r & 1
-        self._setMemHL(((r >> 1) & 0xff) | c << 7)
-        self.f.z.setTo(self._getMemHL() == 0)  # NOTE Z is unaffected on Z80
-        self.f.n.reset()
-        self.f.h.reset()
-        self.f.c.setTo(c == 1)
+        self._setMemHL(self._rrc8(self._getMemHL()))
 
     def rrcA(self):
         """A is rotated right 1-bit position - bit 0 goes into C and bit 7."""
-        self._rrcR(self.a)
+        r = self._r
+        r.a = self._rrc8(r.a)
 
     def rlB(self):
         """B is rotated left 1-bit position - bit 7 goes into C and C goes into
         bit 0."""
-        self._rlR(self.b)
+        r = self._r
+        r.b = self._rl8(r.b)
 
     def rlC(self):
         """C is rotated left 1-bit position - bit 7 goes into C and C goes into
         bit 0."""
-        self._rlR(self.c)
+        r = self._r
+        r.c = self._rl8(r.c)
 
     def rlD(self):
         """D is rotated left 1-bit position - bit 7 goes into C and C goes into
         bit 0."""
-        self._rlR(self.d)
+        r = self._r
+        r.d = self._rl8(r.d)
 
     def rlE(self):
         """E is rotated left 1-bit position - bit 7 goes into C and C goes into
         bit 0."""
-        self._rlR(self.e)
+        r = self._r
+        r.e = self._rl8(r.e)
 
     def rlH(self):
         """H is rotated left 1-bit position - bit 7 goes into C and C goes into
         bit 0."""
-        self._rlR(self.h)
+        r = self._r
+        r.h = self._rl8(r.h)
 
     def rlL(self):
         """L is rotated left 1-bit position - bit 7 goes into C and C goes into
         bit 0."""
-        self._rlR(self.l)
+        r = self._r
+        r.l = self._rl8(r.l)
 
     def rlMemHL(self):
         """
@@ -1546,48 +1981,49 @@ class Z80:
         Carry and bit 0.
 
         """
-        r = self._getMemHL()
-        c = (r >> 7) & 1
-        self._setMemHL(((r << 1) & 0xff) | (1 if self.f.c.val() else 0))
-        self.f.z.setTo(self._getMemHL() == 0)  # NOTE Z is unaffected on Z80
-        self.f.n.reset()
-        self.f.h.reset()
-        self.f.c.setTo(c == 1)
+        self._setMemHL(self._rl8(self._getMemHL()))
 
     def rlA(self):
         """A is rotated left 1-bit position - bit 7 goes into C and C goes into
         bit 0."""
-        self._rlR(self.a)
+        r = self._r
+        r.a = self._rl8(r.a)
 
     def rrB(self):
         """B is rotated right 1-bit position - bit 0 goes into C and C goes
         into bit 7."""
-        self._rrR(self.b)
+        r = self._r
+        r.b = self._rr8(r.b)
 
     def rrC(self):
         """C is rotated right 1-bit position - bit 0 goes into C and C goes
         into bit 7."""
-        self._rrR(self.c)
+        r = self._r
+        r.c = self._rr8(r.c)
 
     def rrD(self):
         """D is rotated right 1-bit position - bit 0 goes into C and C goes
         into bit 7."""
-        self._rrR(self.d)
+        r = self._r
+        r.d = self._rr8(r.d)
 
     def rrE(self):
         """E is rotated right 1-bit position - bit 0 goes into C and C goes
         into bit 7."""
-        self._rrR(self.e)
+        r = self._r
+        r.e = self._rr8(r.e)
 
     def rrH(self):
         """H is rotated right 1-bit position - bit 0 goes into C and C goes
         into bit 7."""
-        self._rrR(self.h)
+        r = self._r
+        r.h = self._rr8(r.h)
 
     def rrL(self):
         """L is rotated right 1-bit position - bit 0 goes into C and C goes
         into bit 7."""
-        self._rrR(self.l)
+        r = self._r
+        r.l = self._rr8(r.l)
 
     def rrMemHL(self):
         """
@@ -1595,47 +2031,49 @@ class Z80:
         into C and C goes into bit 7.
 
         """
-        r = self._getMemHL()
-        self._setMemHL(((r >> 1) & 0xff) | (1 if self.f.c.val() else 0) << 7)
-        self.f.z.setTo(self._getMemHL() == 0)  # NOTE Z is unaffected on Z80
-        self.f.n.reset()
-        self.f.h.reset()
-        self.f.c.setTo(r & 1 == 1)
+        self._setMemHL(self._rr8(self._getMemHL()))
 
     def rrA(self):
         """A is rotated right 1-bit position - bit 0 goes into C and C goes
         into bit 7."""
-        self._rrR(self.a)
+        r = self._r
+        r.a = self._rr8(r.a)
 
     def slaB(self):
         """B is rotated left 1-bit position - bit 7 goes into Carry and 0 goes
         into bit 0."""
-        self._slaR(self.b)
+        r = self._r
+        r.b = self._sla8(r.b)
 
     def slaC(self):
         """C is rotated left 1-bit position - bit 7 goes into Carry and 0 goes
         into bit 0."""
-        self._slaR(self.c)
+        r = self._r
+        r.c = self._sla8(r.c)
 
     def slaD(self):
         """D is rotated left 1-bit position - bit 7 goes into Carry and 0 goes
         into bit 0."""
-        self._slaR(self.d)
+        r = self._r
+        r.d = self._sla8(r.d)
 
     def slaE(self):
         """E is rotated left 1-bit position - bit 7 goes into Carry and 0 goes
         into bit 0."""
-        self._slaR(self.e)
+        r = self._r
+        r.e = self._sla8(r.e)
 
     def slaH(self):
         """H is rotated left 1-bit position - bit 7 goes into Carry and 0 goes
         into bit 0."""
-        self._slaR(self.h)
+        r = self._r
+        r.h = self._sla8(r.h)
 
     def slaL(self):
         """L is rotated left 1-bit position - bit 7 goes into Carry and 0 goes
         into bit 0."""
-        self._slaR(self.l)
+        r = self._r
+        r.l = self._sla8(r.l)
 
     def slaMemHL(self):
         """
@@ -1643,42 +2081,49 @@ class Z80:
         Carry and 0 goes into bit 0.
 
         """
-        self._slan(self._getMemHL, self._setMemHL)
+        self._setMemHL(self._sla8(self._getMemHL()))
 
     def slaA(self):
         """A is rotated left 1-bit position - bit 7 goes into Carry and 0 goes
         into bit 0."""
-        self._slaR(self.a)
+        r = self._r
+        r.a = self._sla8(r.a)
 
     def sraB(self):
         """B is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         retains its value."""
-        self._sraR(self.b)
+        r = self._r
+        r.b = self._sra8(r.b)
 
     def sraC(self):
         """C is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         retains its value."""
-        self._sraR(self.c)
+        r = self._r
+        r.c = self._sra8(r.c)
 
     def sraD(self):
         """D is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         retains its value."""
-        self._sraR(self.d)
+        r = self._r
+        r.d = self._sra8(r.d)
 
     def sraE(self):
         """E is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         retains its value."""
-        self._sraR(self.e)
+        r = self._r
+        r.e = self._sra8(r.e)
 
     def sraH(self):
         """H is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         retains its value."""
-        self._sraR(self.h)
+        r = self._r
+        r.h = self._sra8(r.h)
 
     def sraL(self):
         """L is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         retains its value."""
-        self._sraR(self.l)
+        r = self._r
+        r.l = self._sra8(r.l)
 
     def sraMemHL(self):
         """
@@ -1686,36 +2131,43 @@ class Z80:
         into Carry and bit 7 retains its value.
 
         """
-        self._sran(self._getMemHL, self._setMemHL)
+        self._setMemHL(self._sra8(self._getMemHL()))
 
     def sraA(self):
         """A is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         retains its value."""
-        self._sraR(self.a)
+        r = self._r
+        r.a = self._sra8(r.a)
 
     def swapB(self):
         """Swaps the most significant and least significant nibbles of B."""
-        self._swapR(self.b)
+        r = self._r
+        r.b = self._swap8(r.b)
 
     def swapC(self):
         """Swaps the most significant and least significant nibbles of C."""
-        self._swapR(self.c)
+        r = self._r
+        r.c = self._swap8(r.c)
 
     def swapD(self):
         """Swaps the most significant and least significant nibbles of D."""
-        self._swapR(self.d)
+        r = self._r
+        r.d = self._swap8(r.d)
 
     def swapE(self):
         """Swaps the most significant and least significant nibbles of E."""
-        self._swapR(self.e)
+        r = self._r
+        r.e = self._swap8(r.e)
 
     def swapH(self):
         """Swaps the most significant and least significant nibbles of H."""
-        self._swapR(self.h)
+        r = self._r
+        r.h = self._swap8(r.h)
 
     def swapL(self):
         """Swaps the most significant and least significant nibbles of L."""
-        self._swapR(self.l)
+        r = self._r
+        r.l = self._swap8(r.l)
 
     def swapMemHL(self):
         """
@@ -1723,41 +2175,48 @@ class Z80:
         at address in HL.
 
         """
-        self._swapn(self._getMemHL, self._setMemHL)
+        self._setMemHL(self._swap8(self._getMemHL()))
 
     def swapA(self):
         """Swaps the most significant and least significant nibbles of A."""
-        self._swapR(self.a)
+        r = self._r
+        r.a = self._swap8(r.a)
 
     def srlB(self):
         """B is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         is reset."""
-        self._srlR(self.b)
+        r = self._r
+        r.b = self._srl8(r.b)
 
     def srlC(self):
         """C is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         is reset."""
-        self._srlR(self.c)
+        r = self._r
+        r.c = self._srl8(r.c)
 
     def srlD(self):
         """D is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         is reset."""
-        self._srlR(self.d)
+        r = self._r
+        r.d = self._srl8(r.d)
 
     def srlE(self):
         """E is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         is reset."""
-        self._srlR(self.e)
+        r = self._r
+        r.e = self._srl8(r.e)
 
     def srlH(self):
         """H is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         is reset."""
-        self._srlR(self.h)
+        r = self._r
+        r.h = self._srl8(r.h)
 
     def srlL(self):
         """L is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         is reset."""
-        self._srlR(self.l)
+        r = self._r
+        r.l = self._srl8(r.l)
 
     def srlMemHL(self):
         """
@@ -1765,780 +2224,781 @@ class Z80:
         into Carry and bit 7 is reset.
 
         """
-        self._srln(self._getMemHL, self._setMemHL)
+        self._setMemHL(self._srl8(self._getMemHL()))
 
     def srlA(self):
         """A is rotated right 1-bit position - bit 0 goes into Carry and bit 7
         is reset."""
-        self._srlR(self.a)
+        r = self._r
+        r.a = self._srl8(r.a)
 
     def bit0B(self):
         """Sets flag Z if bit 0 of B is reset."""
-        self._bitBR(0, self.b)
+        self._bit8(0, self._r.b)
 
     def bit0C(self):
         """Sets flag Z if bit 0 of C is reset."""
-        self._bitBR(0, self.c)
+        self._bit8(0, self._r.c)
 
     def bit0D(self):
         """Sets flag Z if bit 0 of D is reset."""
-        self._bitBR(0, self.d)
+        self._bit8(0, self._r.d)
 
     def bit0E(self):
         """Sets flag Z if bit 0 of E is reset."""
-        self._bitBR(0, self.e)
+        self._bit8(0, self._r.e)
 
     def bit0H(self):
         """Sets flag Z if bit 0 of H is reset."""
-        self._bitBR(0, self.h)
+        self._bit8(0, self._r.h)
 
     def bit0L(self):
         """Sets flag Z if bit 0 of L is reset."""
-        self._bitBR(0, self.l)
+        self._bit8(0, self._r.l)
 
     def bit0MemHL(self):
         """Sets flag Z if bit 0 of value at address in HL is reset."""
-        self._bitBn(0, self._getMemHL)
+        self._bit8(0, self._getMemHL())
 
     def bit0A(self):
         """Sets flag Z if bit 0 of A is reset."""
-        self._bitBR(0, self.a)
+        self._bit8(0, self._r.a)
 
     def bit1B(self):
         """Sets flag Z if bit 1 of B is reset."""
-        self._bitBR(1, self.b)
+        self._bit8(1, self._r.b)
 
     def bit1C(self):
         """Sets flag Z if bit 1 of C is reset."""
-        self._bitBR(1, self.c)
+        self._bit8(1, self._r.c)
 
     def bit1D(self):
         """Sets flag Z if bit 1 of D is reset."""
-        self._bitBR(1, self.d)
+        self._bit8(1, self._r.d)
 
     def bit1E(self):
         """Sets flag Z if bit 1 of E is reset."""
-        self._bitBR(1, self.e)
+        self._bit8(1, self._r.e)
 
     def bit1H(self):
         """Sets flag Z if bit 1 of H is reset."""
-        self._bitBR(1, self.h)
+        self._bit8(1, self._r.h)
 
     def bit1L(self):
         """Sets flag Z if bit 1 of L is reset."""
-        self._bitBR(1, self.l)
+        self._bit8(1, self._r.l)
 
     def bit1MemHL(self):
         """Sets flag Z if bit 1 of value at address in HL is reset."""
-        self._bitBn(1, self._getMemHL)
+        self._bit8(1, self._getMemHL())
 
     def bit1A(self):
         """Sets flag Z if bit 1 of A is reset."""
-        self._bitBR(1, self.a)
+        self._bit8(1, self._r.a)
 
     def bit2B(self):
         """Sets flag Z if bit 2 of B is reset."""
-        self._bitBR(2, self.b)
+        self._bit8(2, self._r.b)
 
     def bit2C(self):
         """Sets flag Z if bit 2 of C is reset."""
-        self._bitBR(2, self.c)
+        self._bit8(2, self._r.c)
 
     def bit2D(self):
         """Sets flag Z if bit 2 of D is reset."""
-        self._bitBR(2, self.d)
+        self._bit8(2, self._r.d)
 
     def bit2E(self):
         """Sets flag Z if bit 2 of E is reset."""
-        self._bitBR(2, self.e)
+        self._bit8(2, self._r.e)
 
     def bit2H(self):
         """Sets flag Z if bit 2 of H is reset."""
-        self._bitBR(2, self.h)
+        self._bit8(2, self._r.h)
 
     def bit2L(self):
         """Sets flag Z if bit 2 of L is reset."""
-        self._bitBR(2, self.l)
+        self._bit8(2, self._r.l)
 
     def bit2MemHL(self):
         """Sets flag Z if bit 2 of value at address in HL is reset."""
-        self._bitBn(2, self._getMemHL)
+        self._bit8(2, self._getMemHL())
 
     def bit2A(self):
         """Sets flag Z if bit 2 of A is reset."""
-        self._bitBR(2, self.a)
+        self._bit8(2, self._r.a)
 
     def bit3B(self):
         """Sets flag Z if bit 3 of B is reset."""
-        self._bitBR(3, self.b)
+        self._bit8(3, self._r.b)
 
     def bit3C(self):
         """Sets flag Z if bit 3 of C is reset."""
-        self._bitBR(3, self.c)
+        self._bit8(3, self._r.c)
 
     def bit3D(self):
         """Sets flag Z if bit 3 of D is reset."""
-        self._bitBR(3, self.d)
+        self._bit8(3, self._r.d)
 
     def bit3E(self):
         """Sets flag Z if bit 3 of E is reset."""
-        self._bitBR(3, self.e)
+        self._bit8(3, self._r.e)
 
     def bit3H(self):
         """Sets flag Z if bit 3 of H is reset."""
-        self._bitBR(3, self.h)
+        self._bit8(3, self._r.h)
 
     def bit3L(self):
         """Sets flag Z if bit 3 of L is reset."""
-        self._bitBR(3, self.l)
+        self._bit8(3, self._r.l)
 
     def bit3MemHL(self):
         """Sets flag Z if bit 3 of value at address in HL is reset."""
-        self._bitBn(3, self._getMemHL)
+        self._bit8(3, self._getMemHL())
 
     def bit3A(self):
         """Sets flag Z if bit 3 of A is reset."""
-        self._bitBR(3, self.a)
+        self._bit8(3, self._r.a)
 
     def bit4B(self):
         """Sets flag Z if bit 4 of B is reset."""
-        self._bitBR(4, self.b)
+        self._bit8(4, self._r.b)
 
     def bit4C(self):
         """Sets flag Z if bit 4 of C is reset."""
-        self._bitBR(4, self.c)
+        self._bit8(4, self._r.c)
 
     def bit4D(self):
         """Sets flag Z if bit 4 of D is reset."""
-        self._bitBR(4, self.d)
+        self._bit8(4, self._r.d)
 
     def bit4E(self):
         """Sets flag Z if bit 4 of E is reset."""
-        self._bitBR(4, self.e)
+        self._bit8(4, self._r.e)
 
     def bit4H(self):
         """Sets flag Z if bit 4 of H is reset."""
-        self._bitBR(4, self.h)
+        self._bit8(4, self._r.h)
 
     def bit4L(self):
         """Sets flag Z if bit 4 of L is reset."""
-        self._bitBR(4, self.l)
+        self._bit8(4, self._r.l)
 
     def bit4MemHL(self):
         """Sets flag Z if bit 4 of value at address in HL is reset."""
-        self._bitBn(4, self._getMemHL)
+        self._bit8(4, self._getMemHL())
 
     def bit4A(self):
         """Sets flag Z if bit 4 of A is reset."""
-        self._bitBR(4, self.a)
+        self._bit8(4, self._r.a)
 
     def bit5B(self):
         """Sets flag Z if bit 5 of B is reset."""
-        self._bitBR(5, self.b)
+        self._bit8(5, self._r.b)
 
     def bit5C(self):
         """Sets flag Z if bit 5 of C is reset."""
-        self._bitBR(5, self.c)
+        self._bit8(5, self._r.c)
 
     def bit5D(self):
         """Sets flag Z if bit 5 of D is reset."""
-        self._bitBR(5, self.d)
+        self._bit8(5, self._r.d)
 
     def bit5E(self):
         """Sets flag Z if bit 5 of E is reset."""
-        self._bitBR(5, self.e)
+        self._bit8(5, self._r.e)
 
     def bit5H(self):
         """Sets flag Z if bit 5 of H is reset."""
-        self._bitBR(5, self.h)
+        self._bit8(5, self._r.h)
 
     def bit5L(self):
         """Sets flag Z if bit 5 of L is reset."""
-        self._bitBR(5, self.l)
+        self._bit8(5, self._r.l)
 
     def bit5MemHL(self):
         """Sets flag Z if bit 5 of value at address in HL is reset."""
-        self._bitBn(5, self._getMemHL)
+        self._bit8(5, self._getMemHL())
 
     def bit5A(self):
         """Sets flag Z if bit 5 of A is reset."""
-        self._bitBR(5, self.a)
+        self._bit8(5, self._r.a)
 
     def bit6B(self):
         """Sets flag Z if bit 6 of B is reset."""
-        self._bitBR(6, self.b)
+        self._bit8(6, self._r.b)
 
     def bit6C(self):
         """Sets flag Z if bit 6 of C is reset."""
-        self._bitBR(6, self.c)
+        self._bit8(6, self._r.c)
 
     def bit6D(self):
         """Sets flag Z if bit 6 of D is reset."""
-        self._bitBR(6, self.d)
+        self._bit8(6, self._r.d)
 
     def bit6E(self):
         """Sets flag Z if bit 6 of E is reset."""
-        self._bitBR(6, self.e)
+        self._bit8(6, self._r.e)
 
     def bit6H(self):
         """Sets flag Z if bit 6 of H is reset."""
-        self._bitBR(6, self.h)
+        self._bit8(6, self._r.h)
 
     def bit6L(self):
         """Sets flag Z if bit 6 of L is reset."""
-        self._bitBR(6, self.l)
+        self._bit8(6, self._r.l)
 
     def bit6MemHL(self):
         """Sets flag Z if bit 6 of value at address in HL is reset."""
-        self._bitBn(6, self._getMemHL)
+        self._bit8(6, self._getMemHL())
 
     def bit6A(self):
         """Sets flag Z if bit 6 of A is reset."""
-        self._bitBR(6, self.a)
+        self._bit8(6, self._r.a)
 
     def bit7B(self):
         """Sets flag Z if bit 7 of B is reset."""
-        self._bitBR(7, self.b)
+        self._bit8(7, self._r.b)
 
     def bit7C(self):
         """Sets flag Z if bit 7 of C is reset."""
-        self._bitBR(7, self.c)
+        self._bit8(7, self._r.c)
 
     def bit7D(self):
         """Sets flag Z if bit 7 of D is reset."""
-        self._bitBR(7, self.d)
+        self._bit8(7, self._r.d)
 
     def bit7E(self):
         """Sets flag Z if bit 7 of E is reset."""
-        self._bitBR(7, self.e)
+        self._bit8(7, self._r.e)
 
     def bit7H(self):
         """Sets flag Z if bit 7 of H is reset."""
-        self._bitBR(7, self.h)
+        self._bit8(7, self._r.h)
 
     def bit7L(self):
         """Sets flag Z if bit 7 of L is reset."""
-        self._bitBR(7, self.l)
+        self._bit8(7, self._r.l)
 
     def bit7MemHL(self):
         """Sets flag Z if bit 7 of value at address in HL is reset."""
-        self._bitBn(7, self._getMemHL)
+        self._bit8(7, self._getMemHL())
 
     def bit7A(self):
         """Sets flag Z if bit 7 of A is reset."""
-        self._bitBR(7, self.a)
+        self._bit8(7, self._r.a)
 
     def res0B(self):
         """Reset bit 0 of B."""
-        self._resBR(0, self.b)
+        self._r.b &= ~(1 << 0)
 
     def res0C(self):
         """Reset bit 0 of C."""
-        self._resBR(0, self.c)
+        self._r.c &= ~(1 << 0)
 
     def res0D(self):
         """Reset bit 0 of D."""
-        self._resBR(0, self.d)
+        self._r.d &= ~(1 << 0)
 
     def res0E(self):
         """Reset bit 0 of E."""
-        self._resBR(0, self.e)
+        self._r.e &= ~(1 << 0)
 
     def res0H(self):
         """Reset bit 0 of H."""
-        self._resBR(0, self.h)
+        self._r.h &= ~(1 << 0)
 
     def res0L(self):
         """Reset bit 0 of L."""
-        self._resBR(0, self.l)
+        self._r.l &= ~(1 << 0)
 
     def res0MemHL(self):
         """Reset bit 0 of value at address in HL."""
-        self._resBn(0, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() & ~(1 << 0))
 
     def res0A(self):
         """Reset bit 0 of A."""
-        self._resBR(0, self.a)
+        self._r.a &= ~(1 << 0)
 
     def res1B(self):
         """Reset bit 1 of B."""
-        self._resBR(1, self.b)
+        self._r.b &= ~(1 << 1)
 
     def res1C(self):
         """Reset bit 1 of C."""
-        self._resBR(1, self.c)
+        self._r.c &= ~(1 << 1)
 
     def res1D(self):
         """Reset bit 1 of D."""
-        self._resBR(1, self.d)
+        self._r.d &= ~(1 << 1)
 
     def res1E(self):
         """Reset bit 1 of E."""
-        self._resBR(1, self.e)
+        self._r.e &= ~(1 << 1)
 
     def res1H(self):
         """Reset bit 1 of H."""
-        self._resBR(1, self.h)
+        self._r.h &= ~(1 << 1)
 
     def res1L(self):
         """Reset bit 1 of L."""
-        self._resBR(1, self.l)
+        self._r.l &= ~(1 << 1)
 
     def res1MemHL(self):
         """Reset bit 1 of value at address in HL."""
-        self._resBn(1, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() & ~(1 << 1))
 
     def res1A(self):
         """Reset bit 1 of A."""
-        self._resBR(1, self.a)
+        self._r.a &= ~(1 << 1)
 
     def res2B(self):
         """Reset bit 2 of B."""
-        self._resBR(2, self.b)
+        self._r.b &= ~(1 << 2)
 
     def res2C(self):
         """Reset bit 2 of C."""
-        self._resBR(2, self.c)
+        self._r.c &= ~(1 << 2)
 
     def res2D(self):
         """Reset bit 2 of D."""
-        self._resBR(2, self.d)
+        self._r.d &= ~(1 << 2)
 
     def res2E(self):
         """Reset bit 2 of E."""
-        self._resBR(2, self.e)
+        self._r.e &= ~(1 << 2)
 
     def res2H(self):
         """Reset bit 2 of H."""
-        self._resBR(2, self.h)
+        self._r.h &= ~(1 << 2)
 
     def res2L(self):
         """Reset bit 2 of L."""
-        self._resBR(2, self.l)
+        self._r.l &= ~(1 << 2)
 
     def res2MemHL(self):
         """Reset bit 2 of value at address in HL."""
-        self._resBn(2, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() & ~(1 << 2))
 
     def res2A(self):
         """Reset bit 2 of A."""
-        self._resBR(2, self.a)
+        self._r.a &= ~(1 << 2)
 
     def res3B(self):
         """Reset bit 3 of B."""
-        self._resBR(3, self.b)
+        self._r.b &= ~(1 << 3)
 
     def res3C(self):
         """Reset bit 3 of C."""
-        self._resBR(3, self.c)
+        self._r.c &= ~(1 << 3)
 
     def res3D(self):
         """Reset bit 3 of D."""
-        self._resBR(3, self.d)
+        self._r.d &= ~(1 << 3)
 
     def res3E(self):
         """Reset bit 3 of E."""
-        self._resBR(3, self.e)
+        self._r.e &= ~(1 << 3)
 
     def res3H(self):
         """Reset bit 3 of H."""
-        self._resBR(3, self.h)
+        self._r.h &= ~(1 << 3)
 
     def res3L(self):
         """Reset bit 3 of L."""
-        self._resBR(3, self.l)
+        self._r.l &= ~(1 << 3)
 
     def res3MemHL(self):
         """Reset bit 3 of value at address in HL."""
-        self._resBn(3, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() & ~(1 << 3))
 
     def res3A(self):
         """Reset bit 3 of A."""
-        self._resBR(3, self.a)
+        self._r.a &= ~(1 << 3)
 
     def res4B(self):
         """Reset bit 4 of B."""
-        self._resBR(4, self.b)
+        self._r.b &= ~(1 << 4)
 
     def res4C(self):
         """Reset bit 4 of C."""
-        self._resBR(4, self.c)
+        self._r.c &= ~(1 << 4)
 
     def res4D(self):
         """Reset bit 4 of D."""
-        self._resBR(4, self.d)
+        self._r.d &= ~(1 << 4)
 
     def res4E(self):
         """Reset bit 4 of E."""
-        self._resBR(4, self.e)
+        self._r.e &= ~(1 << 4)
 
     def res4H(self):
         """Reset bit 4 of H."""
-        self._resBR(4, self.h)
+        self._r.h &= ~(1 << 4)
 
     def res4L(self):
         """Reset bit 4 of L."""
-        self._resBR(4, self.l)
+        self._r.l &= ~(1 << 4)
 
     def res4MemHL(self):
         """Reset bit 4 of value at address in HL."""
-        self._resBn(4, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() & ~(1 << 4))
 
     def res4A(self):
         """Reset bit 4 of A."""
-        self._resBR(4, self.a)
+        self._r.a &= ~(1 << 4)
 
     def res5B(self):
         """Reset bit 5 of B."""
-        self._resBR(5, self.b)
+        self._r.b &= ~(1 << 5)
 
     def res5C(self):
         """Reset bit 5 of C."""
-        self._resBR(5, self.c)
+        self._r.c &= ~(1 << 5)
 
     def res5D(self):
         """Reset bit 5 of D."""
-        self._resBR(5, self.d)
+        self._r.d &= ~(1 << 5)
 
     def res5E(self):
         """Reset bit 5 of E."""
-        self._resBR(5, self.e)
+        self._r.e &= ~(1 << 5)
 
     def res5H(self):
         """Reset bit 5 of H."""
-        self._resBR(5, self.h)
+        self._r.h &= ~(1 << 5)
 
     def res5L(self):
         """Reset bit 5 of L."""
-        self._resBR(5, self.l)
+        self._r.l &= ~(1 << 5)
 
     def res5MemHL(self):
         """Reset bit 5 of value at address in HL."""
-        self._resBn(5, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() & ~(1 << 5))
 
     def res5A(self):
         """Reset bit 5 of A."""
-        self._resBR(5, self.a)
+        self._r.a &= ~(1 << 5)
 
     def res6B(self):
         """Reset bit 6 of B."""
-        self._resBR(6, self.b)
+        self._r.b &= ~(1 << 6)
 
     def res6C(self):
         """Reset bit 6 of C."""
-        self._resBR(6, self.c)
+        self._r.c &= ~(1 << 6)
 
     def res6D(self):
         """Reset bit 6 of D."""
-        self._resBR(6, self.d)
+        self._r.d &= ~(1 << 6)
 
     def res6E(self):
         """Reset bit 6 of E."""
-        self._resBR(6, self.e)
+        self._r.e &= ~(1 << 6)
 
     def res6H(self):
         """Reset bit 6 of H."""
-        self._resBR(6, self.h)
+        self._r.h &= ~(1 << 6)
 
     def res6L(self):
         """Reset bit 6 of L."""
-        self._resBR(6, self.l)
+        self._r.l &= ~(1 << 6)
 
     def res6MemHL(self):
         """Reset bit 6 of value at address in HL."""
-        self._resBn(6, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() & ~(1 << 6))
 
     def res6A(self):
         """Reset bit 6 of A."""
-        self._resBR(6, self.a)
+        self._r.a &= ~(1 << 6)
 
     def res7B(self):
         """Reset bit 7 of B."""
-        self._resBR(7, self.b)
+        self._r.b &= ~(1 << 7)
 
     def res7C(self):
         """Reset bit 7 of C."""
-        self._resBR(7, self.c)
+        self._r.c &= ~(1 << 7)
 
     def res7D(self):
         """Reset bit 7 of D."""
-        self._resBR(7, self.d)
+        self._r.d &= ~(1 << 7)
 
     def res7E(self):
         """Reset bit 7 of E."""
-        self._resBR(7, self.e)
+        self._r.e &= ~(1 << 7)
 
     def res7H(self):
         """Reset bit 7 of H."""
-        self._resBR(7, self.h)
+        self._r.h &= ~(1 << 7)
 
     def res7L(self):
         """Reset bit 7 of L."""
-        self._resBR(7, self.l)
+        self._r.l &= ~(1 << 7)
 
     def res7MemHL(self):
         """Reset bit 7 of value at address in HL."""
-        self._resBn(7, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() & ~(1 << 7))
 
     def res7A(self):
         """Reset bit 7 of A."""
-        self._resBR(7, self.a)
+        self._r.a &= ~(1 << 7)
 
     def set0B(self):
         """Set bit 0 of B."""
-        self._setBR(0, self.b)
+        self._r.b |= 1 << 0
 
     def set0C(self):
         """Set bit 0 of C."""
-        self._setBR(0, self.c)
+        self._r.c |= 1 << 0
 
     def set0D(self):
         """Set bit 0 of D."""
-        self._setBR(0, self.d)
+        self._r.d |= 1 << 0
 
     def set0E(self):
         """Set bit 0 of E."""
-        self._setBR(0, self.e)
+        self._r.e |= 1 << 0
 
     def set0H(self):
         """Set bit 0 of H."""
-        self._setBR(0, self.h)
+        self._r.h |= 1 << 0
 
     def set0L(self):
         """Set bit 0 of L."""
-        self._setBR(0, self.l)
+        self._r.l |= 1 << 0
 
     def set0MemHL(self):
         """Set bit 0 of value at address in HL."""
-        self._setBn(0, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() | 1 << 0)
 
     def set0A(self):
         """Set bit 0 of A."""
-        self._setBR(0, self.a)
+        self._r.a |= 1 << 0
 
     def set1B(self):
         """Set bit 1 of B."""
-        self._setBR(1, self.b)
+        self._r.b |= 1 << 1
 
     def set1C(self):
         """Set bit 1 of C."""
-        self._setBR(1, self.c)
+        self._r.c |= 1 << 1
 
     def set1D(self):
         """Set bit 1 of D."""
-        self._setBR(1, self.d)
+        self._r.d |= 1 << 1
 
     def set1E(self):
         """Set bit 1 of E."""
-        self._setBR(1, self.e)
+        self._r.e |= 1 << 1
 
     def set1H(self):
         """Set bit 1 of H."""
-        self._setBR(1, self.h)
+        self._r.h |= 1 << 1
 
     def set1L(self):
         """Set bit 1 of L."""
-        self._setBR(1, self.l)
+        self._r.l |= 1 << 1
 
     def set1MemHL(self):
         """Set bit 1 of value at address in HL."""
-        self._setBn(1, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() | 1 << 1)
 
     def set1A(self):
         """Set bit 1 of A."""
-        self._setBR(1, self.a)
+        self._r.a |= 1 << 1
 
     def set2B(self):
         """Set bit 2 of B."""
-        self._setBR(2, self.b)
+        self._r.b |= 1 << 2
 
     def set2C(self):
         """Set bit 2 of C."""
-        self._setBR(2, self.c)
+        self._r.c |= 1 << 2
 
     def set2D(self):
         """Set bit 2 of D."""
-        self._setBR(2, self.d)
+        self._r.d |= 1 << 2
 
     def set2E(self):
         """Set bit 2 of E."""
-        self._setBR(2, self.e)
+        self._r.e |= 1 << 2
 
     def set2H(self):
         """Set bit 2 of H."""
-        self._setBR(2, self.h)
+        self._r.h |= 1 << 2
 
     def set2L(self):
         """Set bit 2 of L."""
-        self._setBR(2, self.l)
+        self._r.l |= 1 << 2
 
     def set2MemHL(self):
         """Set bit 2 of value at address in HL."""
-        self._setBn(2, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() | 1 << 2)
 
     def set2A(self):
         """Set bit 2 of A."""
-        self._setBR(2, self.a)
+        self._r.a |= 1 << 2
 
     def set3B(self):
         """Set bit 3 of B."""
-        self._setBR(3, self.b)
+        self._r.b |= 1 << 3
 
     def set3C(self):
         """Set bit 3 of C."""
-        self._setBR(3, self.c)
+        self._r.c |= 1 << 3
 
     def set3D(self):
         """Set bit 3 of D."""
-        self._setBR(3, self.d)
+        self._r.d |= 1 << 3
 
     def set3E(self):
         """Set bit 3 of E."""
-        self._setBR(3, self.e)
+        self._r.e |= 1 << 3
 
     def set3H(self):
         """Set bit 3 of H."""
-        self._setBR(3, self.h)
+        self._r.h |= 1 << 3
 
     def set3L(self):
         """Set bit 3 of L."""
-        self._setBR(3, self.l)
+        self._r.l |= 1 << 3
 
     def set3MemHL(self):
         """Set bit 3 of value at address in HL."""
-        self._setBn(3, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() | 1 << 3)
 
     def set3A(self):
         """Set bit 3 of A."""
-        self._setBR(3, self.a)
+        self._r.a |= 1 << 3
 
     def set4B(self):
         """Set bit 4 of B."""
-        self._setBR(4, self.b)
+        self._r.b |= 1 << 4
 
     def set4C(self):
         """Set bit 4 of C."""
-        self._setBR(4, self.c)
+        self._r.c |= 1 << 4
 
     def set4D(self):
         """Set bit 4 of D."""
-        self._setBR(4, self.d)
+        self._r.d |= 1 << 4
 
     def set4E(self):
         """Set bit 4 of E."""
-        self._setBR(4, self.e)
+        self._r.e |= 1 << 4
 
     def set4H(self):
         """Set bit 4 of H."""
-        self._setBR(4, self.h)
+        self._r.h |= 1 << 4
 
     def set4L(self):
         """Set bit 4 of L."""
-        self._setBR(4, self.l)
+        self._r.l |= 1 << 4
 
     def set4MemHL(self):
         """Set bit 4 of value at address in HL."""
-        self._setBn(4, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() | 1 << 4)
 
     def set4A(self):
         """Set bit 4 of A."""
-        self._setBR(4, self.a)
+        self._r.a |= 1 << 4
 
     def set5B(self):
         """Set bit 5 of B."""
-        self._setBR(5, self.b)
+        self._r.b |= 1 << 5
 
     def set5C(self):
         """Set bit 5 of C."""
-        self._setBR(5, self.c)
+        self._r.c |= 1 << 5
 
     def set5D(self):
         """Set bit 5 of D."""
-        self._setBR(5, self.d)
+        self._r.d |= 1 << 5
 
     def set5E(self):
         """Set bit 5 of E."""
-        self._setBR(5, self.e)
+        self._r.e |= 1 << 5
 
     def set5H(self):
         """Set bit 5 of H."""
-        self._setBR(5, self.h)
+        self._r.h |= 1 << 5
 
     def set5L(self):
         """Set bit 5 of L."""
-        self._setBR(5, self.l)
+        self._r.l |= 1 << 5
 
     def set5MemHL(self):
         """Set bit 5 of value at address in HL."""
-        self._setBn(5, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() | 1 << 5)
 
     def set5A(self):
         """Set bit 5 of A."""
-        self._setBR(5, self.a)
+        self._r.a |= 1 << 5
 
     def set6B(self):
         """Set bit 6 of B."""
-        self._setBR(6, self.b)
+        self._r.b |= 1 << 6
 
     def set6C(self):
         """Set bit 6 of C."""
-        self._setBR(6, self.c)
+        self._r.c |= 1 << 6
 
     def set6D(self):
         """Set bit 6 of D."""
-        self._setBR(6, self.d)
+        self._r.d |= 1 << 6
 
     def set6E(self):
         """Set bit 6 of E."""
-        self._setBR(6, self.e)
+        self._r.e |= 1 << 6
 
     def set6H(self):
         """Set bit 6 of H."""
-        self._setBR(6, self.h)
+        self._r.h |= 1 << 6
 
     def set6L(self):
         """Set bit 6 of L."""
-        self._setBR(6, self.l)
+        self._r.l |= 1 << 6
 
     def set6MemHL(self):
         """Set bit 6 of value at address in HL."""
-        self._setBn(6, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() | 1 << 6)
 
     def set6A(self):
         """Set bit 6 of A."""
-        self._setBR(6, self.a)
+        self._r.a |= 1 << 6
 
     def set7B(self):
         """Set bit 7 of B."""
-        self._setBR(7, self.b)
+        self._r.b |= 1 << 7
 
     def set7C(self):
         """Set bit 7 of C."""
-        self._setBR(7, self.c)
+        self._r.c |= 1 << 7
 
     def set7D(self):
         """Set bit 7 of D."""
-        self._setBR(7, self.d)
+        self._r.d |= 1 << 7
 
     def set7E(self):
         """Set bit 7 of E."""
-        self._setBR(7, self.e)
+        self._r.e |= 1 << 7
 
     def set7H(self):
         """Set bit 7 of H."""
-        self._setBR(7, self.h)
+        self._r.h |= 1 << 7
 
     def set7L(self):
         """Set bit 7 of L."""
-        self._setBR(7, self.l)
+        self._r.l |= 1 << 7
 
     def set7MemHL(self):
         """Set bit 7 of value at address in HL."""
-        self._setBn(7, self._getMemHL, self._setMemHL)
+        self._setMemHL(self._getMemHL() | 1 << 7)
 
     def set7A(self):
         """Set bit 7 of A."""
-        self._setBR(7, self.a)
+        self._r.a |= 1 << 7
 
     def extErr(self):
         """Raises an exception, as method shouldn't be called."""
@@ -2547,7 +3007,7 @@ class Z80:
 
     def callZnn(self, lsb, msb):
         """Pushes PC and loads little-endian word into PC if Z is set."""
-        self._callcnn(self.f.z.val(), lsb, msb)
+        self._callcnn(not self._r.fres & 0xff, lsb, msb)
 
     def callnn(self, lsb, msb):
         """Pushes PC and loads little-endian word into PC."""
@@ -2555,7 +3015,8 @@ class Z80:
 
     def adcAn(self, n):
         """Adds A, Carry and a byte and stores the result in A."""
-        self._adcAn(n)
+        self._assertByte(n)
+        self._adc8(n)
 
     def rst8(self):
         """Pushes the PC onto the top of the stack and jumps to 0x0008."""
@@ -2563,28 +3024,33 @@ class Z80:
 
     def retNC(self):
         """Pops the top two bytes of the stack into the PC if C is not set."""
-        if not self.f.c.val():
-            self.pc.ld(self._pop16())
+        if not self._r.fres & 0x100:
+            self._r.pc = self._pop16()
 
     def popDE(self):
         """Pops the top two bytes of the stack into DE."""
-        self._popRR(self.d, self.e)
+        v = self._pop16()
+        r = self._r
+        r.d = v >> 8
+        r.e = v & 0xff
 
     def jpNCnn(self, lsb, msb):
         """Loads little-endian word into PC if C is not set."""
-        self._jpcnn(not self.f.c.val(), lsb, msb)
+        self._jpcnn(not self._r.fres & 0x100, lsb, msb)
 
     def callNCnn(self, lsb, msb):
         """Pushes PC and loads little-endian word into PC if C is reset."""
-        self._callcnn(not self.f.c.val(), lsb, msb)
+        self._callcnn(not self._r.fres & 0x100, lsb, msb)
 
     def pushDE(self):
         """Pushes the contents of DE onto the top of the stack."""
-        self._pushRR(self.d, self.e)
+        r = self._r
+        self._push16((r.d << 8) | r.e)
 
     def subAn(self, n):
         """Subtracts n from A and stores result in A."""
-        self._subAn(n)
+        self._assertByte(n)
+        self._sub8(n)
 
     def rst10(self):
         """Pushes the PC onto the top of the stack and jumps to 0x0010."""
@@ -2592,25 +3058,27 @@ class Z80:
 
     def retC(self):
         """Pops the top two bytes of the stack into the PC if C is set."""
-        if self.f.c.val():
-            self.pc.ld(self._pop16())
+        if self._r.fres & 0x100:
+            self._r.pc = self._pop16()
 
     def reti(self):
         """Pops two bytes off the stack into the PC and enables interrupts."""
         self.ret()
-        self.ei()
+        self.intsEnabled = True
+        self.checkIntrs()
 
     def jpCnn(self, lsb, msb):
         """Loads little-endian word into PC if C is set."""
-        self._jpcnn(self.f.c.val(), lsb, msb)
+        self._jpcnn(self._r.fres & 0x100, lsb, msb)
 
     def callCnn(self, lsb, msb):
         """Pushes PC and loads little-endian word into PC if C is set."""
-        self._callcnn(self.f.c.val(), lsb, msb)
+        self._callcnn(self._r.fres & 0x100, lsb, msb)
 
     def sbcAn(self, n):
         """Subtracts a byte + Carry from A and stores the result in A."""
-        self._sbcAn(n)
+        self._assertByte(n)
+        self._sbc8(n)
 
     def rst18(self):
         """Pushes the PC onto the top of the stack and jumps to 0x0018."""
@@ -2619,23 +3087,29 @@ class Z80:
     def ldhMemnA(self, n):
         """Loads A into the memory location 0xFF00 + n."""
         self._assertByte(n)
-        self._mem.set8(0xff00 + n, self.a.val())
+        self._mem.set8(0xff00 + n, self._r.a)
 
     def popHL(self):
         """Pops the top two bytes of the stack into HL."""
-        self._popRR(self.h, self.l)
+        v = self._pop16()
+        r = self._r
+        r.h = v >> 8
+        r.l = v & 0xff
 
     def ldhMemCA(self):
         """Loads A into the memory location 0xFF00 + C."""
-        self._mem.set8(0xff00 + self.c.val(), self.a.val())
+        r = self._r
+        self._mem.set8(0xff00 + r.c, r.a)
 
     def pushHL(self):
         """Pushes the contents of HL onto the top of the stack."""
-        self._pushRR(self.h, self.l)
+        r = self._r
+        self._push16((r.h << 8) | r.l)
 
     def andn(self, n):
         """Bitwise ANDs A and a byte and stores the result in A."""
-        self._bitwisen(self.AND, n)
+        self._assertByte(n)
+        self._and8(n)
 
     def rst20(self):
         """Pushes the PC onto the top of the stack and jumps to 0x0020."""
@@ -2644,19 +3118,21 @@ class Z80:
     def addSPn(self, n):
         """Adds signed byte to SP and stores the result in SP."""
         self._assertByte(n)
-        self.sp.ld(self.sp.val() + self._to2sComp(n))
+        r = self._r
+        r.sp = (r.sp + self._to2sComp(n)) & 0xffff
 
     def jpMemHL(self):
         """Loads the value of HL into PC."""
-        self._jpcnn(True, self.l.val(), self.h.val())
+        self._r.pc = self._hl()
 
     def ldMemnnA(self, lsb, msb):
         """Loads A into the specified memory location."""
-        self._mem.set8((msb << 8) + lsb, self.a.val())
+        self._mem.set8((msb << 8) | lsb, self._r.a)
 
     def xorn(self, n):
         """Bitwise XORs A and a byte and stores the result in A."""
-        self._bitwisen(self.XOR, n)
+        self._assertByte(n)
+        self._xor8(n)
 
     def rst28(self):
         """Pushes the PC onto the top of the stack and jumps to 0x0028."""
@@ -2665,32 +3141,29 @@ class Z80:
     def ldhAMemn(self, n):
         """Loads the value at the memory location 0xFF00 + n into A."""
         self._assertByte(n)
-        self.a.ld(self._mem.get8(0xff00 + n))
+        self._r.a = self._mem.get8(0xff00 + n)
 
     def popAF(self):
         """Pops top byte of stack into flags register and next byte into A."""
-        f = self._pop8()
-        self.f.z.setTo((f >> 7) & 1 == 1)
-        self.f.n.setTo((f >> 6) & 1 == 1)
-        self.f.h.setTo((f >> 5) & 1 == 1)
-        self.f.c.setTo((f >> 4) & 1 == 1)
-        self.a.ld(self._pop8())
+        v = self._pop16()
+        r = self._r
+        r.a = v >> 8
+        r.f = v & 0xf0
 
     def di(self):
-        """Disables interrupts."""
+        """Disables interrupts, including those about to be enabled by EI."""
         self.intsEnabled = False
+        self._eiPending = False
 
     def pushAF(self):
         """Pushes A onto the stack and then pushes the flags register."""
-        self._push8(self.a.val())
-        self._push8(((1 if self.f.z.val() else 0) << 7) |
-                    ((1 if self.f.n.val() else 0) << 6) |
-                    ((1 if self.f.h.val() else 0) << 5) |
-                    ((1 if self.f.c.val() else 0) << 4))
+        r = self._r
+        self._push16((r.a << 8) | r.f)
 
     def orn(self, n):
         """Bitwise ORs A and a byte and stores the result in A."""
-        self._bitwisen(self.OR, n)
+        self._assertByte(n)
+        self._or8(n)
 
     def rst30(self):
         """Pushes the PC onto the top of the stack and jumps to 0x0030."""
@@ -2698,30 +3171,30 @@ class Z80:
 
     def ldhlSPn(self, n):
         self._assertByte(n)
-        sp = self.sp.val()
-        self.f.z.reset()
-        self.f.n.reset()
+        r = self._r
+        sp = r.sp
         if n > 127:
-            self.f.h.reset()
-            self.f.c.reset()
+            r.f = 0
         else:
-            self.f.h.setTo((sp & 0xf) + (n & 0xf) > 0xf)
-            self.f.c.setTo((sp & 0xff) + n > 0xff)
-        self.sp.ld((sp + self._to2sComp(n)) & 0xffff)
+            r.f = ((FLAG_H if (sp & 0xf) + (n & 0xf) > 0xf else 0) |
+                   (FLAG_C if (sp & 0xff) + n > 0xff else 0))
+        r.sp = (sp + self._to2sComp(n)) & 0xffff
 
     def ldSPHL(self):
-        self.sp.ld(self._hl())
+        self._r.sp = self._hl()
 
     def ldAMemnn(self, lsb, msb):
-        self.a.ld(self._mem.get8((msb << 8) + lsb))
+        self._r.a = self._mem.get8((msb << 8) | lsb)
 
     def ei(self):
-        """Enables interrupts."""
-        self.intsEnabled = True
+        """Enables interrupts after the next instruction."""
+        self._eiPending = True
+        self._attention = True
 
     def cpn(self, n):
         """Updates the flags with the result of subtracting n from A."""
-        self._cpn(n)
+        self._assertByte(n)
+        self._cp8(n)
 
     def rst38(self):
         """Pushes the PC onto the top of the stack and jumps to 0x0038."""
@@ -2734,72 +3207,17 @@ class Z80:
         return lambda: raiseEx(opc)
 
     def _rstn(self, n):
-        self._push16(self.pc.val())
-        self.jpnn(n, 0)
+        r = self._r
+        self._push16(r.pc)
+        r.pc = n
 
     def _callcnn(self, cond, lsb, msb):
+        self._assertByte(lsb)
+        self._assertByte(msb)
         if cond:
-            self._push16(self.pc.val())
-            self.jpnn(lsb, msb)
-
-    def _resBR(self, bitNum, reg):
-        self._resBn(bitNum, reg.val, reg.ld)
-
-    def _resBn(self, bitNum, getf, setf):
-        setf(getf() & (~ (1 << bitNum)))
-
-    def _setBR(self, bitNum, reg):
-        self._setBn(bitNum, reg.val, reg.ld)
-
-    def _setBn(self, bitNum, getf, setf):
-        setf(getf() | (1 << bitNum))
-
-    def _bitBR(self, bitNum, reg):
-        self._bitBn(bitNum, reg.val)
-
-    def _bitBn(self, bitNum, getf):
-        self.f.z.setTo((getf() >> bitNum) & 1 == 0)
-        self.f.n.reset()
-        self.f.h.set()
-
-    def _srlR(self, reg):
-        self._srln(reg.val, reg.ld)
-
-    def _srln(self, getf, setf):
-        v = getf()
-        setf((v >> 1) & 0xff)
-        self.f.z.setTo(getf() == 0)  # NOTE Z is unaffected on Z80
-        self.f.n.reset()
-        self.f.h.reset()
-        self.f.c.setTo(v & 1 == 1)
-
-    def _swapR(self, reg):
-        self._swapn(reg.val, reg.ld)
-
-    def _swapn(self, getf, setf):
-        setf(((getf() & 0xf) << 4) + ((getf() >> 4) & 0xf))
-
-    def _slaR(self, reg):
-        self._slan(reg.val, reg.ld)
-
-    def _slan(self, getf, setf):
-        v = getf()
-        setf((v << 1) & 0xff)
-        self.f.z.setTo(getf() == 0)  # NOTE Z is unaffected on Z80
-        self.f.n.reset()
-        self.f.h.reset()
-        self.f.c.setTo((v >> 7) & 1 == 1)
-
-    def _sraR(self, reg):
-        self._sran(reg.val, reg.ld)
-
-    def _sran(self, getf, setf):
-        v = getf()
-        setf(((v >> 1) & 0xff) | (v & 0x80))
-        self.f.z.setTo(getf() == 0)  # NOTE Z is unaffected on Z80
-        self.f.n.reset()
-        self.f.h.reset()
-        self.f.c.setTo(v & 1 == 1)
+            r = self._r
+            self._push16(r.pc)
+            r.pc = (msb << 8) | lsb
 
     def _setMemHL(self, val):
         self._mem.set8(self._hl(), val)
@@ -2807,182 +3225,199 @@ class Z80:
     def _getMemHL(self):
         return self._mem.get8(self._hl())
 
-    def _rlcR(self, reg):
-        self._rotR(reg, self.LEFT, self.WITH_CARRY)
-
-    def _rrcR(self, reg):
-        self._rotR(reg, self.RIGHT, self.WITH_CARRY)
-
-    def _rlR(self, reg):
-        self._rotR(reg, self.LEFT, self.WITHOUT_CARRY)
-
-    def _rrR(self, reg):
-        self._rotR(reg, self.RIGHT, self.WITHOUT_CARRY)
-
-    def _ldRRnn(self, hiOrdReg, hiOrdVal, loOrdReg, loOrdVal):
-        self._ldRn(hiOrdReg, hiOrdVal)
-        self._ldRn(loOrdReg, loOrdVal)
-
-    def _ldMemRRA(self, hiOrdReg, loOrdReg):
-        self._mem.set8((hiOrdReg.val() << 8) + loOrdReg.val(), self.a.val())
-
-    def _incRR(self, hiOrdReg, loOrdReg):
-        loOrdReg.ld((loOrdReg.val() + 1) & 0xff)
-        if loOrdReg.val() == 0:
-            hiOrdReg.ld((hiOrdReg.val() + 1) & 0xff)
-
-    def _incR(self, reg):
-        c = self.f.c.val()
-        self._arithRn(reg, 1, True, False)
-        self.f.c.setTo(c)
-
-    def _decR(self, reg):
-        c = self.f.c.val()
-        self._arithRn(reg, 1, False, False)
-        self.f.c.setTo(c)
-
-    def _ldRn(self, reg, val):
-        reg.ld(val)
-
-    def _rotA(self, rotLeft, withCarry):
-        self._rotR(self.a, rotLeft, withCarry)
-
-    def _rotR(self, reg, rotLeft, withCarry):
-        r = reg.val()
-        c = (r >> 7) & 1 if rotLeft else r & 1
-        orBit = c if withCarry else (1 if self.f.c.val() else 0)
-        if not rotLeft:
-            orBit <<= 7
-        reg.ld(((r << 1 if rotLeft else r >> 1) & 0xff) | orBit)
-        self.f.n.reset()
-        self.f.h.reset()
-        self.f.c.setTo(c == 1)
-        self._chkZ(reg)  # NOTE Z is unaffected on Z80
-
-    def _addHLRR(self, hiOrdReg, loOrdReg):
-        hl = (self.h.val() << 8) + self.l.val()
-        rr = (hiOrdReg.val() << 8) + loOrdReg.val()
+    def _inc8(self, v):
+        r = self._r
+        result = (v + 1) & 0xff
+        r.fres = result | (r.fres & 0x100)
+        r.fhalf = v ^ 1
+        r.fneg = 0
+        return result
+
+    def _dec8(self, v):
+        r = self._r
+        result = (v - 1) & 0xff
+        r.fres = result | (r.fres & 0x100)
+        r.fhalf = v ^ 1
+        r.fneg = FLAG_N
+        return result
+
+    # NOTE Z is unaffected by the rotate and shift instructions on Z80
+
+    def _rlc8(self, v):
+        r = self._r
+        c = v >> 7
+        v = ((v << 1) & 0xff) | c
+        r.fres = v | c << 8
+        r.fhalf = v
+        r.fneg = 0
+        return v
+
+    def _rrc8(self, v):
+        r = self._r
+        c = v & 1
+        v = (v >> 1) | (c << 7)
+        r.fres = v | c << 8
+        r.fhalf = v
+        r.fneg = 0
+        return v
+
+    def _rl8(self, v):
+        r = self._r
+        c = v >> 7
+        v = ((v << 1) & 0xff) | ((r.fres >> 8) & 1)
+        r.fres = v | c << 8
+        r.fhalf = v
+        r.fneg = 0
+        return v
+
+    def _rr8(self, v):
+        r = self._r
+        c = v & 1
+        v = (v >> 1) | ((r.fres >> 1) & 0x80)
+        r.fres = v | c << 8
+        r.fhalf = v
+        r.fneg = 0
+        return v
+
+    def _sla8(self, v):
+        r = self._r
+        c = v >> 7
+        v = (v << 1) & 0xff
+        r.fres = v | c << 8
+        r.fhalf = v
+        r.fneg = 0
+        return v
+
+    def _sra8(self, v):
+        r = self._r
+        c = v & 1
+        v = (v >> 1) | (v & 0x80)
+        r.fres = v | c << 8
+        r.fhalf = v
+        r.fneg = 0
+        return v
+
+    def _srl8(self, v):
+        r = self._r
+        c = v & 1
+        v >>= 1
+        r.fres = v | c << 8
+        r.fhalf = v
+        r.fneg = 0
+        return v
+
+    def _swap8(self, v):
+        return ((v & 0xf) << 4) | (v >> 4)
+
+    def _bit8(self, bitNum, v):
+        r = self._r
+        res = (r.fres & 0x100) | ((v >> bitNum) & 1)
+        r.fres = res
+        r.fhalf = res ^ 0x10
+        r.fneg = 0
+
+    def _addHL(self, rr):
+        r = self._r
+        hl = (r.h << 8) | r.l
         result = hl + rr
-        self.h.ld((result >> 8) & 0xff)
-        self.l.ld(result & 0xff)
-        self.f.n.reset()
-        self.f.h.setTo((hl & 0xfff) + (rr & 0xfff) > 0xfff)
-        self.f.c.setTo(result > 0xffff)
-
-    def _ldAMemRR(self, hiOrdReg, loOrdReg):
-        self.a.ld(self._mem.get8((hiOrdReg.val() << 8) + loOrdReg.val()))
-
-    def _decRR(self, hiOrdReg, loOrdReg):
-        loOrdReg.ld((loOrdReg.val() - 1) & 0xff)
-        if loOrdReg.val() == 0xff:
-            hiOrdReg.ld((hiOrdReg.val() - 1) & 0xff)
-
-    def _ldRR(self, dstReg, srcReg):
-        self._ldRn(dstReg, srcReg.val())
-
-    def _ldRMemHL(self, reg):
-        self._ldRn(reg, self._mem.get8(self._hl()))
-
-    def _ldMemHLR(self, reg):
-        self._mem.set8(self._hl(), reg.val())
-
-    def _addAR(self, reg):
-        self.addAn(reg.val())
-
-    def _adcAR(self, reg):
-        self._adcAn(reg.val())
-
-    def _adcAn(self, val):
-        self._arithAn(val, self.POSITIVE, self.WITH_CARRY)
-
-    def _subAR(self, reg):
-        self._subAn(reg.val())
-
-    def _subAn(self, v):
-        self._arithAn(v, self.NEGATIVE, self.WITHOUT_CARRY)
-
-    def _sbcAR(self, reg):
-        self._sbcAn(reg.val())
-
-    def _sbcAn(self, v):
-        self._arithAn(v, self.NEGATIVE, self.WITH_CARRY)
-
-    def _arithAn(self, v, isPositive, withCarry):
-        self._arithRn(self.a, v, isPositive, withCarry)
-
-    def _arithRn(self, reg, v, isPositive, withCarry):
-        self._assertByte(v)
-        r = reg.val()
-        c = 1 if withCarry and self.f.c.val() else 0
-        if isPositive:
-            r_ = r + v + c
-            h_ = (r & 0xf) + (v & 0xf) + c
-        else:
-            r_ = r - v - c
-            h_ = (r & 0xf) - (v & 0xf) - c
-        self.f.n.setTo(not isPositive)
-        self.f.h.setTo(h_ < 0x0 or h_ > 0xf)
-        self.f.c.setTo(r_ < 0x00 or r_ > 0xff)
-        reg.ld(r_ & 0xff)
-        self._chkZ(reg)
-
-    def _bitwiseR(self, op, reg):
-        self._bitwisen(op, reg.val())
-
-    def _bitwisen(self, op, val):
-        self._assertByte(val)
-        if op == self.AND:
-            f = lambda a, b: a & b
-        elif op == self.OR:
-            f = lambda a, b: a | b
-        elif op == self.XOR:
-            f = lambda a, b: a ^ b
-        self.a.ld(f(self.a.val(), val))
-        self.f.n.reset()
-        self.f.h.setTo(op == self.AND)
-        self.f.c.reset()
-        self._chkZ(self.a)
-
-    def _cpR(self, reg):
-        self._cpn(reg.val())
-
-    def _cpn(self, val):
-        a = self.a.val()
-        self._subAn(val)
-        self.a.ld(a)
-
-    def _popRR(self, hiOrdReg, loOrdReg):
-        v = self._pop16()
-        hiOrdReg.ld(v >> 8)
-        loOrdReg.ld(v & 0xff)
+        r.h = (result >> 8) & 0xff
+        r.l = result & 0xff
+        res = (1 if r.fres & 0xff else 0) | (0x100 if result > 0xffff else 0)
+        r.fres = res
+        r.fhalf = res ^ (0x10 if (hl & 0xfff) + (rr & 0xfff) > 0xfff else 0)
+        r.fneg = 0
+
+    def _add8(self, v):
+        r = self._r
+        a = r.a
+        result = a + v
+        r.a = result & 0xff
+        r.fres = result
+        r.fhalf = a ^ v
+        r.fneg = 0
+
+    def _adc8(self, v):
+        r = self._r
+        a = r.a
+        result = a + v + ((r.fres >> 8) & 1)
+        r.a = result & 0xff
+        r.fres = result
+        r.fhalf = a ^ v
+        r.fneg = 0
+
+    def _sub8(self, v):
+        r = self._r
+        a = r.a
+        result = a - v
+        r.a = result & 0xff
+        r.fres = result
+        r.fhalf = a ^ v
+        r.fneg = FLAG_N
+
+    def _sbc8(self, v):
+        r = self._r
+        a = r.a
+        result = a - v - ((r.fres >> 8) & 1)
+        r.a = result & 0xff
+        r.fres = result
+        r.fhalf = a ^ v
+        r.fneg = FLAG_N
+
+    def _cp8(self, v):
+        r = self._r
+        a = r.a
+        r.fres = a - v
+        r.fhalf = a ^ v
+        r.fneg = FLAG_N
+
+    def _and8(self, v):
+        r = self._r
+        a = r.a & v
+        r.a = a
+        r.fres = a
+        r.fhalf = a ^ 0x10
+        r.fneg = 0
+
+    def _xor8(self, v):
+        r = self._r
+        a = r.a ^ v
+        r.a = a
+        r.fres = a
+        r.fhalf = a
+        r.fneg = 0
+
+    def _or8(self, v):
+        r = self._r
+        a = r.a | v
+        r.a = a
+        r.fres = a
+        r.fhalf = a
+        r.fneg = 0
 
     def _pop16(self):
-        lsb = self._pop8()
-        msb = self._pop8()
-        return (msb << 8) + lsb
-
-    def _pop8(self):
-        addr = self.sp.val()
-        self.sp.ld(addr + 1)
-        return self._mem.get8(addr)
-
-    def _pushRR(self, hiOrdReg, loOrdReg):
-        self._push16((hiOrdReg.val() << 8) + loOrdReg.val())
+        r = self._r
+        sp = r.sp
+        lsb = self._mem.get8(sp)
+        msb = self._mem.get8((sp + 1) & 0xffff)
+        r.sp = (sp + 2) & 0xffff
+        return (msb << 8) | lsb
 
     def _push16(self, val):
-        self._push8(val >> 8)
-        self._push8(val & 0xff)
-
-    def _push8(self, val):
-        sp = self.sp.val() - 1
-        self._mem.set8(sp, val)
-        self.sp.ld(sp)
+        r = self._r
+        sp = (r.sp - 1) & 0xffff
+        self._mem.set8(sp, val >> 8)
+        sp = (sp - 1) & 0xffff
+        self._mem.set8(sp, val & 0xff)
+        r.sp = sp
 
     def _jrcn(self, cond, n):
         self._assertByte(n)
         if cond:
-            pc = self.pc.val() + self._to2sComp(n)
-            self.pc.ld(pc & 0xffff)
+            r = self._r
+            pc = r.pc
+            r.pc = (pc + self._to2sComp(n)) & 0xffff
+            if n >= 0xfe - IDLE_LOOP_SIZE:
+                self._checkIdleLoop(r.pc, (pc - 2) & 0xffff)
 
     def _to2sComp(self, n):
         self._assertByte(n)
@@ -2992,15 +3427,14 @@ class Z80:
 
     def _jpcnn(self, cond, loOrdByte, hiOrdByte):
         self._assertByte(loOrdByte)
+        self._assertByte(hiOrdByte)
         if cond:
-            self.pc.ld((hiOrdByte << 8) + loOrdByte)
+            self._r.pc = (hiOrdByte << 8) | loOrdByte
 
     def _assertByte(self, n):
         if n < 0 or n > 0xff:
             raise ValueError("Byte 0x%x(%d) must be 8-bit" % (n, n))
 
-    def _chkZ(self, reg):
-        self.f.z.setTo(reg.val() == 0)
-
     def _hl(self):
-        return (self.h.val() << 8) + self.l.val()
+        r = self._r
+        return (r.h << 8) | r.l
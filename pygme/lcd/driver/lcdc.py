@@ -4,9 +4,27 @@
 
 import collections
 
+from pygme.lcd.driver import nprenderer
+from pygme.lcd.driver.renderer import Renderer
 from pygme.lcd.mode import LCDMode
 
 class LCDController:
+    """
+    The LCDController class steps the LCD through its modes and draws the
+    screen a line at a time into a framebuffer.
+
+    The framebuffer is a bytearray of SCREEN_WIDTH * SCREEN_HEIGHT shades, in
+    the range 0-3, laid out row by row. At the start of each VBLANK the lcd
+    is passed a memoryview of it through lcd.update(frame); the lcd can map
+    the shades to colours, e.g. with PALETTE, or use them as they are.
+
+    Drawing can be skipped without affecting timing: with a frame_skip of n
+    only every (n + 1)th frame is drawn and passed to the lcd, and if render
+    is False no frames are. LY, the modes and interrupts are unaffected.
+
+    If use_numpy is True and NumPy is installed, lines are drawn by a
+    NumPyRenderer; otherwise they are drawn in pure Python.
+    """
 
     SCREEN_WIDTH = 160
     SCREEN_HEIGHT = 144
@@ -15,9 +33,19 @@ class LCDController:
 
     VRAM_START = 0x8000
 
-    def __init__(self, mem, lcd):
+    def __init__(self, mem, lcd, frame_skip=0, render=True, use_numpy=False):
         self._mem = mem
         self._lcd = lcd
+        self._frame_skip = frame_skip
+        self._render = render
+        self._frame_no = 0
+        self._rendering = render
+        self._sprites = []
+        if use_numpy and nprenderer.available():
+            self._renderer = nprenderer.NumPyRenderer(mem)
+        else:
+            self._renderer = Renderer(mem)
+        self._frame = bytearray(self.SCREEN_WIDTH * self.SCREEN_HEIGHT)
         self._ticks = 0
         Mode = collections.namedtuple('Mode', ['duration', 'exit_func'])
         self._modes = {
@@ -28,14 +56,33 @@ class LCDController:
         }
 
     def update(self, ticks):
+        """
+        Advances the LCD by ticks, making every mode transition that falls
+        within them, so ticks may span any number of lines or frames.
+        """
         self._ticks += ticks
         mode = self._modes[self._mem.getLCDMode()]
-        if self._ticks >= mode.duration:
+        while self._ticks >= mode.duration:
             self._ticks -= mode.duration
-            self._mem.setLCDMode(mode.exit_func())
+            next_mode = mode.exit_func()
+            self._mem.setLCDMode(next_mode)
+            mode = self._modes[next_mode]
+
+    def cycles_until_next_event(self):
+        """
+        Returns the number of ticks until the next mode transition. Until then
+        the LCD changes nothing that the CPU can see, so the CPU can run for
+        that long before calling update().
+        """
+        return self._modes[self._mem.getLCDMode()].duration - self._ticks
+
+    def frame(self):
+        """Returns a memoryview of the framebuffer."""
+        return memoryview(self._frame)
 
     def _exit_oam_read(self):
-        if self._mem.getDisplayIsOn():
+        if self._rendering and self._mem.getDisplayIsOn():
+            self._sprites = self._renderer.selectSprites(self._mem.getLY())
             self._draw_scanline()
         return LCDMode.VRAM_READ
 
@@ -50,9 +97,13 @@ class LCDController:
             self._mem.setVBLANKIntr()
             if self._mem.isVBLANKIntrEnabled():
                 self._mem.setLCDCIntr()
-            if not self._mem.getDisplayIsOn():
-                self._lcd.fill(self.PALETTE[0b11])
-            self._lcd.update()
+            if self._rendering:
+                if not self._mem.getDisplayIsOn():
+                    self._frame[:] = bytearray([0b11]) * len(self._frame)
+                self._lcd.update(memoryview(self._frame))
+            self._frame_no += 1
+            self._rendering = self._render and \
+                self._frame_no % (self._frame_skip + 1) == 0
             return LCDMode.VBLANK
         else:
             if self._mem.isOAMIntrEnabled():
@@ -67,24 +118,7 @@ class LCDController:
         return LCDMode.VBLANK
 
     def _draw_scanline(self):
-        if self._mem.getBgAndWinIsOn():
-            self._draw_background()
-
-    def _draw_background(self):
-        y = (self._mem.getLY() + self._mem.getSCY()) & 0xFF
-        map_line = 0x1800 + self._mem.getLCDCBackgroundYOffset() + ((y >> 3) << 5)
-        for x in range(self.SCREEN_WIDTH):
-            x_ = (x + self._mem.getSCX()) & 0xFF
-            tile_bit = 7 - (x_ & 0b111)
-            tile_no = self._mem.get8(self.VRAM_START + map_line + (x_ >> 3))
-            if tile_no < 0x80:
-                tile_no += self._mem.getLCDCBackgroundXOffset()
-            pal_index = 0
-            for i in xrange(2):
-                pal_index = (pal_index << 1) + (
-                    (self._mem.get8(self.VRAM_START + tile_no * 0x10 +
-                                    (y & 0b111) * 2 + i) >> tile_bit) & 1
-                )
-            self._lcd.drawPixel(x, self._mem.getLY(),
-                self.PALETTE[(self._mem.getBgPalette() >> pal_index * 2) & 0b11]
-            )
+        ly = self._mem.getLY()
+        line = self._renderer.drawLine(ly, self._sprites)
+        start = ly * self.SCREEN_WIDTH
+        self._frame[start:start + self.SCREEN_WIDTH] = line
@@ -0,0 +1,104 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from pygme.lcd.driver import renderer
+from pygme.lcd.driver.renderer import Renderer
+
+VRAM_SIZE = 0x2000
+BG_MAP_OFFSET = renderer.BG_MAP_START - renderer.VRAM_START
+
+
+def available():
+    """Returns whether NumPy is installed, so NumPyRenderer can be used."""
+    return numpy is not None
+
+
+def frameArray(frame):
+    """
+    Returns frame, a framebuffer as passed to lcd.update(), as a 144x160
+    uint8 ndarray of shades that shares its memory.
+    """
+    return numpy.frombuffer(frame, dtype=numpy.uint8).reshape(
+        (renderer.SCREEN_HEIGHT, renderer.SCREEN_WIDTH))
+
+
+class NumPyRenderer(Renderer):
+    """
+    The NumPyRenderer class draws the background and window with NumPy.
+
+    It keeps a copy of VRAM as a uint8 array, updated by watching writes to
+    it, and decodes all 384 tiles at once with vectorised bit operations
+    whenever tile data has changed. A line of the background is then a
+    single gather from the decoded tiles, indexed by the tile map with SCX
+    and SCY wrapping around it. Sprites are drawn as by Renderer.
+    """
+
+    def __init__(self, mem):
+        Renderer.__init__(self, mem)
+        self._vram = numpy.array(
+            [mem.get8(renderer.VRAM_START + i) for i in range(0, VRAM_SIZE)],
+            dtype=numpy.uint8)
+        self._decoded = None
+        self._bits = numpy.arange(7, -1, -1, dtype=numpy.uint8)
+        self._xs = numpy.arange(0, renderer.SCREEN_WIDTH)
+        mem.watch(renderer.VRAM_START, renderer.VRAM_START + VRAM_SIZE - 1,
+                  self._vramWritten)
+
+    def _vramWritten(self, addr, val):
+        offset = addr - renderer.VRAM_START
+        self._vram[offset] = val
+        if addr <= renderer.TILE_DATA_END:
+            self._decoded = None
+
+    def _decodedTiles(self):
+        """
+        Returns the palette indices of every tile as a 384x8x8 array indexed
+        by tile, row and column.
+        """
+        if self._decoded is None:
+            data = self._vram[0:renderer.NUM_TILES * renderer.TILE_SIZE]
+            rows = data.reshape((renderer.NUM_TILES, 8, 2, 1))
+            bits = (rows >> self._bits) & 1
+            self._decoded = bits[:, :, 0, :] | bits[:, :, 1, :] << 1
+        return self._decoded
+
+    def _tileNumbers(self, map_offset, tile_ys, tile_xs):
+        """
+        Returns the tile numbers, counting from 0x8000, at the given tile
+        coordinates of the tile map at map_offset from 0x9800.
+        """
+        start = BG_MAP_OFFSET + map_offset
+        tile_map = self._vram[start:start + 0x400].reshape((32, 32))
+        tile_nos = tile_map[tile_ys, tile_xs].astype(numpy.intp)
+        tile_offset = self._mem.getLCDCBackgroundXOffset()
+        if tile_offset:
+            tile_nos[tile_nos < 0x80] += tile_offset
+        return tile_nos
+
+    def _backgroundIndices(self, ly):
+        mem = self._mem
+        y = (ly + mem.getSCY()) & 0xff
+        xs = (self._xs + mem.getSCX()) & 0xff
+        tile_nos = self._tileNumbers(mem.getLCDCBackgroundYOffset(), y >> 3,
+                                     xs >> 3)
+        indices = self._decodedTiles()[tile_nos, y & 0b111, xs & 0b111]
+        return bytearray(indices.astype(numpy.uint8).tobytes())
+
+    def _drawWindow(self, ly, indices):
+        mem = self._mem
+        y = ly - mem.getWY()
+        start = mem.getWX() - 7
+        if y < 0 or start >= renderer.SCREEN_WIDTH:
+            return
+        start = max(0, start)
+        xs = self._xs[start:] - (mem.getWX() - 7)
+        tile_nos = self._tileNumbers(mem.getWinTileMapOffset(), y >> 3,
+                                     xs >> 3)
+        window = self._decodedTiles()[tile_nos, y & 0b111, xs & 0b111]
+        indices[start:] = window.astype(numpy.uint8).tobytes()
@@ -0,0 +1,257 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+VRAM_START = 0x8000
+BG_MAP_START = 0x9800
+
+TILE_DATA_END = 0x97ff
+NUM_TILES = 384
+TILE_SIZE = 0x10
+
+OAM_START = 0xfe00
+NUM_SPRITES = 40
+SPRITES_PER_LINE = 10
+
+# The bits of a sprite's flags.
+SPRITE_BEHIND_BG = 0x80
+SPRITE_Y_FLIP = 0x40
+SPRITE_X_FLIP = 0x20
+SPRITE_OBP1 = 0x10
+
+SCREEN_WIDTH = 160
+SCREEN_HEIGHT = 144
+
+# The number of tiles that a line can overlap when it is scrolled by a
+# fraction of a tile.
+TILES_PER_LINE = SCREEN_WIDTH // 8 + 1
+
+
+def _spread(v):
+    """
+    Returns v with bit k moved to bit 8k, so that bit 7 of v becomes the most
+    significant byte.
+    """
+    spread = 0
+    for k in range(0, 8):
+        spread |= ((v >> k) & 1) << (8 * k)
+    return spread
+
+
+def _tileRows():
+    """
+    Returns a list whose (hi << 8 | lo)th entry holds the 8 palette indices,
+    left to right, of a tile row whose low bitplane is lo and high bitplane is
+    hi.
+    """
+    spread = [_spread(v) for v in range(0, 0x100)]
+    return [
+        (spread[lo] | spread[hi] << 1).to_bytes(8, 'big')
+        for hi in range(0, 0x100)
+        for lo in range(0, 0x100)
+    ]
+
+
+TILE_ROWS = _tileRows()
+
+
+# The tables built by paletteTable(), indexed by palette.
+_paletteTables = [None] * 0x100
+
+
+def paletteTable(palette):
+    """
+    Returns a table for bytes.translate() that maps palette indices to the
+    shades assigned to them by palette, e.g. the value of BGP.
+
+    A table is built the first time its palette is used, and kept, so a
+    palette register only costs more than a lookup when it is set to a
+    value it has not held before.
+    """
+    table = _paletteTables[palette]
+    if table is None:
+        table = bytes(bytearray(
+            (palette >> (i & 0b11) * 2) & 0b11 for i in range(0, 0x100)
+        ))
+        _paletteTables[palette] = table
+    return table
+
+
+class TileCache(object):
+    """
+    The TileCache class holds the rows of each tile in VRAM decoded to palette
+    indices.
+
+    A tile is decoded the first time one of its rows is needed, and is
+    dropped from the cache when the memory it was decoded from is written to,
+    so tile data is only read from memory after it changes.
+    """
+
+    def __init__(self, mem):
+        self._mem = mem
+        self._tiles = [None] * NUM_TILES
+        mem.watch(VRAM_START, TILE_DATA_END, self._tileWritten)
+
+    def rows(self, tile_no):
+        """
+        Returns a list of the 8 rows of tile tile_no, counting from 0x8000,
+        each the bytes of the palette indices of its pixels.
+        """
+        rows = self._tiles[tile_no]
+        if rows is None:
+            rows = self._decode(tile_no)
+            self._tiles[tile_no] = rows
+        return rows
+
+    def _decode(self, tile_no):
+        get8 = self._mem.get8
+        addr = VRAM_START + tile_no * TILE_SIZE
+        return [
+            TILE_ROWS[get8(addr + i) | get8(addr + i + 1) << 8]
+            for i in range(0, TILE_SIZE, 2)
+        ]
+
+    def _tileWritten(self, addr, val):
+        self._tiles[(addr - VRAM_START) >> 4] = None
+
+
+class Renderer(object):
+    """
+    The Renderer class draws lines of the screen a tile row at a time.
+
+    Each visible tile is looked up once per line, and its rows come decoded
+    from a TileCache, so tile data is only read from memory when it changes.
+
+    Sprites are drawn from a list selected once per line by selectSprites(),
+    so OAM is not searched while the line is drawn.
+    """
+
+    def __init__(self, mem):
+        self._mem = mem
+        self._tiles = TileCache(mem)
+
+    def drawLine(self, ly, sprites):
+        """
+        Returns the 160 shades of line ly, drawing the background, window and
+        the sprites in sprites, as returned by selectSprites(ly).
+        """
+        mem = self._mem
+        if mem.getBgAndWinIsOn():
+            indices = self._backgroundIndices(ly)
+            if mem.getWinIsOn():
+                self._drawWindow(ly, indices)
+            line = indices.translate(paletteTable(mem.getBgPalette()))
+        else:
+            indices = bytearray(SCREEN_WIDTH)
+            line = bytearray(SCREEN_WIDTH)
+        if sprites:
+            self._drawSprites(ly, sprites, indices, line)
+        return line
+
+    def drawBackground(self, ly):
+        """Returns the 160 shades of line ly of the background."""
+        indices = self._backgroundIndices(ly)
+        return indices.translate(paletteTable(self._mem.getBgPalette()))
+
+    def selectSprites(self, ly):
+        """
+        Returns the sprites on line ly, in the order they are drawn, as
+        (x, y, tile, flags) tuples.
+
+        As on the hardware, only the first 10 sprites in OAM that overlap the
+        line are drawn, and a sprite with a lower X, or the same X and an
+        earlier entry in OAM, is drawn over the others.
+        """
+        mem = self._mem
+        if not mem.getObjIsOn():
+            return []
+        get8 = mem.get8
+        height = mem.getObjHeight()
+        sprites = []
+        for addr in range(OAM_START, OAM_START + NUM_SPRITES * 4, 4):
+            y = get8(addr) - 16
+            if y <= ly < y + height:
+                sprites.append((get8(addr + 1) - 8, y, get8(addr + 2),
+                                get8(addr + 3)))
+                if len(sprites) == SPRITES_PER_LINE:
+                    break
+        # sort() is stable, so sprites with equal X stay in OAM order; the
+        # list is then reversed so that the sprites with priority are drawn
+        # last.
+        sprites.sort(key=lambda sprite: sprite[0])
+        sprites.reverse()
+        return sprites
+
+    def _backgroundIndices(self, ly):
+        """Returns the 160 palette indices of line ly of the background."""
+        mem = self._mem
+        get8 = mem.get8
+        rows = self._tiles.rows
+        y = (ly + mem.getSCY()) & 0xff
+        scx = mem.getSCX()
+        tile_offset = mem.getLCDCBackgroundXOffset()
+        map_line = BG_MAP_START + mem.getLCDCBackgroundYOffset() + \
+            ((y >> 3) << 5)
+        row = y & 0b111
+        first = scx >> 3
+        pixels = bytearray()
+        for i in range(0, TILES_PER_LINE):
+            tile_no = get8(map_line + ((first + i) & 0x1f))
+            if tile_no < 0x80:
+                tile_no += tile_offset
+            pixels += rows(tile_no)[row]
+        start = scx & 0b111
+        return pixels[start:start + SCREEN_WIDTH]
+
+    def _drawWindow(self, ly, indices):
+        """
+        Draws the palette indices of line ly of the window over indices. The
+        window's top-left corner is at (WX - 7, WY), and it covers everything
+        to the right of and below it.
+        """
+        mem = self._mem
+        y = ly - mem.getWY()
+        start = mem.getWX() - 7
+        if y < 0 or start >= SCREEN_WIDTH:
+            return
+        get8 = mem.get8
+        rows = self._tiles.rows
+        tile_offset = mem.getLCDCBackgroundXOffset()
+        map_line = BG_MAP_START + mem.getWinTileMapOffset() + ((y >> 3) << 5)
+        row = y & 0b111
+        skip = max(0, -start)
+        start = max(0, start)
+        pixels = bytearray()
+        for i in range(0, (skip + SCREEN_WIDTH - start + 7) >> 3):
+            tile_no = get8(map_line + i)
+            if tile_no < 0x80:
+                tile_no += tile_offset
+            pixels += rows(tile_no)[row]
+        indices[start:] = pixels[skip:skip + SCREEN_WIDTH - start]
+
+    def _drawSprites(self, ly, sprites, indices, line):
+        """
+        Draws sprites over the shades in line. indices holds the palette
+        indices of the background and window, which a sprite flagged as
+        behind them only shows through where they are 0.
+        """
+        mem = self._mem
+        rows = self._tiles.rows
+        height = mem.getObjHeight()
+        palettes = [paletteTable(mem.getObjPalette0()),
+                    paletteTable(mem.getObjPalette1())]
+        for x, y, tile, flags in sprites:
+            row = ly - y
+            if flags & SPRITE_Y_FLIP:
+                row = height - 1 - row
+            if height == 16:
+                tile = (tile & 0xfe) + (row >> 3)
+            pixels = rows(tile)[row & 0b111]
+            if flags & SPRITE_X_FLIP:
+                pixels = pixels[::-1]
+            palette = palettes[1 if flags & SPRITE_OBP1 else 0]
+            behind = flags & SPRITE_BEHIND_BG
+            for i in range(max(0, -x), min(8, SCREEN_WIDTH - x)):
+                index = pixels[i]
+                if index and not (behind and indices[x + i]):
+                    line[x + i] = palette[index]
@@ -6,13 +6,15 @@ import unittest
 
 from pygme.lcd.driver import lcdc as lcdc
 from pygme.lcd.mode import LCDMode
+from pygme.memory import array
+from pygme.memory import iomem
 
 
 class MockIOMemory:
 
     def __init__(self, mode=LCDMode.HBLANK, ly=0, oam_intr_enabled=False,
                  hblank_intr_enabled=False, vblank_intr_enabled=False,
-                 lcdc_intr_enabled=False, lcd_is_on=False):
+                 lcdc_intr_enabled=False, lcd_is_on=False, bg_palette=0):
         self._mode = mode
         self._ly = ly
         self._oam_intr_enabled = oam_intr_enabled
@@ -21,6 +23,7 @@ class MockIOMemory:
         self.lcdc_intr_enabled = lcdc_intr_enabled
         self.vblank_intr_enabled = vblank_intr_enabled
         self._lcd_is_on = lcd_is_on
+        self._bg_palette = bg_palette
 
     def setLY(self, ly):
         self._ly = ly
@@ -55,6 +58,12 @@ class MockIOMemory:
     def getBgAndWinIsOn(self):
         return True
 
+    def getWinIsOn(self):
+        return False
+
+    def getObjIsOn(self):
+        return False
+
     def getSCY(self):
         return 0
 
@@ -70,23 +79,20 @@ class MockIOMemory:
     def get8(self, addr):
         return 0
 
+    def watch(self, start, end, func):
+        pass
+
     def getBgPalette(self):
-        return 0
+        return self._bg_palette
 
 
 class MockLCD:
 
     def __init__(self):
-        self.drawn_pixels = []
-
-    def fill(self, colour):
-        pass
-
-    def update(self):
-        pass
+        self.frames = []
 
-    def drawPixel(self, x, y, colour):
-        self.drawn_pixels.append((x, y))
+    def update(self, frame):
+        self.frames.append(bytearray(frame))
 
 
 class TestLCDC(unittest.TestCase):
@@ -96,7 +102,7 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.OAM_READ)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(79):
+        for i in range(79):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.OAM_READ)
@@ -106,7 +112,7 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.OAM_READ)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(80):
+        for i in range(80):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.VRAM_READ)
@@ -116,30 +122,34 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.OAM_READ, lcd_is_on=False)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(80):
+        for i in range(80):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.VRAM_READ)
 
     def test_WhenLCDIsOn_IfLCDEntersVRAMMode_ScanlineIsDrawn(self):
         # Arrange
-        y = 0
+        y = 1
         lcd = MockLCD()
         driver = lcdc.LCDController(MockIOMemory(mode=LCDMode.OAM_READ,
                                                  ly=y,
-                                                 lcd_is_on=True), lcd)
+                                                 lcd_is_on=True,
+                                                 bg_palette=0xff), lcd)
         # Act
-        for i in xrange(80):
+        for i in range(80):
             driver.update(1)
         # Assert
-        self.assertTrue(all((x, y) in lcd.drawn_pixels for x in xrange(160)))
+        frame = driver.frame()
+        self.assertEquals(frame[y * 160:(y + 1) * 160].tobytes(),
+                          bytes(bytearray([0b11] * 160)))
+        self.assertEquals(frame[0:160].tobytes(), bytes(bytearray(160)))
 
     def test_WhenInVRAM_After171ticks_LCDInVRAMMode(self):
         # Arrange
         mem = MockIOMemory(mode=LCDMode.VRAM_READ)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(171):
+        for i in range(171):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.VRAM_READ)
@@ -149,7 +159,7 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.VRAM_READ)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(172):
+        for i in range(172):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.HBLANK)
@@ -160,7 +170,7 @@ class TestLCDC(unittest.TestCase):
                            lcdc_intr_enabled=False)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(172):
+        for i in range(172):
             driver.update(1)
         # Assert
         self.assertTrue(mem.lcdc_intr_enabled)
@@ -171,7 +181,7 @@ class TestLCDC(unittest.TestCase):
                            lcdc_intr_enabled=False)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(172):
+        for i in range(172):
             driver.update(1)
         # Assert
         self.assertFalse(mem.lcdc_intr_enabled)
@@ -181,7 +191,7 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.VRAM_READ, ly=0)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(172):
+        for i in range(172):
             driver.update(1)
         # Assert
         self.assertEqual(mem.getLY(), 1)
@@ -191,7 +201,7 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.VRAM_READ)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(203):
+        for i in range(203):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.HBLANK)
@@ -201,7 +211,7 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.HBLANK, ly=0)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(204):
+        for i in range(204):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.OAM_READ)
@@ -212,7 +222,7 @@ class TestLCDC(unittest.TestCase):
                            lcdc_intr_enabled=False)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(204):
+        for i in range(204):
             driver.update(1)
         # Assert
         self.assertTrue(mem.lcdc_intr_enabled)
@@ -223,7 +233,7 @@ class TestLCDC(unittest.TestCase):
                            lcdc_intr_enabled=False)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(204):
+        for i in range(204):
             driver.update(1)
         # Assert
         self.assertFalse(mem.lcdc_intr_enabled)
@@ -233,7 +243,7 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.HBLANK, ly=143)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(204):
+        for i in range(204):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.OAM_READ)
@@ -243,17 +253,28 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.HBLANK, ly=144)
         driver = lcdc.LCDController(mem, MockLCD())
         # Act
-        for i in xrange(204):
+        for i in range(204):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.VBLANK)
 
+    def test_WhenInHBLANKAndLYIs144_After204ticks_FrameIsPassedToLCD(self):
+        # Arrange
+        lcd = MockLCD()
+        mem = MockIOMemory(mode=LCDMode.HBLANK, ly=144, lcd_is_on=False)
+        driver = lcdc.LCDController(mem, lcd)
+        # Act
+        for i in range(204):
+            driver.update(1)
+        # Assert
+        self.assertEquals(lcd.frames, [bytearray([0b11] * 160 * 144)])
+
     def test_WhenInVBLANK_After4559ticks_LCDInVBLANKMode(self):
         # Arrange
         mem = MockIOMemory(mode=LCDMode.VBLANK, ly=144)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(4559):
+        for i in range(4559):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.VBLANK)
@@ -263,7 +284,7 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.VBLANK, ly=144)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(4560):
+        for i in range(4560):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLCDMode(), LCDMode.OAM_READ)
@@ -273,7 +294,114 @@ class TestLCDC(unittest.TestCase):
         mem = MockIOMemory(mode=LCDMode.VBLANK, ly=144)
         driver = lcdc.LCDController(mem, None)
         # Act
-        for i in xrange(4560):
+        for i in range(4560):
             driver.update(1)
         # Assert
         self.assertEquals(mem.getLY(), 0)
+
+    def test_WhenInOAM_After252ticksAtOnce_LCDEntersHBLANKMode(self):
+        # Arrange
+        mem = MockIOMemory(mode=LCDMode.OAM_READ, ly=0)
+        driver = lcdc.LCDController(mem, None)
+        # Act
+        driver.update(80 + 172)
+        # Assert
+        self.assertEquals(mem.getLCDMode(), LCDMode.HBLANK)
+        self.assertEquals(mem.getLY(), 1)
+
+    def test_WhenInOAM_AfterAFrameOfTicksAtOnce_LCDIsBackInOAMMode(self):
+        # Arrange
+        lcd = MockLCD()
+        mem = MockIOMemory(mode=LCDMode.OAM_READ, ly=0, lcd_is_on=True)
+        driver = lcdc.LCDController(mem, lcd)
+        # Act
+        driver.update(154 * 456 + 79)
+        # Assert
+        self.assertEquals(mem.getLCDMode(), LCDMode.OAM_READ)
+        self.assertEquals(mem.getLY(), 0)
+        self.assertEquals(len(lcd.frames), 1)
+
+    def test_WhenInOAM_AfterTwoFramesOfTicksAtOnce_LCDIsPassedTwoFrames(self):
+        # Arrange
+        lcd = MockLCD()
+        mem = MockIOMemory(mode=LCDMode.OAM_READ, ly=0, lcd_is_on=True)
+        driver = lcdc.LCDController(mem, lcd)
+        # Act
+        driver.update(2 * 154 * 456)
+        # Assert
+        self.assertEquals(mem.getLCDMode(), LCDMode.OAM_READ)
+        self.assertEquals(mem.getLY(), 0)
+        self.assertEquals(len(lcd.frames), 2)
+
+    def test_WhenInOAM_After30ticks_NextEventIsIn50ticks(self):
+        # Arrange
+        mem = MockIOMemory(mode=LCDMode.OAM_READ)
+        driver = lcdc.LCDController(mem, None)
+        # Act
+        driver.update(30)
+        # Assert
+        self.assertEquals(driver.cycles_until_next_event(), 50)
+
+    def test_WhenInVRAM_AfterNextEventTicks_LCDEntersHBLANKMode(self):
+        # Arrange
+        mem = MockIOMemory(mode=LCDMode.VRAM_READ)
+        driver = lcdc.LCDController(mem, None)
+        # Act
+        driver.update(driver.cycles_until_next_event())
+        # Assert
+        self.assertEquals(mem.getLCDMode(), LCDMode.HBLANK)
+        self.assertEquals(driver.cycles_until_next_event(), 204)
+
+    def test_WhenFrameSkipIs2_After6Frames_LCDIsPassed2Frames(self):
+        # Arrange
+        lcd = MockLCD()
+        mem = MockIOMemory(mode=LCDMode.OAM_READ, ly=0, lcd_is_on=True)
+        driver = lcdc.LCDController(mem, lcd, frame_skip=2)
+        # Act
+        driver.update(6 * 154 * 456)
+        # Assert
+        self.assertEquals(len(lcd.frames), 2)
+
+    def test_WhenFrameIsSkipped_ScanlineIsNotDrawn(self):
+        # Arrange
+        lcd = MockLCD()
+        mem = MockIOMemory(mode=LCDMode.OAM_READ, ly=0, lcd_is_on=True,
+                           bg_palette=0xff)
+        driver = lcdc.LCDController(mem, lcd, frame_skip=1)
+        driver.update(154 * 456)
+        driver.frame()[0] = 0
+        # Act
+        driver.update(80)
+        # Assert
+        self.assertEquals(driver.frame()[0], 0)
+        driver.update(154 * 456)
+        self.assertEquals(driver.frame()[0], 0b11)
+
+    def test_WhenNotRendering_TimingAndIntrsAreUnchanged(self):
+        # Arrange
+        lcd = MockLCD()
+        mem = MockIOMemory(mode=LCDMode.HBLANK, ly=144,
+                           vblank_intr_enabled=True)
+        driver = lcdc.LCDController(mem, lcd, render=False)
+        # Act
+        driver.update(204)
+        # Assert
+        self.assertEquals(mem.getLCDMode(), LCDMode.VBLANK)
+        self.assertTrue(mem.lcdc_intr_enabled)
+        self.assertEquals(lcd.frames, [])
+
+    def test_WhenBGPChangesMidFrame_LaterLinesUseNewPalette(self):
+        # Arrange
+        lcd = MockLCD()
+        mem = iomem.IOMemory(array.Array(1 << 16))
+        mem.set8(iomem.BGP, 0x00)
+        mem.setLCDMode(LCDMode.OAM_READ)
+        driver = lcdc.LCDController(mem, lcd)
+        driver.update(72 * 456)
+        # Act
+        mem.set8(iomem.BGP, 0x03)
+        driver.update(72 * 456)
+        # Assert
+        self.assertEquals(lcd.frames[0][0:72 * 160], bytearray(72 * 160))
+        self.assertEquals(lcd.frames[0][72 * 160:],
+                          bytearray([0b11] * 72 * 160))
@@ -0,0 +1,83 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import random
+import unittest
+
+from pygme.lcd.driver import lcdc
+from pygme.lcd.driver import nprenderer
+from pygme.lcd.driver import renderer
+from pygme.memory import array
+from pygme.memory import iomem
+
+
+class MockLCD:
+
+    def __init__(self):
+        self.frames = []
+
+    def update(self, frame):
+        self.frames.append(bytes(frame))
+
+
+@unittest.skipIf(not nprenderer.available(), "NumPy is not installed")
+class TestNumPyRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.mem = iomem.IOMemory(array.Array(1 << 16))
+        self.rand = random.Random(0)
+        for addr in range(renderer.VRAM_START, renderer.VRAM_START + 0x2000):
+            self.mem.set8(addr, self.rand.randrange(0x100))
+        self.renderer = nprenderer.NumPyRenderer(self.mem)
+        self.reference = renderer.Renderer(self.mem)
+
+    def test_drawLine_matchesRenderer(self):
+        for lcdc in [0x91, 0x81, 0xb1, 0xf9, 0xe1]:
+            self.mem.set8(iomem.LCDC, lcdc)
+            self.randomiseRegs()
+            for ly in range(0, renderer.SCREEN_HEIGHT):
+                self.expectSameLine(ly)
+
+    def test_drawLine_seesVRAMWrites(self):
+        self.expectSameLine(0)
+        for addr in [0x8000, 0x8001, 0x9800, 0x9801]:
+            self.mem.set8(addr, self.rand.randrange(0x100))
+        self.expectSameLine(0)
+
+    def test_frameArray(self):
+        frame = bytearray(renderer.SCREEN_WIDTH * renderer.SCREEN_HEIGHT)
+        frame[renderer.SCREEN_WIDTH + 2] = 3
+        a = nprenderer.frameArray(memoryview(frame))
+        self.assertEquals(a.shape, (renderer.SCREEN_HEIGHT,
+                                    renderer.SCREEN_WIDTH))
+        self.assertEquals(a[1, 2], 3)
+
+    def test_lcdController_usesNumPy(self):
+        frames = []
+        for use_numpy in [True, False]:
+            lcd = MockLCD()
+            ctrl = lcdc.LCDController(self.mem, lcd, use_numpy=use_numpy)
+            ctrl.update(154 * 456)
+            frames.append(lcd.frames)
+        self.assertEquals(len(frames[0]), 1)
+        self.assertEquals(frames[0], frames[1])
+
+    def randomiseRegs(self):
+        for reg in [iomem.SCY, iomem.SCX, iomem.BGP, iomem.WY]:
+            self.mem.set8(reg, self.rand.randrange(0x100))
+        self.mem.set8(iomem.WX, self.rand.randrange(0xa8))
+
+    def expectSameLine(self, ly):
+        self.assertEquals(self.renderer.drawLine(ly, []),
+                          self.reference.drawLine(ly, []),
+                          "Lines differ at LY %d" % ly)
+
+    def tearDown(self):
+        self.renderer = None
+        self.reference = None
+        self.mem = None
+
+
+if __name__ == '__main__':
+    unittest.main()
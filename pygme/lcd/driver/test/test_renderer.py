@@ -0,0 +1,208 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import unittest
+
+from pygme.lcd.driver import renderer
+from pygme.memory import array
+from pygme.memory import iomem
+
+
+class TestRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.mem = iomem.IOMemory(array.Array(1 << 16))
+        # Use the identity palette, so that shades equal palette indices.
+        self.mem.set8(iomem.BGP, 0xe4)
+        self.renderer = renderer.Renderer(self.mem)
+
+    def test_tileRows(self):
+        self.assertEquals(renderer.TILE_ROWS[0x0000], bytearray(8))
+        self.assertEquals(renderer.TILE_ROWS[0x0080],
+                          bytearray([1, 0, 0, 0, 0, 0, 0, 0]))
+        self.assertEquals(renderer.TILE_ROWS[0x0100],
+                          bytearray([0, 0, 0, 0, 0, 0, 0, 2]))
+        self.assertEquals(renderer.TILE_ROWS[0xf00f],
+                          bytearray([2, 2, 2, 2, 1, 1, 1, 1]))
+        self.assertEquals(renderer.TILE_ROWS[0xffff], bytearray([3] * 8))
+
+    def test_paletteTable(self):
+        table = renderer.paletteTable(0x1b)
+        self.assertEquals(bytearray(b'\x00\x01\x02\x03').translate(table),
+                          bytearray([3, 2, 1, 0]))
+        self.assertTrue(renderer.paletteTable(0x1b) is table)
+
+    def test_drawBackground_paletteChangeAppliesToNextLine(self):
+        self.mem.set8(iomem.BGP, 0x00)
+        self.assertEquals(self.renderer.drawBackground(0), bytearray(160))
+        self.mem.set8(iomem.BGP, 0x03)
+        self.assertEquals(self.renderer.drawBackground(1),
+                          bytearray([3] * 160))
+
+    def test_drawBackground(self):
+        self.setTileRow(1, 0, 0x0f, 0xf0)
+        self.mem.set8(renderer.BG_MAP_START + 1, 1)
+        line = self.renderer.drawBackground(0)
+        self.assertEquals(len(line), renderer.SCREEN_WIDTH)
+        self.assertEquals(line[0:16],
+                          bytearray([0] * 8 + [2, 2, 2, 2, 1, 1, 1, 1]))
+
+    def test_drawBackground_scrolled(self):
+        self.setTileRow(1, 3, 0xff, 0x00)
+        self.mem.set8(renderer.BG_MAP_START + 0x20 + 1, 1)
+        self.mem.set8(iomem.SCY, 0x0a)
+        self.mem.set8(iomem.SCX, 0x05)
+        line = self.renderer.drawBackground(1)
+        self.assertEquals(line[0:12], bytearray([0] * 3 + [1] * 8 + [0]))
+
+    def test_drawBackground_wrapsAroundMap(self):
+        self.setTileRow(1, 0, 0xff, 0xff)
+        self.mem.set8(renderer.BG_MAP_START, 1)
+        self.mem.set8(iomem.SCX, 0xf8)
+        line = self.renderer.drawBackground(0)
+        self.assertEquals(line[0:16], bytearray([0] * 8 + [3] * 8))
+
+    def test_drawBackground_signedTileNumbers(self):
+        self.mem.set8(iomem.LCDC, 0x81)
+        # Tile 0 is at 0x9000, and tile 0x80 at 0x8800.
+        self.setTileRow(0x100, 0, 0xff, 0x00)
+        self.setTileRow(0x80, 0, 0x00, 0xff)
+        self.mem.set8(renderer.BG_MAP_START + 1, 0x80)
+        line = self.renderer.drawBackground(0)
+        self.assertEquals(line[0:16], bytearray([1] * 8 + [2] * 8))
+
+    def test_drawBackground_appliesPalette(self):
+        self.setTileRow(0, 0, 0xf0, 0xcc)
+        self.mem.set8(iomem.BGP, 0x1b)
+        line = self.renderer.drawBackground(0)
+        self.assertEquals(line[0:8], bytearray([0, 0, 2, 2, 1, 1, 3, 3]))
+
+    def test_tileCache_decodesTiles(self):
+        self.setTileRow(5, 7, 0x0f, 0xf0)
+        rows = self.renderer._tiles.rows(5)
+        self.assertEquals(len(rows), 8)
+        self.assertEquals(rows[0], bytearray(8))
+        self.assertEquals(rows[7], bytearray([2, 2, 2, 2, 1, 1, 1, 1]))
+
+    def test_tileCache_isInvalidatedByWrites(self):
+        cache = self.renderer._tiles
+        cache.rows(5)
+        cache.rows(6)
+        self.setTileRow(5, 3, 0xff, 0x00)
+        self.assertEquals(cache.rows(5)[3], bytearray([1] * 8))
+        self.assertTrue(cache._tiles[6] is not None)
+
+    def test_drawBackground_seesTileChanges(self):
+        self.mem.set8(renderer.BG_MAP_START, 1)
+        self.renderer.drawBackground(0)
+        self.setTileRow(1, 0, 0x00, 0xff)
+        line = self.renderer.drawBackground(0)
+        self.assertEquals(line[0:8], bytearray([2] * 8))
+
+    def test_drawLine_window(self):
+        self.mem.set8(iomem.LCDC, 0xb1)
+        self.setTileRow(1, 2, 0xff, 0xff)
+        self.mem.set8(renderer.BG_MAP_START, 0)
+        self.mem.set8(renderer.BG_MAP_START + 1, 1)
+        self.mem.set8(iomem.WY, 0x10)
+        self.mem.set8(iomem.WX, 0x07 + 0x0c)
+        line = self.renderer.drawLine(0x12, [])
+        self.assertEquals(line[0:0x0c], bytearray(0x0c))
+        self.assertEquals(line[0x0c:0x14], bytearray([0] * 8))
+        self.assertEquals(line[0x14:0x1c], bytearray([3] * 8))
+        self.assertEquals(self.renderer.drawLine(0x0f, []), bytearray(160))
+
+    def test_drawLine_windowLeftOfScreen(self):
+        self.mem.set8(iomem.LCDC, 0xb1)
+        self.setTileRow(1, 0, 0x0f, 0x00)
+        self.mem.set8(renderer.BG_MAP_START, 1)
+        self.mem.set8(iomem.WX, 0x03)
+        line = self.renderer.drawLine(0, [])
+        self.assertEquals(line[0:8], bytearray([1] * 4 + [0] * 4))
+
+    def test_selectSprites(self):
+        self.mem.set8(iomem.LCDC, 0x93)
+        self.setSprite(0, 0x10 + 4, 0x30, 1, 0)
+        self.setSprite(1, 0x10 - 3, 0x20, 2, 0)
+        self.setSprite(2, 0x10 - 8, 0x10, 3, 0)
+        self.setSprite(3, 0x10 + 0, 0x20, 4, 0)
+        sprites = self.renderer.selectSprites(4)
+        self.assertEquals([tile for _, _, tile, _ in sprites], [1, 4, 2])
+
+    def test_selectSprites_max10(self):
+        self.mem.set8(iomem.LCDC, 0x93)
+        for i in range(0, 12):
+            self.setSprite(i, 0x10, 0x08 + 12 - i, i, 0)
+        sprites = self.renderer.selectSprites(0)
+        self.assertEquals([tile for _, _, tile, _ in sprites], list(range(10)))
+
+    def test_selectSprites_objsOff(self):
+        self.setSprite(0, 0x10, 0x08, 1, 0)
+        self.assertEquals(self.renderer.selectSprites(0), [])
+
+    def test_drawLine_sprites(self):
+        self.mem.set8(iomem.LCDC, 0x93)
+        self.mem.set8(iomem.OBP0, 0xe4)
+        self.mem.set8(iomem.OBP1, 0x1b)
+        self.setTileRow(1, 1, 0xf0, 0x00)
+        self.setSprite(0, 0x10 - 1, 0x08 + 4, 1, 0)
+        self.setSprite(1, 0x10 - 1, 0x08 + 20, 1,
+                       renderer.SPRITE_X_FLIP | renderer.SPRITE_OBP1)
+        line = self.renderer.drawLine(0, self.renderer.selectSprites(0))
+        self.assertEquals(line[0:12], bytearray([0] * 4 + [1] * 4 + [0] * 4))
+        self.assertEquals(line[20:28], bytearray([0] * 4 + [2] * 4))
+
+    def test_drawLine_spriteYFlip(self):
+        self.mem.set8(iomem.LCDC, 0x93)
+        self.mem.set8(iomem.OBP0, 0xe4)
+        self.setTileRow(1, 7, 0xff, 0xff)
+        self.setSprite(0, 0x10, 0x08, 1, renderer.SPRITE_Y_FLIP)
+        line = self.renderer.drawLine(0, self.renderer.selectSprites(0))
+        self.assertEquals(line[0:8], bytearray([3] * 8))
+
+    def test_drawLine_tallSprites(self):
+        self.mem.set8(iomem.LCDC, 0x97)
+        self.mem.set8(iomem.OBP0, 0xe4)
+        self.setTileRow(3, 1, 0xff, 0x00)
+        self.setSprite(0, 0x10 - 9, 0x08, 2, 0)
+        line = self.renderer.drawLine(0, self.renderer.selectSprites(0))
+        self.assertEquals(line[0:8], bytearray([1] * 8))
+
+    def test_drawLine_spriteBehindBackground(self):
+        self.mem.set8(iomem.LCDC, 0x93)
+        self.mem.set8(iomem.OBP0, 0xe4)
+        self.setTileRow(0, 0, 0xff, 0xff)
+        self.setTileRow(1, 0, 0x0f, 0x00)
+        self.mem.set8(renderer.BG_MAP_START, 1)
+        self.setSprite(0, 0x10, 0x08, 0, renderer.SPRITE_BEHIND_BG)
+        line = self.renderer.drawLine(0, self.renderer.selectSprites(0))
+        self.assertEquals(line[0:8], bytearray([3] * 4 + [1] * 4))
+
+    def test_drawLine_spritePriority(self):
+        self.mem.set8(iomem.LCDC, 0x93)
+        self.mem.set8(iomem.OBP0, 0xe4)
+        self.setTileRow(1, 0, 0xff, 0x00)
+        self.setTileRow(2, 0, 0x00, 0xff)
+        self.setSprite(0, 0x10, 0x08 + 4, 1, 0)
+        self.setSprite(1, 0x10, 0x08, 2, 0)
+        line = self.renderer.drawLine(0, self.renderer.selectSprites(0))
+        self.assertEquals(line[0:12], bytearray([2] * 8 + [1] * 4))
+
+    def setSprite(self, n, y, x, tile, flags):
+        addr = renderer.OAM_START + n * 4
+        for i, val in enumerate([y, x, tile, flags]):
+            self.mem.set8(addr + i, val)
+
+    def setTileRow(self, tile, row, lo, hi):
+        addr = renderer.VRAM_START + tile * 0x10 + row * 2
+        self.mem.set8(addr, lo)
+        self.mem.set8(addr + 1, hi)
+
+    def tearDown(self):
+        self.renderer = None
+        self.mem = None
+
+
+if __name__ == '__main__':
+    unittest.main()
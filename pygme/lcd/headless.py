@@ -0,0 +1,36 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import zlib
+
+
+class HashLCD(object):
+    """
+    The HashLCD class is an LCD that displays nothing, but hashes each frame
+    it is passed with CRC-32 and passes (frame_number, hash) to record, so
+    that runs can be compared against golden output without storing frames.
+
+    Frames are numbered from 0 in the order they are passed to update(), so
+    a controller that skips frames should be given the same frame_skip when
+    the golden output is recorded.
+    """
+
+    def __init__(self, record):
+        self._record = record
+        self._frame_no = 0
+
+    def update(self, frame):
+        self._record(self._frame_no, zlib.crc32(frame) & 0xffffffff)
+        self._frame_no += 1
+
+
+def fileRecorder(f):
+    """
+    Returns a record function for HashLCD that writes each frame number and
+    hash to the file f as a line of the form "<frame_number> <hash>", with
+    the hash in 8 hex digits.
+    """
+    def record(frame_no, crc):
+        f.write("%d %08x\n" % (frame_no, crc))
+    return record
@@ -0,0 +1,58 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import io
+import unittest
+import zlib
+
+from pygme.lcd import headless
+from pygme.lcd.driver import lcdc
+from pygme.lcd.mode import LCDMode
+from pygme.memory import array
+from pygme.memory import iomem
+
+
+class TestHashLCD(unittest.TestCase):
+
+    def setUp(self):
+        self.records = []
+        self.lcd = headless.HashLCD(
+            lambda frame_no, crc: self.records.append((frame_no, crc)))
+
+    def test_update(self):
+        frame = bytearray(160 * 144)
+        self.lcd.update(memoryview(frame))
+        frame[1] = 3
+        self.lcd.update(memoryview(frame))
+        self.assertEquals(self.records, [
+            (0, zlib.crc32(bytes(bytearray(160 * 144))) & 0xffffffff),
+            (1, zlib.crc32(bytes(frame)) & 0xffffffff),
+        ])
+        self.assertNotEquals(self.records[0][1], self.records[1][1])
+
+    def test_withLCDController(self):
+        mem = iomem.IOMemory(array.Array(1 << 16))
+        mem.setLCDMode(LCDMode.OAM_READ)
+        driver = lcdc.LCDController(mem, self.lcd)
+        driver.update(154 * 456)
+        mem.set8(iomem.BGP, 0xff)
+        driver.update(2 * 154 * 456)
+        self.assertEquals([frame_no for frame_no, _ in self.records],
+                          [0, 1, 2])
+        self.assertNotEquals(self.records[0][1], self.records[1][1])
+        self.assertEquals(self.records[1][1], self.records[2][1])
+
+    def test_fileRecorder(self):
+        f = io.StringIO()
+        record = headless.fileRecorder(f)
+        record(0, 0x1234abcd)
+        record(1, 0x0000000f)
+        self.assertEquals(f.getvalue(), u"0 1234abcd\n1 0000000f\n")
+
+    def tearDown(self):
+        self.lcd = None
+
+
+if __name__ == '__main__':
+    unittest.main()
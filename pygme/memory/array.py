@@ -3,10 +3,30 @@
 # license that can be found in the LICENSE file.
 
 
-class Array:
+class Array(object):
+    """
+    The Array class is a block of byte-addressable memory, stored in a
+    bytearray.
 
-    def __init__(self, size):
-        self._mem = [0 for _ in range(0, size)]
+    By default get8 and set8 check that addresses are in range and values fit
+    in a byte. If checked is False they are instead bound directly to the
+    bytearray, which is considerably faster; out-of-range values still raise
+    ValueError, but negative addresses index from the end of the array.
+    get8_unchecked and set8_unchecked are always available for callers that
+    have already validated their arguments.
+
+    watch() registers a function to be told of writes to a range of
+    addresses. Until it is first called, writes pay nothing for it.
+    """
+
+    def __init__(self, size, checked=True):
+        self._mem = bytearray(size)
+        self._watches = []
+        self.get8_unchecked = self._mem.__getitem__
+        self.set8_unchecked = self._mem.__setitem__
+        if not checked:
+            self.get8 = self.get8_unchecked
+            self.set8 = self.set8_unchecked
 
     def get8(self, addr):
         self._chkAddr(addr)
@@ -19,10 +39,140 @@ class Array:
                              (val, val))
         self._mem[addr] = val
 
+    def get16(self, addr):
+        """Returns the little-endian word at addr."""
+        self._chkAddr(addr)
+        self._chkAddr(addr + 1)
+        mem = self._mem
+        return mem[addr] | mem[addr + 1] << 8
+
+    def set16(self, addr, val):
+        """Stores val as a little-endian word at addr."""
+        self._chkAddr(addr)
+        self._chkAddr(addr + 1)
+        if val < 0 or val > 0xffff:
+            raise ValueError("Expected 16-bit value, got 0x%04x(%d)" %
+                             (val, val))
+        mem = self._mem
+        mem[addr] = val & 0xff
+        mem[addr + 1] = val >> 8
+        if self._watches:
+            self._notify(addr, 2)
+
+    def load(self, addr, data):
+        """Copies the bytes of data into the array, starting at addr."""
+        self._chkRange(addr, len(data))
+        self._mem[addr:addr + len(data)] = data
+        if self._watches:
+            self._notify(addr, len(data))
+
+    def copy(self, src, dst, n):
+        """
+        Copies the n bytes starting at src to dst. The regions may overlap.
+        """
+        self._chkRange(src, n)
+        self._chkRange(dst, n)
+        mem = self._mem
+        mem[dst:dst + n] = mem[src:src + n]
+        if self._watches:
+            self._notify(dst, n)
+
+    def fill(self, addr, n, val):
+        """Sets the n bytes starting at addr to val."""
+        self._chkRange(addr, n)
+        if val < 0 or val > 0xff:
+            raise ValueError("Expected 8-bit value, got 0x%04x(%d)" %
+                             (val, val))
+        self._mem[addr:addr + n] = bytearray([val]) * n
+        if self._watches:
+            self._notify(addr, n)
+
+    def view(self, addr, n):
+        """
+        Returns a memoryview of the n bytes starting at addr. Writes through
+        the view change the array, and vice versa, but are not seen by the
+        functions registered with watch().
+        """
+        self._chkRange(addr, n)
+        return memoryview(self._mem)[addr:addr + n]
+
+    def watch(self, start, end, func):
+        """
+        Calls func(addr, val) after each write of val to an address addr in
+        the range [start, end], however the write is made.
+        """
+        if not self._watches:
+            self.set8 = self._watched(self.set8)
+            self.set8_unchecked = self._watched(self.set8_unchecked)
+        self._watches.append((start, end, func))
+
+    def _watched(self, write):
+        watches = self._watches
+
+        def set8(addr, val):
+            write(addr, val)
+            for start, end, func in watches:
+                if start <= addr <= end:
+                    func(addr, val)
+        return set8
+
+    def _notify(self, addr, n):
+        mem = self._mem
+        for start, end, func in self._watches:
+            for a in range(max(start, addr), min(end + 1, addr + n)):
+                func(a, mem[a])
+
+    def __getitem__(self, key):
+        """
+        Returns the byte at key, or a bytearray copy of the bytes in key if it
+        is a slice.
+        """
+        if isinstance(key, slice):
+            self._chkSlice(key)
+        else:
+            self._chkAddr(key)
+        return self._mem[key]
+
+    def __setitem__(self, key, val):
+        """
+        Stores the byte val at key, or the bytes of val in the slice key, which
+        must be the same length as val.
+        """
+        if isinstance(key, slice):
+            self._chkSlice(key)
+            start, stop, step = key.indices(len(self._mem))
+            n = len(range(start, stop, step))
+            if len(val) != n:
+                raise ValueError("Expected %d bytes, got %d" % (n, len(val)))
+            self._mem[key] = val
+            if self._watches:
+                for addr in range(start, stop, step):
+                    self._notify(addr, 1)
+        else:
+            self.set8(key, val)
+
+    def __len__(self):
+        return len(self._mem)
+
     def size(self):
         return len(self._mem)
 
     def _chkAddr(self, addr):
-        if addr < 0 or addr >= self.size():
+        if addr < 0 or addr >= len(self._mem):
             raise IndexError("Address (0x%x) is out of range [0x0-0x%x]" %
                              (addr, self.size() - 1))
+
+    def _chkRange(self, addr, n):
+        if n < 0:
+            raise ValueError("Expected a non-negative length, got %d" % n)
+        if n > 0:
+            self._chkAddr(addr)
+            self._chkAddr(addr + n - 1)
+
+    def _chkSlice(self, key):
+        if key.start is not None:
+            self._chkAddr(key.start)
+        if key.stop is not None and (key.stop < 0 or
+                                     key.stop > len(self._mem)):
+            raise IndexError("Address (0x%x) is out of range [0x0-0x%x]" %
+                             (key.stop - 1, self.size() - 1))
@@ -0,0 +1,352 @@
+# Copyright 2013 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+PAGE_SIZE = 0x1000
+
+# The cartridge header fields giving the bank controller and the amount of
+# external RAM.
+CART_TYPE = 0x147
+RAM_SIZE = 0x149
+
+RAM_BANK_SIZE = 0x2000
+
+# The number of RAM banks for each value of the RAM_SIZE header field.
+RAM_BANKS = {0x00: 0, 0x01: 1, 0x02: 1, 0x03: 4, 0x04: 16, 0x05: 8}
+
+
+def _pageReaders(view, n):
+    """
+    Returns a reader for each of the first n pages of view. A reader takes an
+    address and returns the byte at that address modulo PAGE_SIZE in its page.
+    """
+    readers = []
+    for i in range(0, n):
+        page = view[i * PAGE_SIZE:(i + 1) * PAGE_SIZE]
+        readers.append(lambda addr, page=page: page[addr & 0xfff])
+    return readers
+
+
+def _pageWriters(view, n):
+    """Returns a writer for each of the first n pages of view."""
+    writers = []
+    for i in range(0, n):
+        page = view[i * PAGE_SIZE:(i + 1) * PAGE_SIZE]
+
+        def write(addr, val, page=page):
+            page[addr & 0xfff] = val
+        writers.append(write)
+    return writers
+
+
+def _readDisabled(addr):
+    return 0xff
+
+
+def _writeDisabled(addr, val):
+    pass
+
+
+class MMU(object):
+    """
+    The MMU class maps a cartridge, VRAM, WRAM and the 0xFE00-0xFFFF page
+    into the 16-bit address space, switching ROM and RAM banks as directed by
+    the cartridge's bank controller.
+
+    Reads and writes are dispatched through tables of handlers indexed by the
+    high nibble of the address. The handlers for every ROM and RAM bank are
+    built up front, so a bank switch is a slice assignment of the handlers for
+    the new bank into the table, and the handlers read straight from
+    memoryviews of the bank, without copying.
+
+    Addresses and values are not range-checked.
+
+    watch() wraps the write handlers of the pages in a range so that a
+    function is told of writes to it; the handlers of other pages are
+    unaffected. Writes through the echo of WRAM are not seen.
+    """
+
+    def __init__(self, rom, mbc=None, ramBanks=None):
+        """
+        rom provides bank(n), returning a memoryview of the nth 16 KiB bank,
+        and numBanks(), as ROM does. mbc and ramBanks default to the values
+        given by the cartridge header.
+        """
+        header = rom.bank(0)
+        if mbc is None:
+            mbc = mbcFor(header[CART_TYPE])
+        if ramBanks is None:
+            ramBanks = RAM_BANKS.get(header[RAM_SIZE], 0)
+
+        self._readers = [None] * 0x10
+        self._writers = [None] * 0x10
+        self._watches = []
+
+        self._romReaders = [
+            _pageReaders(rom.bank(n), 4) for n in range(0, rom.numBanks())
+        ]
+
+        self._ram = bytearray(ramBanks * RAM_BANK_SIZE)
+        ram = memoryview(self._ram)
+        self._ramReaders = []
+        self._ramWriters = []
+        for n in range(0, ramBanks):
+            bank = ram[n * RAM_BANK_SIZE:(n + 1) * RAM_BANK_SIZE]
+            self._ramReaders.append(_pageReaders(bank, 2))
+            self._ramWriters.append(_pageWriters(bank, 2))
+        self._ramBank = 0
+        self._ramEnabled = False
+        self._ramHandlers = None
+
+        self._vram = bytearray(0x2000)
+        vram = memoryview(self._vram)
+        self._readers[0x8:0xa] = _pageReaders(vram, 2)
+        self._setWriters(0x8, _pageWriters(vram, 2))
+
+        # 0xE000-0xEFFF echoes 0xC000-0xCFFF, and the handlers for a page
+        # only look at the offset into it, so they are reused for the echo.
+        self._wram = bytearray(0x2000)
+        wram = memoryview(self._wram)
+        self._readers[0xc:0xe] = _pageReaders(wram, 2)
+        wramWriters = _pageWriters(wram, 2)
+        self._setWriters(0xc, wramWriters)
+        self._readers[0xe] = self._readers[0xc]
+        self._setWriters(0xe, wramWriters[0:1])
+
+        self._high = bytearray(0x200)
+        self._readers[0xf] = self._readHigh
+        self._setWriters(0xf, [self._writeHigh])
+
+        self._mbc = mbc(self)
+        self._setWriters(0x0, [self._mbc.write] * 8)
+        self.mapROMBank0(0)
+        self.mapROMBank(1)
+        self._remapRAM()
+
+    def get8(self, addr):
+        return self._readers[addr >> 12](addr)
+
+    def set8(self, addr, val):
+        self._writers[addr >> 12](addr, val)
+
+    def size(self):
+        return 0x10000
+
+    def numROMBanks(self):
+        return len(self._romReaders)
+
+    def numRAMBanks(self):
+        return len(self._ramReaders)
+
+    def mapROMBank0(self, n):
+        """
+        Maps ROM bank n, modulo the number of banks, into 0x0000-0x3FFF.
+        """
+        self._readers[0x0:0x4] = self._romReaders[n % len(self._romReaders)]
+
+    def mapROMBank(self, n):
+        """
+        Maps ROM bank n, modulo the number of banks, into 0x4000-0x7FFF.
+        """
+        self._readers[0x4:0x8] = self._romReaders[n % len(self._romReaders)]
+
+    def mapRAMBank(self, n):
+        """
+        Maps external RAM bank n, modulo the number of banks, into
+        0xA000-0xBFFF, replacing any handlers set by mapRAMHandlers().
+        """
+        self._ramBank = n
+        self._ramHandlers = None
+        self._remapRAM()
+
+    def mapRAMHandlers(self, read, write):
+        """
+        Directs reads and writes to 0xA000-0xBFFF to read and write while RAM
+        is enabled, e.g. for a bank controller's clock registers.
+        """
+        self._ramHandlers = (read, write)
+        self._remapRAM()
+
+    def setRAMEnabled(self, enabled):
+        """
+        Enables or disables external RAM. While disabled, reads of
+        0xA000-0xBFFF return 0xFF and writes are ignored.
+        """
+        self._ramEnabled = enabled
+        self._remapRAM()
+
+    def _remapRAM(self):
+        if not self._ramEnabled:
+            readers = [_readDisabled] * 2
+            writers = [_writeDisabled] * 2
+        elif self._ramHandlers is not None:
+            read, write = self._ramHandlers
+            readers = [read] * 2
+            writers = [write] * 2
+        elif self._ramReaders:
+            n = self._ramBank % len(self._ramReaders)
+            readers = self._ramReaders[n]
+            writers = self._ramWriters[n]
+        else:
+            readers = [_readDisabled] * 2
+            writers = [_writeDisabled] * 2
+        self._readers[0xa:0xc] = readers
+        self._setWriters(0xa, writers)
+
+    def watch(self, start, end, func):
+        """
+        Calls func(addr, val) after each write of val to an address addr in
+        the range [start, end].
+        """
+        self._watches.append((start, end, func))
+        for page in range(start >> 12, (end >> 12) + 1):
+            self._writers[page] = self._watched(self._writers[page], start,
+                                                end, func)
+
+    def _setWriters(self, page, writers):
+        """
+        Installs writers as the write handlers of the pages from page on,
+        wrapped for any watches that cover them.
+        """
+        for i, write in enumerate(writers):
+            for start, end, func in self._watches:
+                if start >> 12 <= page + i <= end >> 12:
+                    write = self._watched(write, start, end, func)
+            self._writers[page + i] = write
+
+    def _watched(self, write, start, end, func):
+        def watchedWrite(addr, val):
+            write(addr, val)
+            if start <= addr <= end:
+                func(addr, val)
+        return watchedWrite
+
+    def _readHigh(self, addr):
+        # 0xF000-0xFDFF echoes 0xD000-0xDDFF.
+        if addr < 0xfe00:
+            return self._wram[addr - 0xe000]
+        return self._high[addr - 0xfe00]
+
+    def _writeHigh(self, addr, val):
+        if addr < 0xfe00:
+            self._wram[addr - 0xe000] = val
+        else:
+            self._high[addr - 0xfe00] = val
+
+
+class NoMBC(object):
+    """A cartridge without a bank controller, which ignores writes to ROM."""
+
+    def __init__(self, mmu):
+        mmu.setRAMEnabled(True)
+
+    def write(self, addr, val):
+        pass
+
+
+class MBC1(object):
+    """
+    The MBC1 bank controller, which addresses up to 2 MiB of ROM and 32 KiB of
+    RAM.
+    """
+
+    def __init__(self, mmu):
+        self._mmu = mmu
+        self._lo = 1
+        self._hi = 0
+        self._mode = 0
+
+    def write(self, addr, val):
+        if addr < 0x2000:
+            self._mmu.setRAMEnabled(val & 0x0f == 0x0a)
+            return
+        if addr < 0x4000:
+            self._lo = val & 0x1f or 1
+        elif addr < 0x6000:
+            self._hi = val & 0x03
+        else:
+            self._mode = val & 0x01
+        self._remap()
+
+    def _remap(self):
+        mmu = self._mmu
+        mmu.mapROMBank(self._hi << 5 | self._lo)
+        if self._mode:
+            mmu.mapROMBank0(self._hi << 5)
+            mmu.mapRAMBank(self._hi)
+        else:
+            mmu.mapROMBank0(0)
+            mmu.mapRAMBank(0)
+
+
+class MBC3(object):
+    """
+    The MBC3 bank controller, which addresses up to 2 MiB of ROM and 32 KiB of
+    RAM, and has clock registers that can be mapped in place of RAM.
+
+    The clock registers are stored, but do not advance.
+    """
+
+    def __init__(self, mmu):
+        self._mmu = mmu
+        self._rtc = bytearray(5)
+        self._rtcReg = 0
+
+    def write(self, addr, val):
+        mmu = self._mmu
+        if addr < 0x2000:
+            mmu.setRAMEnabled(val & 0x0f == 0x0a)
+        elif addr < 0x4000:
+            mmu.mapROMBank(val & 0x7f or 1)
+        elif addr < 0x6000:
+            if val <= 0x03:
+                mmu.mapRAMBank(val)
+            elif 0x08 <= val <= 0x0c:
+                self._rtcReg = val - 0x08
+                mmu.mapRAMHandlers(self._readRTC, self._writeRTC)
+
+    def _readRTC(self, addr):
+        return self._rtc[self._rtcReg]
+
+    def _writeRTC(self, addr, val):
+        self._rtc[self._rtcReg] = val
+
+
+class MBC5(object):
+    """
+    The MBC5 bank controller, which addresses up to 8 MiB of ROM and 128 KiB
+    of RAM.
+    """
+
+    def __init__(self, mmu):
+        self._mmu = mmu
+        self._romBank = 1
+
+    def write(self, addr, val):
+        mmu = self._mmu
+        if addr < 0x2000:
+            mmu.setRAMEnabled(val & 0x0f == 0x0a)
+        elif addr < 0x3000:
+            self._romBank = (self._romBank & 0x100) | val
+            mmu.mapROMBank(self._romBank)
+        elif addr < 0x4000:
+            self._romBank = (val & 0x01) << 8 | (self._romBank & 0xff)
+            mmu.mapROMBank(self._romBank)
+        elif addr < 0x6000:
+            mmu.mapRAMBank(val & 0x0f)
+
+
+# The bank controller for each value of the CART_TYPE header field.
+MBCS = {
+    0x00: NoMBC, 0x08: NoMBC, 0x09: NoMBC,
+    0x01: MBC1, 0x02: MBC1, 0x03: MBC1,
+    0x0f: MBC3, 0x10: MBC3, 0x11: MBC3, 0x12: MBC3, 0x13: MBC3,
+    0x19: MBC5, 0x1a: MBC5, 0x1b: MBC5, 0x1c: MBC5, 0x1d: MBC5, 0x1e: MBC5,
+}
+
+
+def mbcFor(cartType):
+    """Returns the bank controller class for the CART_TYPE header field."""
+    if cartType not in MBCS:
+        raise ValueError("Unsupported cartridge type 0x%02x" % cartType)
+    return MBCS[cartType]
@@ -0,0 +1,73 @@
+# Copyright 2013 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import mmap
+
+
+class ROM(object):
+    """
+    The ROM class serves the 0x0000-0x7FFF window of a cartridge from a ROM
+    image that is memory-mapped read-only, so the image is never copied and
+    processes running the same ROM share its pages.
+
+    The image is divided into 16 KiB banks. Bank 0 is always visible at
+    0x0000-0x3FFF, and the bank selected by setBank() at 0x4000-0x7FFF.
+    """
+
+    BANK_SIZE = 0x4000
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self._map)
+        if size < 2 * self.BANK_SIZE:
+            self._map.close()
+            raise ValueError("Expected at least 0x%x bytes of ROM, got 0x%x" %
+                             (2 * self.BANK_SIZE, size))
+        self._view = memoryview(self._map)
+        self._banks = [
+            self._view[start:start + self.BANK_SIZE]
+            for start in range(0, size, self.BANK_SIZE)
+        ]
+        self._lo = self._banks[0]
+        self.setBank(1)
+
+    def get8(self, addr):
+        if addr < 0 or addr >= 2 * self.BANK_SIZE:
+            raise IndexError("Address (0x%x) is out of range [0x0-0x%x]" %
+                             (addr, 2 * self.BANK_SIZE - 1))
+        if addr < self.BANK_SIZE:
+            return self._lo[addr]
+        return self._hi[addr - self.BANK_SIZE]
+
+    def bank(self, n):
+        """
+        Returns a read-only memoryview of bank n. The last bank is shorter than
+        BANK_SIZE if the image size is not a multiple of it.
+        """
+        if n < 0 or n >= len(self._banks):
+            raise IndexError("Bank (%d) is out of range [0-%d]" %
+                             (n, len(self._banks) - 1))
+        return self._banks[n]
+
+    def setBank(self, n):
+        """Maps bank n into 0x4000-0x7FFF."""
+        self._hi = self.bank(n)
+        self._bankNum = n
+
+    def getBank(self):
+        return self._bankNum
+
+    def numBanks(self):
+        return len(self._banks)
+
+    def size(self):
+        return len(self._view)
+
+    def close(self):
+        """Unmaps the image; the ROM must not be used afterwards."""
+        for view in self._banks:
+            view.release()
+        self._view.release()
+        self._map.close()
@@ -50,6 +50,120 @@ class TestArray(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.mem.set8(0, 0x100)
 
+    def test_unchecked_sharesStorage(self):
+        self.mem.set8_unchecked(0x10, 0xab)
+        self.expect8(0x10, 0xab)
+        self.mem.set8(0x11, 0xcd)
+        self.assertEquals(self.mem.get8_unchecked(0x11), 0xcd)
+
+    def test_unchecked_rejectsOutOfRangeVal(self):
+        mem = array.Array(0x10, checked=False)
+        mem.set8(0, 0xff)
+        with self.assertRaises(ValueError):
+            mem.set8(0, 0x100)
+        with self.assertRaises(IndexError):
+            mem.get8(0x10)
+
+    def test_get16_isLittleEndian(self):
+        self.mem.set8(0x20, 0x34)
+        self.mem.set8(0x21, 0x12)
+        self.assertEquals(self.mem.get16(0x20), 0x1234)
+
+    def test_set16_isLittleEndian(self):
+        self.mem.set16(0x20, 0xbeef)
+        self.expect8(0x20, 0xef)
+        self.expect8(0x21, 0xbe)
+
+    def test_set16_maxAddr(self):
+        self.mem.set16(self.mem.size() - 2, 0)
+        with self.assertRaises(IndexError):
+            self.mem.set16(self.mem.size() - 1, 0)
+
+    def test_set16_maxVal(self):
+        self.mem.set16(0, 0xffff)
+        with self.assertRaises(ValueError):
+            self.mem.set16(0, 0x10000)
+
+    def test_slice(self):
+        self.mem[0x30:0x33] = bytearray([1, 2, 3])
+        self.assertEquals(self.mem[0x30:0x33], bytearray([1, 2, 3]))
+        self.expect8(0x32, 3)
+        self.assertEquals(self.mem[0x31], 2)
+
+    def test_slice_keepsSize(self):
+        with self.assertRaises(ValueError):
+            self.mem[0:2] = bytearray([1, 2, 3])
+        self.assertEquals(len(self.mem), 0x1000)
+
+    def test_slice_maxAddr(self):
+        self.mem[self.mem.size() - 1:self.mem.size()]
+        with self.assertRaises(IndexError):
+            self.mem[self.mem.size() - 1:self.mem.size() + 1]
+
+    def test_load(self):
+        self.mem.load(0x40, bytearray([0xde, 0xad, 0xbe, 0xef]))
+        self.expect8(0x40, 0xde)
+        self.expect8(0x43, 0xef)
+        self.expect8(0x44, 0)
+
+    def test_load_maxAddr(self):
+        self.mem.load(self.mem.size() - 2, bytearray(2))
+        with self.assertRaises(IndexError):
+            self.mem.load(self.mem.size() - 1, bytearray(2))
+
+    def test_copy(self):
+        self.mem.load(0x50, bytearray([1, 2, 3, 4]))
+        self.mem.copy(0x50, 0x60, 4)
+        self.assertEquals(self.mem[0x60:0x64], bytearray([1, 2, 3, 4]))
+
+    def test_copy_overlapping(self):
+        self.mem.load(0x50, bytearray([1, 2, 3, 4]))
+        self.mem.copy(0x50, 0x52, 4)
+        self.assertEquals(self.mem[0x50:0x56],
+                          bytearray([1, 2, 1, 2, 3, 4]))
+
+    def test_fill(self):
+        self.mem.fill(0x70, 0x10, 0xff)
+        self.expect8(0x6f, 0)
+        self.expect8(0x70, 0xff)
+        self.expect8(0x7f, 0xff)
+        self.expect8(0x80, 0)
+        with self.assertRaises(ValueError):
+            self.mem.fill(0x70, 0x10, 0x100)
+
+    def test_view_isZeroCopy(self):
+        view = self.mem.view(0x80, 0x10)
+        self.assertEquals(len(view), 0x10)
+        self.mem.set8(0x81, 0x12)
+        self.assertEquals(bytearray(view)[1], 0x12)
+        view[2:3] = bytearray([0x34])
+        self.expect8(0x82, 0x34)
+
+    def test_view_maxAddr(self):
+        self.mem.view(0, self.mem.size())
+        with self.assertRaises(IndexError):
+            self.mem.view(1, self.mem.size())
+
+    def test_watch(self):
+        writes = []
+        self.mem.watch(0x100, 0x1ff,
+                        lambda addr, val: writes.append((addr, val)))
+        self.mem.set8(0xff, 1)
+        self.mem.set8(0x100, 2)
+        self.mem.set8_unchecked(0x1ff, 3)
+        self.mem[0x180] = 4
+        self.mem.set8(0x200, 5)
+        self.assertEquals(writes, [(0x100, 2), (0x1ff, 3), (0x180, 4)])
+
+    def test_watch_bulkWrites(self):
+        writes = []
+        self.mem.watch(0x100, 0x101,
+                        lambda addr, val: writes.append((addr, val)))
+        self.mem.fill(0xfe, 3, 7)
+        self.mem.load(0x101, bytearray([8, 9]))
+        self.mem.set16(0xff, 0x0a0b)
+        self.assertEquals(writes, [(0x100, 7), (0x101, 8), (0x100, 0x0a)])
+
     def expect8(self, addr, v):
         b = self.mem.get8(addr)
         self.assertEquals(b, v, "Expected 0x%02x(%d), got 0x%02x(%d) at 0x%x" %
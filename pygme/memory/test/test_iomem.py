@@ -0,0 +1,166 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import unittest
+
+from pygme.lcd.mode import LCDMode
+from pygme.memory import array
+from pygme.memory import iomem
+
+
+class ByteMemory:
+    """Passes get8() and set8() to a memory, hiding its bulk methods."""
+
+    def __init__(self, mem):
+        self._mem = mem
+
+    def get8(self, addr):
+        return self._mem.get8(addr)
+
+    def set8(self, addr, val):
+        self._mem.set8(addr, val)
+
+
+class TestIOMemory(unittest.TestCase):
+
+    def setUp(self):
+        self.backing = array.Array(1 << 16)
+        self.mem = iomem.IOMemory(self.backing)
+
+    def test_passesThroughOutsideIO(self):
+        for addr in [0x0000, 0xc000, 0xfeff, 0xff80, 0xffff]:
+            self.mem.set8(addr, 0xba)
+            self.assertEquals(self.backing.get8(addr), 0xba)
+            self.assertEquals(self.mem.get8(addr), 0xba)
+
+    def test_holdsIO(self):
+        self.mem.set8(0xff00, 0x12)
+        self.mem.set8(0xff7f, 0x34)
+        self.assertEquals(self.mem.get8(0xff00), 0x12)
+        self.assertEquals(self.mem.get8(0xff7f), 0x34)
+        self.assertEquals(self.backing.get8(0xff00), 0)
+        with self.assertRaises(ValueError):
+            self.mem.set8(0xff00, 0x100)
+
+    def test_lcdc_isDecodedOnWrite(self):
+        self.mem.set8(iomem.LCDC, 0x00)
+        self.assertFalse(self.mem.getDisplayIsOn())
+        self.assertFalse(self.mem.getBgAndWinIsOn())
+        self.assertEquals(self.mem.getLCDCBackgroundXOffset(), 0x100)
+        self.assertEquals(self.mem.getLCDCBackgroundYOffset(), 0)
+        self.assertEquals(self.mem.getObjHeight(), 8)
+        self.mem.set8(iomem.LCDC, 0xff)
+        self.assertTrue(self.mem.getDisplayIsOn())
+        self.assertTrue(self.mem.getWinIsOn())
+        self.assertTrue(self.mem.getObjIsOn())
+        self.assertTrue(self.mem.getBgAndWinIsOn())
+        self.assertEquals(self.mem.getWinTileMapOffset(), 0x400)
+        self.assertEquals(self.mem.getLCDCBackgroundXOffset(), 0)
+        self.assertEquals(self.mem.getLCDCBackgroundYOffset(), 0x400)
+        self.assertEquals(self.mem.getObjHeight(), 16)
+        self.assertEquals(self.mem.get8(iomem.LCDC), 0xff)
+
+    def test_stat_intrEnables(self):
+        self.mem.set8(iomem.STAT, 0x28)
+        self.assertTrue(self.mem.isHBLANKIntrEnabled())
+        self.assertFalse(self.mem.isVBLANKIntrEnabled())
+        self.assertTrue(self.mem.isOAMIntrEnabled())
+        self.assertFalse(self.mem.isLYCIntrEnabled())
+
+    def test_stat_modeIsReadOnly(self):
+        self.mem.setLCDMode(LCDMode.VRAM_READ)
+        self.mem.set8(iomem.STAT, 0x00)
+        self.assertEquals(self.mem.getLCDMode(), LCDMode.VRAM_READ)
+        self.assertEquals(self.mem.get8(iomem.STAT) & 0x03, LCDMode.VRAM_READ)
+
+    def test_scroll(self):
+        self.mem.set8(iomem.SCY, 0x12)
+        self.mem.set8(iomem.SCX, 0x34)
+        self.assertEquals(self.mem.getSCY(), 0x12)
+        self.assertEquals(self.mem.getSCX(), 0x34)
+
+    def test_palettes(self):
+        self.assertEquals(self.mem.getBgPalette(), 0xfc)
+        self.mem.set8(iomem.BGP, 0xe4)
+        self.mem.set8(iomem.OBP0, 0xd2)
+        self.mem.set8(iomem.OBP1, 0x1b)
+        self.assertEquals(self.mem.getBgPalette(), 0xe4)
+        self.assertEquals(self.mem.getObjPalette0(), 0xd2)
+        self.assertEquals(self.mem.getObjPalette1(), 0x1b)
+
+    def test_ly_isResetByWrite(self):
+        self.mem.setLY(0x42)
+        self.assertEquals(self.mem.get8(iomem.LY), 0x42)
+        self.mem.set8(iomem.LY, 0x10)
+        self.assertEquals(self.mem.getLY(), 0)
+
+    def test_lyc_coincidence(self):
+        self.mem.set8(iomem.STAT, 0x40)
+        self.mem.set8(iomem.LYC, 0x05)
+        self.mem.setLY(0x04)
+        self.assertEquals(self.mem.get8(iomem.STAT) & 0x04, 0)
+        self.assertEquals(self.mem.get8(iomem.IF) & iomem.INTR_LCDC, 0)
+        self.mem.setLY(0x05)
+        self.assertEquals(self.mem.get8(iomem.STAT) & 0x04, 0x04)
+        self.assertEquals(self.mem.get8(iomem.IF) & iomem.INTR_LCDC,
+                          iomem.INTR_LCDC)
+
+    def test_intrs(self):
+        self.mem.setVBLANKIntr()
+        self.assertEquals(self.mem.get8(iomem.IF), iomem.INTR_VBLANK)
+        self.mem.setLCDCIntr()
+        self.assertEquals(self.mem.get8(iomem.IF),
+                          iomem.INTR_VBLANK | iomem.INTR_LCDC)
+        self.mem.setTimerIntr()
+        self.assertEquals(self.mem.get8(iomem.IF), 0x07)
+
+    def test_intrListener(self):
+        calls = []
+        self.mem.setIntrListener(lambda: calls.append(True))
+        self.mem.set8(iomem.IE, 0x01)
+        self.assertEquals(self.backing.get8(iomem.IE), 0x01)
+        self.mem.set8(iomem.IF, 0x01)
+        self.mem.setTimerIntr()
+        self.mem.set8(iomem.SCY, 0x01)
+        self.mem.set8(0xfffe, 0x01)
+        self.assertEquals(len(calls), 3)
+        self.assertEquals(self.mem.get8(iomem.IF), 0x05)
+
+    def test_mapRegister(self):
+        writes = []
+        self.mem.mapRegister(iomem.DIV, lambda: 0x42, writes.append)
+        self.assertEquals(self.mem.get8(iomem.DIV), 0x42)
+        self.mem.set8(iomem.DIV, 0x12)
+        self.assertEquals(writes, [0x12])
+        self.assertEquals(self.mem.get8(iomem.DIV), 0x42)
+
+    def test_dma(self):
+        for i in range(0, iomem.OAM_SIZE):
+            self.backing.set8(0xc100 + i, i)
+        self.mem.set8(iomem.DMA, 0xc1)
+        for i in range(0, iomem.OAM_SIZE):
+            self.assertEquals(self.mem.get8(iomem.OAM_START + i), i)
+
+    def test_dma_notifiesWatches(self):
+        writes = []
+        self.mem.watch(iomem.OAM_START, iomem.OAM_START + iomem.OAM_SIZE - 1,
+                       lambda addr, val: writes.append(addr))
+        self.mem.set8(iomem.DMA, 0xc1)
+        self.assertEquals(len(writes), iomem.OAM_SIZE)
+
+    def test_dma_withoutCopy(self):
+        mem = iomem.IOMemory(ByteMemory(self.backing))
+        for i in range(0, iomem.OAM_SIZE):
+            self.backing.set8(0xc100 + i, i)
+        mem.set8(iomem.DMA, 0xc1)
+        for i in range(0, iomem.OAM_SIZE):
+            self.assertEquals(mem.get8(iomem.OAM_START + i), i)
+
+    def tearDown(self):
+        self.mem = None
+        self.backing = None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+# Copyright 2013 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import unittest
+
+from pygme.memory import mmu
+
+
+class MockROM:
+
+    BANK_SIZE = 0x4000
+
+    def __init__(self, numBanks, cartType=0x00, ramSize=0x00):
+        # Each byte of bank n holds n & 0xff, except at 0x3FFF in the bank,
+        # which holds n >> 8.
+        self._data = bytearray()
+        for n in range(0, numBanks):
+            bank = bytearray([n & 0xff]) * self.BANK_SIZE
+            bank[0x3fff] = n >> 8
+            self._data += bank
+        self._data[mmu.CART_TYPE] = cartType
+        self._data[mmu.RAM_SIZE] = ramSize
+        self._view = memoryview(self._data)
+
+    def bank(self, n):
+        return self._view[n * self.BANK_SIZE:(n + 1) * self.BANK_SIZE]
+
+    def numBanks(self):
+        return len(self._data) // self.BANK_SIZE
+
+
+class TestMMU(unittest.TestCase):
+
+    def test_header_selectsMBC(self):
+        m = mmu.MMU(MockROM(4, cartType=0x03, ramSize=0x03))
+        self.assertTrue(isinstance(m._mbc, mmu.MBC1))
+        self.assertEquals(m.numRAMBanks(), 4)
+        with self.assertRaises(ValueError):
+            mmu.MMU(MockROM(4, cartType=0xfe))
+
+    def test_noMBC(self):
+        m = mmu.MMU(MockROM(2))
+        self.assertEquals(m.get8(0x0000), 0)
+        self.assertEquals(m.get8(0x4000), 1)
+        m.set8(0x2000, 0)
+        self.assertEquals(m.get8(0x4000), 1)
+
+    def test_ram(self):
+        m = mmu.MMU(MockROM(2))
+        for addr in [0x8000, 0x9fff, 0xc000, 0xdfff, 0xfe00, 0xffff]:
+            self.assertEquals(m.get8(addr), 0)
+            m.set8(addr, 0xba)
+            self.assertEquals(m.get8(addr), 0xba)
+
+    def test_echo(self):
+        m = mmu.MMU(MockROM(2))
+        m.set8(0xc123, 0x12)
+        self.assertEquals(m.get8(0xe123), 0x12)
+        m.set8(0xfdff, 0x34)
+        self.assertEquals(m.get8(0xddff), 0x34)
+        m.set8(0xfe00, 0x56)
+        self.assertEquals(m.get8(0xde00), 0)
+
+    def test_watch(self):
+        writes = []
+        m = mmu.MMU(MockROM(2, cartType=0x03, ramSize=0x03))
+        m.watch(0x9000, 0xa7ff,
+                 lambda addr, val: writes.append((addr, val)))
+        m.set8(0x0000, 0x0a)
+        m.set8(0x8fff, 1)
+        m.set8(0x9000, 2)
+        m.set8(0xa000, 3)
+        m.set8(0x4000, 0x01)
+        m.set8(0xa7ff, 4)
+        m.set8(0xa800, 5)
+        self.assertEquals(writes, [(0x9000, 2), (0xa000, 3), (0xa7ff, 4)])
+
+    def test_externalRAM_disabledByDefault(self):
+        m = mmu.MMU(MockROM(2, cartType=0x03, ramSize=0x03))
+        m.set8(0xa000, 0x12)
+        self.assertEquals(m.get8(0xa000), 0xff)
+        m.set8(0x0000, 0x0a)
+        self.assertEquals(m.get8(0xa000), 0)
+        m.set8(0xa000, 0x12)
+        self.assertEquals(m.get8(0xa000), 0x12)
+        m.set8(0x0000, 0x00)
+        self.assertEquals(m.get8(0xa000), 0xff)
+
+    def test_mbc1_romBank(self):
+        m = mmu.MMU(MockROM(0x80, cartType=0x01))
+        for n in [1, 2, 0x1f]:
+            m.set8(0x2000, n)
+            self.assertEquals(m.get8(0x4000), n)
+            self.assertEquals(m.get8(0x7ffe), n)
+        m.set8(0x2000, 0)
+        self.assertEquals(m.get8(0x4000), 1)
+        m.set8(0x4000, 0x02)
+        self.assertEquals(m.get8(0x4000), 0x41)
+        self.assertEquals(m.get8(0x0000), 0)
+
+    def test_mbc1_ramBankingMode(self):
+        m = mmu.MMU(MockROM(0x80, cartType=0x03, ramSize=0x03))
+        m.set8(0x0000, 0x0a)
+        m.set8(0xa000, 0x11)
+        m.set8(0x6000, 0x01)
+        m.set8(0x4000, 0x01)
+        self.assertEquals(m.get8(0x0000), 0x20)
+        self.assertEquals(m.get8(0xa000), 0)
+        m.set8(0xa000, 0x22)
+        m.set8(0x4000, 0x00)
+        self.assertEquals(m.get8(0xa000), 0x11)
+
+    def test_mbc3_romBank(self):
+        m = mmu.MMU(MockROM(0x80, cartType=0x13))
+        m.set8(0x2000, 0x7f)
+        self.assertEquals(m.get8(0x4000), 0x7f)
+        m.set8(0x2000, 0)
+        self.assertEquals(m.get8(0x4000), 1)
+
+    def test_mbc3_rtc(self):
+        m = mmu.MMU(MockROM(2, cartType=0x10, ramSize=0x03))
+        m.set8(0x0000, 0x0a)
+        m.set8(0xa000, 0x11)
+        m.set8(0x4000, 0x08)
+        m.set8(0xa000, 0x3b)
+        m.set8(0x4000, 0x09)
+        self.assertEquals(m.get8(0xa000), 0)
+        m.set8(0x4000, 0x08)
+        self.assertEquals(m.get8(0xbfff), 0x3b)
+        m.set8(0x4000, 0x00)
+        self.assertEquals(m.get8(0xa000), 0x11)
+
+    def test_mbc5_romBank(self):
+        m = mmu.MMU(MockROM(0x102, cartType=0x19))
+        m.set8(0x2000, 0x00)
+        self.assertEquals(m.get8(0x4000), 0)
+        m.set8(0x3000, 0x01)
+        m.set8(0x2000, 0x01)
+        self.assertEquals(m.get8(0x4000), 0x01)
+        self.assertEquals(m.get8(0x7fff), 0x01)
+
+    def test_mbc5_ramBank(self):
+        m = mmu.MMU(MockROM(2, cartType=0x1b, ramSize=0x04))
+        m.set8(0x0000, 0x0a)
+        for n in range(0, 16):
+            m.set8(0x4000, n)
+            m.set8(0xa000, n)
+        for n in range(0, 16):
+            m.set8(0x4000, n)
+            self.assertEquals(m.get8(0xa000), n)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# Copyright 2013 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import os
+import tempfile
+import unittest
+
+from pygme.memory import rom
+
+
+class TestROM(unittest.TestCase):
+
+    numBanks = 4
+
+    def setUp(self):
+        # Every byte of bank n holds n, except the first, which holds 0xff - n.
+        data = bytearray()
+        for n in range(0, self.numBanks):
+            bank = bytearray([n]) * rom.ROM.BANK_SIZE
+            bank[0] = 0xff - n
+            data += bank
+        fd, self.path = tempfile.mkstemp()
+        os.write(fd, bytes(data))
+        os.close(fd)
+        self.rom = rom.ROM(self.path)
+
+    def test_size(self):
+        self.assertEquals(self.rom.size(), self.numBanks * rom.ROM.BANK_SIZE)
+        self.assertEquals(self.rom.numBanks(), self.numBanks)
+
+    def test_get8_bank0(self):
+        self.assertEquals(self.rom.get8(0x0000), 0xff)
+        self.assertEquals(self.rom.get8(0x3fff), 0)
+
+    def test_get8_defaultsToBank1(self):
+        self.assertEquals(self.rom.getBank(), 1)
+        self.assertEquals(self.rom.get8(0x4000), 0xfe)
+        self.assertEquals(self.rom.get8(0x7fff), 1)
+
+    def test_setBank(self):
+        for n in range(0, self.numBanks):
+            self.rom.setBank(n)
+            self.assertEquals(self.rom.get8(0x4000), 0xff - n)
+            self.assertEquals(self.rom.get8(0x7fff), n)
+        self.assertEquals(self.rom.get8(0x0000), 0xff)
+
+    def test_setBank_maxBank(self):
+        with self.assertRaises(IndexError):
+            self.rom.setBank(self.numBanks)
+        with self.assertRaises(IndexError):
+            self.rom.setBank(-1)
+
+    def test_get8_maxAddr(self):
+        self.rom.get8(0x7fff)
+        with self.assertRaises(IndexError):
+            self.rom.get8(0x8000)
+        with self.assertRaises(IndexError):
+            self.rom.get8(-1)
+
+    def test_bank_isReadOnly(self):
+        view = self.rom.bank(2)
+        self.assertEquals(view[1], 2)
+        with self.assertRaises(TypeError):
+            view[1] = 0
+
+    def test_tooSmall(self):
+        fd, path = tempfile.mkstemp()
+        os.write(fd, bytes(bytearray(rom.ROM.BANK_SIZE)))
+        os.close(fd)
+        try:
+            with self.assertRaises(ValueError):
+                rom.ROM(path)
+        finally:
+            os.remove(path)
+
+    def tearDown(self):
+        self.rom.close()
+        self.rom = None
+        os.remove(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
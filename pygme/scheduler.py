@@ -0,0 +1,38 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+
+class Scheduler(object):
+    """
+    The Scheduler class runs a CPU alongside the devices that share its clock,
+    such as the LCD controller.
+
+    Each device provides update(ticks), which advances it, and
+    cycles_until_next_event(), the number of ticks before it next changes
+    state that the CPU can see. Rather than updating every device after each
+    instruction, the scheduler lets the CPU run until the earliest of those
+    events and then updates the devices once with the cycles it took.
+    """
+
+    def __init__(self, cpu, devices):
+        self._cpu = cpu
+        self._devices = devices
+
+    def run(self, cycles):
+        """
+        Runs the CPU and devices for at least cycles, and returns the number
+        of cycles run, which may overshoot by part of an instruction.
+        """
+        cpu = self._cpu
+        devices = self._devices
+        done = 0
+        while done < cycles:
+            budget = cycles - done
+            for device in devices:
+                budget = min(budget, device.cycles_until_next_event())
+            spent = cpu.run(budget)
+            for device in devices:
+                device.update(spent)
+            done += spent
+        return done
@@ -0,0 +1,165 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import unittest
+
+from pygme import scheduler
+from pygme import timer
+from pygme.cpu import z80
+from pygme.lcd.driver import lcdc
+from pygme.memory import array
+from pygme.memory import iomem
+
+
+class MockCPU:
+
+    def __init__(self, instr_time=4):
+        self._instr_time = instr_time
+        self.budgets = []
+
+    def run(self, max_cycles):
+        self.budgets.append(max_cycles)
+        cycles = 0
+        while cycles < max_cycles:
+            cycles += self._instr_time
+        return cycles
+
+
+class CountingMemory:
+
+    def __init__(self, mem):
+        self._mem = mem
+        self.reads = 0
+
+    def get8(self, addr):
+        self.reads += 1
+        return self._mem.get8(addr)
+
+    def set8(self, addr, val):
+        self._mem.set8(addr, val)
+
+    def size(self):
+        return self._mem.size()
+
+    def watch(self, start, end, func):
+        self._mem.watch(start, end, func)
+
+
+class MockDevice:
+
+    def __init__(self, period):
+        self._period = period
+        self._ticks = 0
+        self.events = 0
+
+    def update(self, ticks):
+        self._ticks += ticks
+        while self._ticks >= self._period:
+            self._ticks -= self._period
+            self.events += 1
+
+    def cycles_until_next_event(self):
+        return self._period - self._ticks
+
+
+class MockLCD:
+
+    def __init__(self):
+        self.frames = 0
+
+    def update(self, frame):
+        self.frames += 1
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_run_stopsAtEarliestEvent(self):
+        cpu = MockCPU()
+        fast = MockDevice(80)
+        slow = MockDevice(456)
+        sched = scheduler.Scheduler(cpu, [slow, fast])
+        self.assertEquals(sched.run(160), 160)
+        self.assertEquals(cpu.budgets, [80, 80])
+        self.assertEquals(fast.events, 2)
+        self.assertEquals(slow.events, 0)
+
+    def test_run_withoutDevices(self):
+        cpu = MockCPU()
+        sched = scheduler.Scheduler(cpu, [])
+        self.assertEquals(sched.run(1000), 1000)
+        self.assertEquals(cpu.budgets, [1000])
+
+    def test_run_overshootIsCarried(self):
+        cpu = MockCPU(instr_time=12)
+        device = MockDevice(80)
+        sched = scheduler.Scheduler(cpu, [device])
+        self.assertEquals(sched.run(80), 84)
+        self.assertEquals(device.events, 1)
+        self.assertEquals(device.cycles_until_next_event(), 76)
+
+    def test_run_z80AndLCDController(self):
+        # Memory is zeroed, so the CPU runs NOPs.
+        mem = iomem.IOMemory(array.Array(1 << 16))
+        lcd = MockLCD()
+        sched = scheduler.Scheduler(z80.Z80(mem),
+                                    [lcdc.LCDController(mem, lcd)])
+        sched.run(2 * 154 * 456)
+        self.assertEquals(lcd.frames, 2)
+
+    def test_run_haltSkipsToEvents(self):
+        backing = CountingMemory(array.Array(1 << 16))
+        mem = iomem.IOMemory(backing)
+        # ei; halt; jr -3, with inc b; reti as the VBLANK handler.
+        for i, b in enumerate([0xfb, 0x76, 0x18, 0xfd]):
+            mem.set8(0x0100 + i, b)
+        mem.set8(0x0040, 0x04)
+        mem.set8(0x0041, 0xd9)
+        mem.set8(iomem.IE, iomem.INTR_VBLANK)
+        cpu = z80.Z80(mem)
+        mem.setIntrListener(cpu.checkIntrs)
+        cpu.b.ld(0)
+        ctrl = lcdc.LCDController(mem, MockLCD(), render=False)
+        sched = scheduler.Scheduler(cpu, [ctrl])
+        sched.run(2 * 154 * 456)
+        self.assertEquals(cpu.b.val(), 2)
+        # A handful of instructions are run for each VBLANK, rather than one
+        # for every 4 cycles of the frame.
+        self.assertTrue(backing.reads < 100)
+
+    def test_run_idleLoopSkipsToEvents(self):
+        backing = CountingMemory(array.Array(1 << 16))
+        mem = iomem.IOMemory(backing)
+        # ldh a, (LY); cp 0x90; jr nz, -6; inc b; halt
+        for i, b in enumerate([0xf0, 0x44, 0xfe, 0x90, 0x20, 0xfa, 0x04,
+                               0x76]):
+            mem.set8(0x0100 + i, b)
+        cpu = z80.Z80(mem)
+        cpu.b.ld(0)
+        ctrl = lcdc.LCDController(mem, MockLCD(), render=False)
+        sched = scheduler.Scheduler(cpu, [ctrl])
+        sched.run(154 * 456)
+        self.assertEquals(cpu.b.val(), 1)
+        self.assertTrue(cpu.skippedCycles > 120 * 456)
+        # The loop, with the check that finds it idle, makes 10 reads, and is
+        # run about once for each LCD mode of each line.
+        self.assertTrue(backing.reads < 154 * 3 * 10)
+
+    def test_run_timerPollEndsOnTime(self):
+        mem = iomem.IOMemory(array.Array(1 << 16))
+        # ldh a, (TIMA); and 0xf0; jr z, -6; inc b; halt
+        for i, b in enumerate([0xf0, 0x05, 0xe6, 0xf0, 0x28, 0xfa, 0x04,
+                               0x76]):
+            mem.set8(0x0100 + i, b)
+        cpu = z80.Z80(mem)
+        cpu.b.ld(0)
+        t = timer.Timer(mem, cpu.elapsed)
+        mem.set8(iomem.TAC, timer.TAC_ENABLE | 0x01)
+        sched = scheduler.Scheduler(cpu, [t])
+        # TIMA reaches 0x10 after 256 cycles, and is read 24 cycles later.
+        sched.run(320)
+        self.assertEquals(cpu.b.val(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+import unittest
+
+from pygme import timer
+from pygme.memory import array
+from pygme.memory import iomem
+
+
+class TestTimer(unittest.TestCase):
+
+    def setUp(self):
+        self.mem = iomem.IOMemory(array.Array(1 << 16))
+        self.timer = timer.Timer(self.mem)
+
+    def test_div(self):
+        self.timer.update(255)
+        self.assertEquals(self.mem.get8(iomem.DIV), 0)
+        self.timer.update(1)
+        self.assertEquals(self.mem.get8(iomem.DIV), 1)
+        self.timer.update(255 * 256)
+        self.assertEquals(self.mem.get8(iomem.DIV), 0)
+        self.mem.set8(iomem.DIV, 0x12)
+        self.timer.update(256 * 3)
+        self.assertEquals(self.mem.get8(iomem.DIV), 3)
+
+    def test_disabled(self):
+        self.mem.set8(iomem.TAC, 0x03)
+        self.assertEquals(self.mem.get8(iomem.TAC), 0xfb)
+        self.timer.update(10000)
+        self.assertEquals(self.mem.get8(iomem.TIMA), 0)
+        self.assertEquals(self.timer.cycles_until_next_event(),
+                          timer.NEVER - 10000)
+
+    def test_tima_counts(self):
+        for tac, period in enumerate(timer.PERIODS):
+            self.mem.set8(iomem.TAC, 0x00)
+            self.mem.set8(iomem.TIMA, 0)
+            self.mem.set8(iomem.DIV, 0)
+            self.mem.set8(iomem.TAC, timer.TAC_ENABLE | tac)
+            self.timer.update(period * 10 - 1)
+            self.assertEquals(self.mem.get8(iomem.TIMA), 9)
+            self.timer.update(1)
+            self.assertEquals(self.mem.get8(iomem.TIMA), 10)
+
+    def test_overflow_isScheduled(self):
+        self.mem.set8(iomem.TMA, 0xf0)
+        self.mem.set8(iomem.TIMA, 0xfe)
+        self.mem.set8(iomem.TAC, timer.TAC_ENABLE | 0x01)
+        self.assertEquals(self.timer.cycles_until_next_event(), 32)
+        self.timer.update(31)
+        self.assertEquals(self.mem.get8(iomem.IF), 0)
+        self.timer.update(1)
+        self.assertEquals(self.mem.get8(iomem.IF), iomem.INTR_TIMER)
+        self.assertEquals(self.mem.get8(iomem.TIMA), 0xf0)
+        self.assertEquals(self.timer.cycles_until_next_event(), 16 * 0x10)
+
+    def test_overflow_alignsToDiv(self):
+        self.timer.update(10)
+        self.mem.set8(iomem.TIMA, 0xff)
+        self.mem.set8(iomem.TAC, timer.TAC_ENABLE | 0x01)
+        self.assertEquals(self.timer.cycles_until_next_event(), 6)
+
+    def test_readsSeeElapsedCycles(self):
+        elapsed = [0]
+        self.timer = timer.Timer(self.mem, lambda: elapsed[0])
+        self.mem.set8(iomem.TAC, timer.TAC_ENABLE | 0x01)
+        elapsed[0] = 256 + 32
+        self.assertEquals(self.mem.get8(iomem.DIV), 1)
+        self.assertEquals(self.mem.get8(iomem.TIMA), 18)
+        # The burst ends and its cycles are passed to update().
+        elapsed[0] = 0
+        self.timer.update(256 + 32)
+        self.assertEquals(self.mem.get8(iomem.DIV), 1)
+        self.assertEquals(self.mem.get8(iomem.TIMA), 18)
+        self.timer.update(16)
+        self.assertEquals(self.mem.get8(iomem.TIMA), 19)
+
+    def test_writesSeeElapsedCycles(self):
+        elapsed = [0]
+        self.timer = timer.Timer(self.mem, lambda: elapsed[0])
+        elapsed[0] = 100
+        self.mem.set8(iomem.DIV, 0)
+        self.mem.set8(iomem.TIMA, 0xff)
+        self.mem.set8(iomem.TAC, timer.TAC_ENABLE | 0x01)
+        elapsed[0] = 0
+        self.timer.update(100)
+        self.assertEquals(self.timer.cycles_until_next_event(), 16)
+        self.timer.update(256 - 1)
+        self.assertEquals(self.mem.get8(iomem.DIV), 0)
+        self.timer.update(1)
+        self.assertEquals(self.mem.get8(iomem.DIV), 1)
+
+    def tearDown(self):
+        self.timer = None
+        self.mem = None
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# Copyright 2014 Sean Kelleher. All rights reserved.
+# Use of this source code is governed by a GPL
+# license that can be found in the LICENSE file.
+
+from pygme.memory.iomem import DIV, TIMA, TMA, TAC
+
+# The number of cycles between increments of TIMA for each input clock
+# select value in TAC.
+PERIODS = [1024, 16, 64, 256]
+
+TAC_ENABLE = 0x04
+
+# The number of cycles until the next event when there is none.
+NEVER = 1 << 62
+
+
+class Timer(object):
+    """
+    The Timer class implements the DIV, TIMA, TMA and TAC registers.
+
+    Like LCDController, a Timer is advanced by update(ticks), but it does not
+    count the ticks out: DIV and TIMA are computed from the number of cycles
+    elapsed when they are read, and update() only compares the time against
+    the cycle at which TIMA next overflows, which is worked out whenever the
+    registers change. cycles_until_next_event() gives the cycles to that
+    overflow, at which point TIMA is reloaded from TMA and the timer
+    interrupt is requested through mem.setTimerIntr().
+
+    The registers are read and written as at the last call to update() plus
+    the cycles given by elapsed(), e.g. Z80.elapsed, so that an access in the
+    middle of a burst of instructions sees the time at which it is made.
+    """
+
+    def __init__(self, mem, elapsed=lambda: 0):
+        self._mem = mem
+        self._elapsed = elapsed
+        self._now = 0
+        # The cycle at which DIV was last reset, and up to which TIMA has
+        # been counted.
+        self._divReset = 0
+        self._synced = 0
+        self._tima = 0
+        self._tma = 0
+        self._tac = 0
+        self._overflow = NEVER
+        mem.mapRegister(DIV, self._readDIV, self._writeDIV)
+        mem.mapRegister(TIMA, self._readTIMA, self._writeTIMA)
+        mem.mapRegister(TMA, self._readTMA, self._writeTMA)
+        mem.mapRegister(TAC, self._readTAC, self._writeTAC)
+
+    def update(self, ticks):
+        self._now += ticks
+        if self._now >= self._overflow:
+            self._sync()
+
+    def cycles_until_next_event(self):
+        """Returns the number of ticks until TIMA next overflows."""
+        return self._overflow - self._now
+
+    def _sync(self):
+        """
+        Counts the increments of TIMA up to now, handling an overflow, and
+        works out when TIMA will next overflow.
+        """
+        now = self._time()
+        if self._tac & TAC_ENABLE:
+            period = PERIODS[self._tac & 0b11]
+            edge = (now - self._divReset) // period
+            tima = self._tima + edge - \
+                (self._synced - self._divReset) // period
+            if tima > 0xff:
+                tima = self._tma + (tima - 0x100) % (0x100 - self._tma)
+                self._mem.setTimerIntr()
+            self._tima = tima
+            self._overflow = self._divReset + (edge + 0x100 - tima) * period
+        else:
+            self._overflow = NEVER
+        self._synced = now
+
+    def _time(self):
+        return self._now + self._elapsed()
+
+    def _readDIV(self):
+        return ((self._time() - self._divReset) >> 8) & 0xff
+
+    def _writeDIV(self, val):
+        # Writing any value resets DIV.
+        self._sync()
+        self._divReset = self._time()
+        self._sync()
+
+    def _readTIMA(self):
+        self._sync()
+        return self._tima
+
+    def _writeTIMA(self, val):
+        self._sync()
+        self._tima = val
+        self._sync()
+
+    def _readTMA(self):
+        return self._tma
+
+    def _writeTMA(self, val):
+        self._sync()
+        self._tma = val
+
+    def _readTAC(self):
+        return 0xf8 | self._tac
+
+    def _writeTAC(self, val):
+        self._sync()
+        self._tac = val & 0x07
+        self._sync()
@@ -12,12 +12,13 @@ setup(
     description="Python Gameboy Emuator",
     classifiers=[
         "License :: OSI Approved :: GNU General Public License (GPL)",
-        "Programming Language :: Python :: 2.7",
+        "Programming Language :: Python :: 3",
         "Programming Language :: Python",
     ],
     author="Sean Kelleher",
     author_email='ezanmoto@gmail.com',
     license="GPL",
+    python_requires='>=3',
     packages=[
         'pygme',
         'pygme.cpu',
@@ -25,7 +26,12 @@ setup(
         'pygme.lcd',
         'pygme.lcd.driver',
         'pygme.lcd.driver.test',
+        'pygme.lcd.test',
         'pygme.memory',
         'pygme.memory.test',
+        'pygme.test',
     ],
+    extras_require={
+        'numpy': ['numpy'],
+    },
 )